@@ -8,14 +8,19 @@ Date: 2025-03-25
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 
-from backend.database.connection import get_db
+from backend.database.connection import get_db, get_async_db
+from backend.database.kline_stream import NDJSON_MEDIA_TYPE
 from backend.models.etf_model import ETFInfo, ETFKlineData, ETFList
 from backend.services.etf_service import ETFService
+from backend.utils.arrow_serializer import TABULAR_MEDIA_TYPES, tabular_response, with_metadata
 from backend.utils.date_utils import parse_date
+from backend.utils.indicators import parse_indicators
 
 router = APIRouter(prefix="/etfs", tags=["etfs"])
 etf_service = ETFService()
@@ -23,26 +28,48 @@ etf_service = ETFService()
 
 @router.get("", response_model=Dict[str, Any])
 async def get_etf_list(
-        page: int = Query(1, description="页码，默认为1"),
+        page: Optional[int] = Query(None, ge=1, description="页码，未提供cursor时默认为1"),
         page_size: int = Query(20, description="每页数量，默认为20"),
         search: Optional[str] = Query(None, description="搜索关键词"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分页游标"),
+        sort_by: Optional[Literal["symbol", "name", "price", "change", "volume"]] = Query(
+            None, description="排序字段：symbol(代码)、name(名称)、price(最新价)、change(涨跌幅)、volume(成交量)"
+        ),
+        sort_order: Literal["asc", "desc"] = Query("asc", description="排序顺序"),
+        response_format: Literal["json", "arrow", "parquet"] = Query(
+            "json", alias="format", description="返回格式：json、arrow(Arrow IPC流)、parquet(Parquet文件)"
+        ),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取ETF列表。
 
     Args:
-        page: 页码，默认为1
+        page: 页码，未提供cursor时默认为1，与cursor互斥，优先使用page
         page_size: 每页数量，默认为20
         search: 搜索关键词，默认为None
+        cursor: 分页游标，用于获取下一页或上一页数据
+        sort_by: 排序字段，默认按代码排序；使用游标时以游标中记录的排序方式为准
+        sort_order: 排序顺序，asc或desc
+        response_format: 返回格式，arrow/parquet时列表项按列序列化为二进制表，分页信息写入schema元数据
         db: 数据库会话
 
     Returns:
         Dict[str, Any]: 包含ETF列表、总数和分页信息的字典
     """
     try:
-        result = etf_service.get_etf_list(db, page, page_size, search)
+        if page is None and not cursor:
+            page = 1
+        if response_format in TABULAR_MEDIA_TYPES:
+            # 列表项按列序列化为二进制表，分页信息写入schema元数据
+            result = await etf_service.get_etf_list_async(db, page, page_size, search, cursor, sort_by, sort_order,
+                                                        items_format="arrow")
+            return tabular_response(with_metadata(result.pop("items"), result), response_format, "etfs")
+
+        result = await etf_service.get_etf_list_async(db, page, page_size, search, cursor, sort_by, sort_order)
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -107,7 +134,24 @@ async def get_etf_kline(
         symbol: str,
         start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
         end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        response_format: Literal["records", "columnar", "ndjson", "arrow", "parquet"] = Query(
+            "records", alias="format",
+            description="返回格式：records(逐日对象列表)、columnar(每个字段一个数组)、ndjson(流式输出，每行一个对象)、"
+                        "arrow(Arrow IPC流)、parquet(Parquet文件)"
+        ),
+        max_points: Optional[int] = Query(
+            None, ge=3, description="最大数据点数，超过时在服务端降采样（通常取图表的横向像素数），不支持ndjson"
+        ),
+        sampling: Literal["ohlc", "lttb"] = Query(
+            "ohlc", description="降采样方式：ohlc(按区间合并为K线)、lttb(按收盘价选取原始数据点，适合折线图)"
+        ),
+        period: Literal["D", "W", "M", "Q"] = Query(
+            "D", description="K线周期：D(日线)、W(周线)、M(月线)、Q(季线)，不支持ndjson"
+        ),
+        indicators: Optional[str] = Query(
+            None, description="技术指标，如ma:5:10:20,ema:12,macd,rsi,kdj,boll:20:2,atr:14，省略参数时使用默认值，不支持ndjson"
+        ),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取ETF K线数据。
@@ -116,11 +160,26 @@ async def get_etf_kline(
         symbol: ETF代码
         start_date: 开始日期，格式为YYYY-MM-DD
         end_date: 结束日期，格式为YYYY-MM-DD
+        response_format: 返回格式，columnar时每个字段返回一个数组，跳过逐行校验；
+            ndjson时从服务端游标分块读取并流式输出，首字节时间和内存占用与序列长度无关；
+            arrow/parquet时按列直接序列化为二进制表，外层字段写入schema元数据
+        max_points: 最大数据点数，"全部"区间的数千根K线在序列化之前降采样，传输和渲染量与历史长度无关
+        sampling: 降采样方式
+        period: K线周期，周线、月线、季线由日线按自然周期合并，按代码缓存
+        indicators: 技术指标，在完整历史上计算后按日期对齐到返回的K线，按代码缓存
         db: 数据库会话
 
     Returns:
         ETFKlineData: ETF K线数据
     """
+    if (max_points or period != "D" or indicators) and response_format == "ndjson":
+        raise HTTPException(status_code=400,
+                            detail="max_points, period and indicators are not supported with format=ndjson")
+    try:
+        specs = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # 解析日期
         start = parse_date(start_date) if start_date else None
@@ -130,7 +189,24 @@ async def get_etf_kline(
         # 这样可以确保前端能够获取到完整的数据范围
         
         # 获取K线数据
-        kline_data = etf_service.get_etf_kline(db, symbol, start, end)
+        if response_format in TABULAR_MEDIA_TYPES:
+            # 按列序列化的二进制表，客户端无需解析JSON
+            table = await etf_service.get_etf_kline_table_async(db, symbol, start, end, max_points,
+                                                                sampling, period, specs)
+            return tabular_response(table, response_format, f"{symbol}_kline")
+
+        if response_format == "ndjson":
+            # 流式输出，每行一个K线对象
+            stream = await etf_service.stream_etf_kline(symbol, start, end)
+            return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+        if response_format == "columnar":
+            # 列式数据直接返回，不经过逐行的Pydantic模型校验
+            columns = await etf_service.get_etf_kline_columns_async(db, symbol, start, end, max_points,
+                                                                    sampling, period, specs)
+            return JSONResponse(content=columns)
+
+        kline_data = await etf_service.get_etf_kline_async(db, symbol, start, end, max_points, sampling, period, specs)
         return kline_data
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -15,6 +15,7 @@ import pandas as pd
 
 from backend.database.connection import get_db
 from backend.services.etf_service import ETFService
+from backend.utils.upstream_cache import fetch_cached
 
 router = APIRouter(prefix="/funds", tags=["funds"])
 etf_service = ETFService()
@@ -45,7 +46,7 @@ async def get_value_etfs(
         
         # 使用akshare获取ETF实时数据
         try:
-            etf_df = ak.fund_etf_spot_em()
+            etf_df = await fetch_cached(ak.fund_etf_spot_em)
             # 筛选出A表中的ETF（高成交额高振幅ETF列表中的ETF）
             filtered_etfs = []
             for _, row in etf_df.iterrows():
@@ -0,0 +1,65 @@
+# backend/api/kline_api.py
+"""
+此模块定义了批量K线数据相关的API端点。
+提供一次请求获取多个股票、指数和ETF K线数据的API接口。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database.connection import get_async_db
+from backend.database.kline_stream import NDJSON_MEDIA_TYPE
+from backend.models.kline_model import KlineBatchRequest
+from backend.services.kline_service import KlineService
+from backend.utils.date_utils import parse_date
+
+router = APIRouter(prefix="/kline", tags=["kline"])
+kline_service = KlineService()
+
+
+@router.post("/batch")
+async def get_kline_batch(
+        request: KlineBatchRequest,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量获取K线数据。
+    按资产类型分组，每张日线表执行一次查询，名称和参考指数按组共享。
+
+    Args:
+        request: 代码列表、默认资产类型、日期范围、返回格式和降采样参数；
+            ndjson时每个代码的数据读完后立即输出一行，适合代码多或历史长的请求
+        db: 数据库会话
+
+    Returns:
+        以请求中的代码为键的K线数据，以及未知或没有数据的代码列表
+    """
+    try:
+        # 解析日期
+        start = parse_date(request.start_date) if request.start_date else None
+        end = parse_date(request.end_date) if request.end_date else None
+        symbols = [
+            (item, request.asset_type) if isinstance(item, str) else (item.symbol, item.asset_type)
+            for item in request.symbols
+        ]
+
+        if request.format == "ndjson":
+            # 流式输出，每个代码一行
+            stream = await kline_service.stream_kline_batch(symbols, start, end, request.max_points,
+                                                           request.sampling)
+            return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+        result = await kline_service.get_kline_batch_async(db, symbols, start, end, request.format,
+                                                             request.max_points, request.sampling)
+        return JSONResponse(content={
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            **result,
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -17,6 +17,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from backend.database.connection import get_db
+from backend.utils.upstream_cache import fetch_cached
 
 router = APIRouter(prefix="/market", tags=["market"])
 
@@ -31,7 +32,7 @@ async def get_market_indices():
     """
     try:
         # 使用akshare获取A股大盘指数实时行情 - 使用新浪财经数据源
-        indices_data = ak.stock_zh_index_spot_sina()
+        indices_data = await fetch_cached(ak.stock_zh_index_spot_sina)
         
         # 提取需要的指数数据
         # 上证指数(000001)、深证成指(399001)、创业板指(399006)、科创50(000688)
@@ -89,7 +90,7 @@ async def get_hot_industries():
     """
     try:
         # 使用akshare获取行业板块实时行情
-        industries_data = ak.stock_board_industry_name_em()
+        industries_data = await fetch_cached(ak.stock_board_industry_name_em)
         
         # 按照涨跌幅排序，获取前10个热门行业
         industries_data = industries_data.sort_values(by='涨跌幅', ascending=False).head(10)
@@ -129,7 +130,7 @@ async def get_concept_sectors():
     """
     try:
         # 使用akshare获取概念板块实时行情
-        concepts_data = ak.stock_board_concept_name_em()
+        concepts_data = await fetch_cached(ak.stock_board_concept_name_em)
         
         # 按照涨跌幅排序，获取前10个热门概念
         concepts_data = concepts_data.sort_values(by='涨跌幅', ascending=False).head(10)
@@ -168,7 +169,7 @@ async def get_market_news():
     """
     try:
         # 使用akshare获取金融新闻
-        news_data = ak.stock_news_em()
+        news_data = await fetch_cached(ak.stock_news_em)
         
         # 获取最新的10条新闻
         news_data = news_data.head(10)
@@ -229,16 +230,16 @@ async def get_market_distribution(symbol: str, db: Session = Depends(get_db)):
             try:
                 # 根据不同的市场代码获取对应的数据
                 if symbol == '000001':  # A股所有个股
-                    market_data = ak.stock_zh_a_spot_em()
+                    market_data = await fetch_cached(ak.stock_zh_a_spot_em)
                 elif symbol == '399006':  # 创业板
-                    market_data = ak.stock_cy_a_spot_em()
+                    market_data = await fetch_cached(ak.stock_cy_a_spot_em)
                 elif symbol == '000688':  # 科创板
-                    market_data = ak.stock_kc_a_spot_em()
+                    market_data = await fetch_cached(ak.stock_kc_a_spot_em)
                 elif symbol == '899050':  # 北证板
-                    market_data = ak.stock_bj_a_spot_em()
+                    market_data = await fetch_cached(ak.stock_bj_a_spot_em)
                 else:
                     # 默认获取A股数据
-                    market_data = ak.stock_zh_a_spot_em()
+                    market_data = await fetch_cached(ak.stock_zh_a_spot_em)
                 
                 # 计算各个涨跌幅区间的股票数量
                 total_stocks = len(market_data)
@@ -310,7 +311,7 @@ async def get_industry_stocks(industry_name: str):
     """
     try:
         # 使用akshare获取行业成分股数据
-        stocks_data = ak.stock_board_industry_cons_em(symbol=industry_name)
+        stocks_data = await fetch_cached(ak.stock_board_industry_cons_em, symbol=industry_name)
         
         # 按照涨跌幅排序
         stocks_data = stocks_data.sort_values(by='涨跌幅', ascending=False)
@@ -361,7 +362,7 @@ async def get_market_pe_ratio(market: str = Query(..., description="市场名称
         
         # 使用akshare获取市场市盈率数据
         try:
-            pe_data = ak.stock_market_pe_lg(symbol=market)
+            pe_data = await fetch_cached(ak.stock_market_pe_lg, symbol=market)
             
             # 处理数据格式
             result = []
@@ -487,7 +488,7 @@ async def get_concept_stocks(concept_name: str):
     """
     try:
         # 使用akshare获取概念板块成分股数据
-        stocks_data = ak.stock_board_concept_cons_em(symbol=concept_name)
+        stocks_data = await fetch_cached(ak.stock_board_concept_cons_em, symbol=concept_name)
         
         # 按照涨跌幅排序
         stocks_data = stocks_data.sort_values(by='涨跌幅', ascending=False)
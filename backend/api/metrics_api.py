@@ -0,0 +1,90 @@
+# backend/api/metrics_api.py
+"""
+此模块定义了运行指标相关的API端点。
+提供数据库连接池的借出/空闲/溢出连接数和等待时间，上游数据源调用线程池的排队深度、等待时间，akshare数据集快照缓存和日线历史缓存的命中情况，以及行情数据后台刷新状态等运行指标。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from fastapi import APIRouter
+from typing import Dict, Any
+
+from backend.database.connection import async_engine, engine
+from backend.database.kline_cache import kline_cache
+from backend.database.kline_store import kline_store
+from backend.database.pool_metrics import async_pool_metrics, sync_pool_metrics
+from backend.utils.market_refresher import market_refresher
+from backend.utils.upstream_cache import upstream_cache
+from backend.utils.upstream_executor import upstream_executor
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/pool", response_model=Dict[str, Any])
+async def get_pool_metrics():
+    """
+    获取数据库连接池（同步引擎和异步引擎）的运行指标。
+
+    Returns:
+        Dict[str, Any]: 按引擎（sync/async）分别返回连接池配置、当前借出/空闲/溢出/等待中的连接数，
+            以及累计的连接次数、等待超时次数和等待/占用耗时（秒）
+    """
+    return {
+        "sync": sync_pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.sync_engine.pool),
+    }
+
+
+@router.get("/upstream", response_model=Dict[str, Any])
+async def get_upstream_metrics():
+    """
+    获取上游数据源（akshare）调用线程池的运行指标。
+
+    Returns:
+        Dict[str, Any]: 线程数、超时时间、当前排队深度和执行数，以及累计调用次数、超时次数和排队/执行耗时（秒）
+    """
+    return upstream_executor.metrics()
+
+
+@router.get("/upstream-cache", response_model=Dict[str, Any])
+async def get_upstream_cache_metrics():
+    """
+    获取akshare数据集快照缓存的运行指标。
+
+    Returns:
+        Dict[str, Any]: 快照数、进行中的下载数，以及累计的命中、旧快照命中、未命中、下载和下载失败次数
+    """
+    return upstream_cache.metrics()
+
+
+@router.get("/kline-cache", response_model=Dict[str, Any])
+async def get_kline_cache_metrics():
+    """
+    获取K线日线历史缓存的运行指标。
+
+    Returns:
+        Dict[str, Any]: 缓存的代码数、当前字节数和字节数上限，以及累计的命中、未命中和淘汰次数
+    """
+    return kline_cache.metrics()
+
+
+@router.get("/kline-store", response_model=Dict[str, Any])
+async def get_kline_store_metrics():
+    """
+    获取K线日线导出文件的使用情况。
+
+    Returns:
+        Dict[str, Any]: 各资产类型当前加载的版本、导出日期、代码数和行数，以及累计的命中、未命中和因导出文件过期未使用的次数
+    """
+    return kline_store.metrics()
+
+
+@router.get("/market-refresher", response_model=Dict[str, Any])
+async def get_market_refresher_status():
+    """
+    获取首页行情数据后台刷新的状态。
+
+    Returns:
+        Dict[str, Any]: 是否运行、是否交易时段、当前刷新间隔，以及各数据集最近一次成功刷新的时间和最近的错误
+    """
+    return market_refresher.status()
@@ -5,6 +5,9 @@
 Authors: hovi.hyw & AI
 Date: 2025-03-12
 更新: 2025-04-10 - 添加基金API路由
+更新: 2026-10-17 - 添加搜索联想API路由
+更新: 2026-10-17 - 添加运行指标API路由
+更新: 2026-10-17 - 添加批量K线API路由
 """
 
 from fastapi import APIRouter
@@ -14,6 +17,9 @@ from backend.api.index_api import router as index_router
 from backend.api.market_api import router as market_router
 from backend.api.etf_api import router as etf_router
 from backend.api.fund_api import router as fund_router
+from backend.api.search_api import router as search_router
+from backend.api.metrics_api import router as metrics_router
+from backend.api.kline_api import router as kline_router
 
 # 创建主路由
 api_router = APIRouter()
@@ -23,4 +29,7 @@ api_router.include_router(stock_router)
 api_router.include_router(index_router)
 api_router.include_router(market_router)
 api_router.include_router(etf_router)
-api_router.include_router(fund_router)
\ No newline at end of file
+api_router.include_router(fund_router)
+api_router.include_router(search_router)
+api_router.include_router(metrics_router)
+api_router.include_router(kline_router)
\ No newline at end of file
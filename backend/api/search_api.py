@@ -0,0 +1,40 @@
+# backend/api/search_api.py
+"""
+此模块定义了搜索相关的API端点。
+提供按代码、名称和拼音首字母联想股票、指数和ETF的API接口。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional, Literal
+
+from backend.database.search_index import SUGGEST_MAX_LIMIT
+from backend.models.search_model import SuggestResult
+from backend.services.search_service import SearchService
+
+router = APIRouter(prefix="/search", tags=["search"])
+search_service = SearchService()
+
+
+@router.get("/suggest", response_model=SuggestResult)
+async def get_suggestions(
+        q: str = Query(..., min_length=1, max_length=50, description="输入的前缀：代码、名称或拼音首字母（如gzmt）"),
+        limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT, description="返回条数"),
+        asset_type: Optional[Literal["stock", "index", "etf"]] = Query(None, description="资产类型，默认全部"),
+):
+    """
+    搜索联想。
+
+    Args:
+        q: 输入的前缀，不区分大小写
+        limit: 返回条数，默认10
+        asset_type: 资产类型，默认在股票、指数和ETF中联想
+
+    Returns:
+        SuggestResult: 按最新成交量从高到低排列的联想结果
+    """
+    try:
+        return search_service.suggest(q, limit, asset_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
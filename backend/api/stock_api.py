@@ -9,17 +9,23 @@ Date: 2025-03-12
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 import akshare as ak
 import pandas as pd
 import random
 
-from backend.database.connection import get_db
+from backend.database.connection import get_db, get_async_db
+from backend.database.kline_stream import NDJSON_MEDIA_TYPE
 from backend.models.stock_model import StockList, StockInfo, StockKlineData
 from backend.services.stock_service import StockService
+from backend.utils.arrow_serializer import TABULAR_MEDIA_TYPES, tabular_response, with_metadata
 from backend.utils.date_utils import parse_date
+from backend.utils.indicators import parse_indicators
+from backend.utils.upstream_cache import fetch_cached
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 stock_service = StockService()
@@ -31,7 +37,14 @@ async def get_stocks(
         page: Optional[int] = Query(None, ge=1, description="页码，从1开始"),
         page_size: int = Query(20, ge=1, le=100, description="每页数量"),
         search: Optional[str] = Query(None, description="搜索关键字"),
-        db: Session = Depends(get_db)
+        sort_by: Optional[Literal["symbol", "name", "price", "change", "volume"]] = Query(
+            None, description="排序字段：symbol(代码)、name(名称)、price(最新价)、change(涨跌幅)、volume(成交量)"
+        ),
+        sort_order: Literal["asc", "desc"] = Query("asc", description="排序顺序"),
+        response_format: Literal["json", "arrow", "parquet"] = Query(
+            "json", alias="format", description="返回格式：json、arrow(Arrow IPC流)、parquet(Parquet文件)"
+        ),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取股票列表。
@@ -41,6 +54,9 @@ async def get_stocks(
         page: 页码，从1开始，与cursor互斥，优先使用page
         page_size: 每页数量，默认20
         search: 搜索关键字，可搜索股票代码
+        sort_by: 排序字段，默认按代码排序；使用游标时以游标中记录的排序方式为准
+        sort_order: 排序顺序，asc或desc
+        response_format: 返回格式，arrow/parquet时列表项按列序列化为二进制表，分页信息写入schema元数据
         db: 数据库会话
 
     Returns:
@@ -49,7 +65,15 @@ async def get_stocks(
     try:
         # 确保search参数是字符串类型
         search_str = str(search) if search is not None else None
-        return stock_service.get_stock_list(db, page_size, cursor, search_str, page)
+        if response_format in TABULAR_MEDIA_TYPES:
+            # 列表项按列序列化为二进制表，分页信息写入schema元数据
+            result = await stock_service.get_stock_list_async(db, page_size, cursor, search_str, page, sort_by, sort_order,
+                                                          items_format="arrow")
+            return tabular_response(with_metadata(result.pop("items"), result), response_format, "stocks")
+
+        return await stock_service.get_stock_list_async(db, page_size, cursor, search_str, page, sort_by, sort_order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -85,7 +109,24 @@ async def get_stock_kline(
         symbol: str,
         start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
         end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        response_format: Literal["records", "columnar", "ndjson", "arrow", "parquet"] = Query(
+            "records", alias="format",
+            description="返回格式：records(逐日对象列表)、columnar(每个字段一个数组)、ndjson(流式输出，每行一个对象)、"
+                        "arrow(Arrow IPC流)、parquet(Parquet文件)"
+        ),
+        max_points: Optional[int] = Query(
+            None, ge=3, description="最大数据点数，超过时在服务端降采样（通常取图表的横向像素数），不支持ndjson"
+        ),
+        sampling: Literal["ohlc", "lttb"] = Query(
+            "ohlc", description="降采样方式：ohlc(按区间合并为K线)、lttb(按收盘价选取原始数据点，适合折线图)"
+        ),
+        period: Literal["D", "W", "M", "Q"] = Query(
+            "D", description="K线周期：D(日线)、W(周线)、M(月线)、Q(季线)，不支持ndjson"
+        ),
+        indicators: Optional[str] = Query(
+            None, description="技术指标，如ma:5:10:20,ema:12,macd,rsi,kdj,boll:20:2,atr:14，省略参数时使用默认值，不支持ndjson"
+        ),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取股票K线数据。
@@ -94,17 +135,50 @@ async def get_stock_kline(
         symbol: 股票代码
         start_date: 开始日期，格式为YYYY-MM-DD
         end_date: 结束日期，格式为YYYY-MM-DD
+        response_format: 返回格式，columnar时每个字段返回一个数组，跳过逐行校验；
+            ndjson时从服务端游标分块读取并流式输出，首字节时间和内存占用与序列长度无关；
+            arrow/parquet时按列直接序列化为二进制表，外层字段写入schema元数据
+        max_points: 最大数据点数，"全部"区间的数千根K线在序列化之前降采样，传输和渲染量与历史长度无关
+        sampling: 降采样方式
+        period: K线周期，周线、月线、季线由日线按自然周期合并，按代码缓存
+        indicators: 技术指标，在完整历史上计算后按日期对齐到返回的K线，按代码缓存
         db: 数据库会话
 
     Returns:
         StockKlineData: 股票K线数据
     """
+    if (max_points or period != "D" or indicators) and response_format == "ndjson":
+        raise HTTPException(status_code=400,
+                            detail="max_points, period and indicators are not supported with format=ndjson")
+    try:
+        specs = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # 解析日期
         start = parse_date(start_date) if start_date else None
         end = parse_date(end_date) if end_date else None
 
-        kline_data = stock_service.get_stock_kline(db, symbol, start, end)
+        if response_format in TABULAR_MEDIA_TYPES:
+            # 按列序列化的二进制表，客户端无需解析JSON
+            table = await stock_service.get_stock_kline_table_async(db, symbol, start, end, max_points,
+                                                                    sampling, period, specs)
+            return tabular_response(table, response_format, f"{symbol}_kline")
+
+        if response_format == "ndjson":
+            # 流式输出，每行一个K线对象
+            stream = await stock_service.stream_stock_kline(symbol, start, end)
+            return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+        if response_format == "columnar":
+            # 列式数据直接返回，不经过逐行的Pydantic模型校验
+            columns = await stock_service.get_stock_kline_columns_async(db, symbol, start, end, max_points,
+                                                                        sampling, period, specs)
+            return JSONResponse(content=columns)
+
+        kline_data = await stock_service.get_stock_kline_async(db, symbol, start, end, max_points,
+                                                               sampling, period, specs)
         return kline_data
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -123,7 +197,7 @@ async def get_hot_stocks():
     """
     try:
         # 使用akshare获取A股实时行情数据
-        stock_data = ak.stock_zh_a_spot_em()
+        stock_data = await fetch_cached(ak.stock_zh_a_spot_em)
         
         # 按照成交量排序，获取前10个热门个股
         stock_data = stock_data.sort_values(by='成交量', ascending=False).head(10)
@@ -162,7 +236,7 @@ async def get_stock_funds():
     """
     try:
         # 使用akshare获取个股资金流向数据
-        funds_data = ak.stock_individual_fund_flow_rank(indicator="今日")
+        funds_data = await fetch_cached(ak.stock_individual_fund_flow_rank, indicator="今日")
         
         # 按照净额排序，获取资金流入最多的10只股票
         funds_data = funds_data.sort_values(by='净额', ascending=False).head(10)
@@ -225,26 +299,26 @@ async def get_stock_fund_flow(
         
         # 使用akshare获取个股资金流数据
         try:
-            fund_flow_data = ak.stock_individual_fund_flow(stock=code, market=market)
+            fund_flow_data = await fetch_cached(ak.stock_individual_fund_flow, stock=code, market=market)
         except Exception as e:
             # 如果默认市场获取失败，尝试其他市场
             if market == 'sh':
                 try:
-                    fund_flow_data = ak.stock_individual_fund_flow(stock=code, market='sz')
+                    fund_flow_data = await fetch_cached(ak.stock_individual_fund_flow, stock=code, market='sz')
                     market = 'sz'
                 except:
                     try:
-                        fund_flow_data = ak.stock_individual_fund_flow(stock=code, market='bj')
+                        fund_flow_data = await fetch_cached(ak.stock_individual_fund_flow, stock=code, market='bj')
                         market = 'bj'
                     except Exception as inner_e:
                         raise HTTPException(status_code=404, detail=f"无法获取股票{code}的资金流数据: {str(inner_e)}")
             elif market == 'sz':
                 try:
-                    fund_flow_data = ak.stock_individual_fund_flow(stock=code, market='sh')
+                    fund_flow_data = await fetch_cached(ak.stock_individual_fund_flow, stock=code, market='sh')
                     market = 'sh'
                 except:
                     try:
-                        fund_flow_data = ak.stock_individual_fund_flow(stock=code, market='bj')
+                        fund_flow_data = await fetch_cached(ak.stock_individual_fund_flow, stock=code, market='bj')
                         market = 'bj'
                     except Exception as inner_e:
                         raise HTTPException(status_code=404, detail=f"无法获取股票{code}的资金流数据: {str(inner_e)}")
@@ -308,139 +382,9 @@ async def get_stock_real_change(
         # 解析日期
         start = parse_date(start_date) if start_date else None
         end = parse_date(end_date) if end_date else None
-        
-        # 首先获取K线数据以获取日期列表
-        kline_data = stock_service.get_stock_kline(db, symbol, start, end)
-        
-        # 查询derived_stock表中的real_change数据
-        query = """
-        SELECT ds.symbol, ds.date, ds.real_change
-        FROM derived_stock ds
-        WHERE ds.symbol = :symbol
-        AND (:start_date IS NULL OR ds.date >= :start_date)
-        AND (:end_date IS NULL OR ds.date <= :end_date)
-        ORDER BY ds.date
-        """
-        
-        from sqlalchemy import text
-        results = db.execute(text(query), {
-            "symbol": symbol,
-            "start_date": start,
-            "end_date": end
-        }).fetchall()
-        
-        if not results:
-            # 尝试转换股票代码格式
-            if symbol.startswith('sh') or symbol.startswith('sz') or symbol.startswith('bj'):
-                # 尝试去掉前缀
-                alt_symbol = symbol[2:]
-                results = db.execute(text(query), {
-                    "symbol": alt_symbol,
-                    "start_date": start,
-                    "end_date": end
-                }).fetchall()
-            else:
-                # 尝试添加前缀
-                for prefix in ['sh', 'sz', 'bj']:
-                    alt_symbol = f"{prefix}{symbol}"
-                    results = db.execute(text(query), {
-                        "symbol": alt_symbol,
-                        "start_date": start,
-                        "end_date": end
-                    }).fetchall()
-                    if results:
-                        break
-        
-        if not results:
-            raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found in derived_stock table")
-        
-        # 创建日期到real_change的映射
-        real_change_map = {}
-        used_symbol = None
-        
-        for result in results:
-            used_symbol = result[0]
-            date_str = result[1].isoformat() if result[1] else None
-            real_change_value = float(result[2]) if result[2] is not None else 0
-            if date_str:
-                real_change_map[date_str] = real_change_value
-        
-        # 获取股票信息，用于查找每年对应的指数代码
-        stock_info_query = """
-        SELECT symbol, name, index_2020, index_2021, index_2022, index_2023, index_2024, index_2025
-        FROM stock_info
-        WHERE symbol = :symbol
-        """
-        
-        stock_info = db.execute(text(stock_info_query), {"symbol": used_symbol or symbol}).fetchone()
-        
-        if not stock_info:
-            # 尝试不同的股票代码格式
-            if (used_symbol or symbol).startswith('sh') or (used_symbol or symbol).startswith('sz') or (used_symbol or symbol).startswith('bj'):
-                # 尝试去掉前缀
-                alt_symbol = (used_symbol or symbol)[2:]
-                stock_info = db.execute(text(stock_info_query), {"symbol": alt_symbol}).fetchone()
-            else:
-                # 尝试添加前缀
-                for prefix in ['sh', 'sz', 'bj']:
-                    alt_symbol = f"{prefix}{used_symbol or symbol}"
-                    stock_info = db.execute(text(stock_info_query), {"symbol": alt_symbol}).fetchone()
-                    if stock_info:
-                        break
-        
-        # 为每个日期获取对应的real_change值和对比涨跌值
-        data = []
-        for item in kline_data["data"]:
-            date_str = item["date"]
-            date_obj = date.fromisoformat(date_str)
-            year = date_obj.year
-            
-            # 获取该年份对应的指数代码
-            index_column = f"index_{year}"
-            index_symbol = None
-            reference_name = "无参考"
-            comparative_change = 0.0
-            
-            # 如果映射中有该日期的数据，使用映射中的值，否则使用0
-            real_change = real_change_map.get(date_str, 0)
-            
-            # 如果股票信息存在且年份在2020-2025范围内
-            if stock_info and 2020 <= year <= 2025:
-                # 获取对应年份的指数代码
-                index_idx = year - 2020 + 2  # index_2020在位置2，index_2021在位置3，以此类推
-                if index_idx < len(stock_info) and stock_info[index_idx]:
-                    index_symbol = stock_info[index_idx]
-                    
-                    # 查询指数的real_change数据
-                    index_query = """
-                    SELECT di.symbol, di.date, di.real_change, ii.name
-                    FROM derived_index di
-                    LEFT JOIN index_info ii ON di.symbol = ii.symbol
-                    WHERE di.symbol = :index_symbol AND di.date = :date
-                    """
-                    
-                    index_result = db.execute(text(index_query), {
-                        "index_symbol": index_symbol,
-                        "date": date_obj
-                    }).fetchone()
-                    
-                    if index_result:
-                        index_real_change = float(index_result[2]) if index_result[2] is not None else 0
-                        comparative_change = real_change - index_real_change
-                        reference_name = index_result[3] if index_result[3] else f"指数{index_symbol}"
-            
-            data.append({
-                "date": date_str,
-                "real_change": real_change,
-                "comparative_change": comparative_change,
-                "reference_index": index_symbol or "",
-                "reference_name": reference_name
-            })
-        
-        return {
-            "symbol": used_symbol or symbol,
-            "data": data
-        }
+
+        # 真实涨跌和各年参考指数的对比涨跌在一条查询中按日期关联计算
+        return stock_service.get_stock_real_change(db, symbol, start, end)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -0,0 +1,186 @@
+# backend/benchmarks/bench_async_kline.py
+"""
+K线和列表接口并发吞吐量基准（50个并发客户端）。
+对比同一事件循环上的两种数据访问方式：
+1. 同步会话：原async路由直接调用同步查询，每次查询都阻塞事件循环，并发请求实际逐个执行；
+2. 异步会话：路由通过AsyncSession调用async_queries，等待数据库期间事件循环处理其他请求。
+每个客户端连续发出请求，统计每秒完成的请求数。
+
+默认在临时SQLite文件上运行（同步使用pysqlite，异步使用aiosqlite，无需数据库服务），
+并为每条SQL模拟--latency-ms毫秒的网络往返，近似访问独立数据库服务器的情况；
+也可以用--database-url和--async-database-url指向已有数据的PostgreSQL（此时不生成数据、不模拟延迟）。
+
+运行方式（项目根目录）:
+    python -m backend.benchmarks.bench_async_kline [--latency-ms 5] [--clients 50]
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import await_only
+
+from backend.database import latest_quote
+from backend.models.latest_quote_model import LatestQuote
+from backend.services.stock_service import StockService
+
+SYMBOLS = 200
+YEARS = 2
+CLIENTS = 50
+REQUESTS_PER_CLIENT = 10
+
+stock_service = StockService()
+
+
+def make_dataset(path, symbols=SYMBOLS, years=YEARS, seed=0):
+    """
+    在SQLite文件中生成合成的股票日线数据和latest_quote快照。
+
+    Returns:
+        list: 股票代码列表
+    """
+    rng = np.random.default_rng(seed)
+    start = date(2025, 1, 1) - timedelta(days=365 * years)
+    days = [d for d in (start + timedelta(days=i) for i in range(365 * years)) if d.weekday() < 5]
+    codes = [f"sh{600000 + i}" for i in range(symbols)]
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_stock (symbol TEXT, date DATE, open REAL, close REAL, high REAL, low REAL, "
+            "volume REAL, amount REAL, outstanding_share REAL, turnover REAL, PRIMARY KEY (symbol, date))"
+        )
+        conn.exec_driver_sql("CREATE TABLE stock_info (symbol TEXT PRIMARY KEY, name TEXT)")
+        conn.exec_driver_sql("INSERT INTO stock_info VALUES (?, ?)", [(code, f"股票{code}") for code in codes])
+        for code in codes:
+            close = 10 * np.cumprod(1 + rng.standard_normal(len(days)) / 100)
+            volume = rng.integers(10 ** 5, 10 ** 7, len(days))
+            conn.exec_driver_sql(
+                "INSERT INTO daily_stock VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (code, d, c, c, c * 1.01, c * 0.99, float(v), c * v, 1e8, 0.01)
+                    for d, c, v in zip(days, close.tolist(), volume.tolist())
+                ],
+            )
+    LatestQuote.__table__.create(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO latest_quote (asset_type, symbol, name, last_close, change_percent, volume, last_date) "
+            "SELECT 'stock', d.symbol, i.name, d.close, 0, d.volume, d.date FROM daily_stock d "
+            "JOIN stock_info i ON i.symbol = d.symbol WHERE d.date = (SELECT MAX(date) FROM daily_stock)"
+        )
+    engine.dispose()
+    return codes
+
+
+def add_latency(sync_engine, latency, is_async):
+    """为每条SQL增加固定的往返延迟：同步引擎阻塞线程，异步引擎在greenlet中让出事件循环。"""
+    if latency <= 0:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _delay(*args):
+        if is_async:
+            await_only(asyncio.sleep(latency))
+        else:
+            time.sleep(latency)
+
+
+async def run_clients(handler, clients, requests_per_client):
+    """启动clients个并发客户端，每个客户端连续发出requests_per_client个请求，返回每秒请求数。"""
+    async def client(index):
+        for number in range(requests_per_client):
+            await handler(index * requests_per_client + number)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(clients)))
+    return clients * requests_per_client / (time.perf_counter() - started)
+
+
+async def bench(sync_url, async_url, codes, latency, clients, requests_per_client):
+    """分别以同步会话和异步会话运行K线和列表请求，返回{(场景, 方式): 每秒请求数}。"""
+    connect_args = {"detect_types": sqlite3.PARSE_DECLTYPES} if sync_url.startswith("sqlite") else {}
+    pool_args = {"pool_size": clients, "max_overflow": clients}
+    sync_engine = create_engine(sync_url, connect_args=connect_args, **pool_args)
+    async_engine = create_async_engine(async_url, connect_args=connect_args, **pool_args)
+    add_latency(sync_engine, latency, is_async=False)
+    add_latency(async_engine.sync_engine, latency, is_async=True)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def sync_kline(number):
+        # 与原路由相同：在协程中直接调用同步查询
+        with SyncSession() as db:
+            stock_service.get_stock_kline(db, codes[number % len(codes)])
+
+    async def async_kline(number):
+        async with AsyncSession() as db:
+            await stock_service.get_stock_kline_async(db, codes[number % len(codes)])
+
+    async def sync_list(number):
+        with SyncSession() as db:
+            stock_service.get_stock_list(db, 20, page=number % 5 + 1)
+
+    async def async_list(number):
+        async with AsyncSession() as db:
+            await stock_service.get_stock_list_async(db, 20, page=number % 5 + 1)
+
+    results = {}
+    for scenario, handlers in (("K线", (sync_kline, async_kline)), ("列表", (sync_list, async_list))):
+        for mode, handler in zip(("同步会话", "异步会话"), handlers):
+            # 预热：填充总数缓存和连接池
+            await run_clients(handler, clients, 1)
+            results[(scenario, mode)] = await run_clients(handler, clients, requests_per_client)
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K线和列表接口并发吞吐量基准")
+    parser.add_argument("--clients", type=int, default=CLIENTS, help="并发客户端数")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_CLIENT, help="每个客户端的请求数")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="SQLite模式下每条SQL模拟的往返延迟（毫秒）")
+    parser.add_argument("--database-url", help="同步连接字符串（PostgreSQL），需同时提供--async-database-url")
+    parser.add_argument("--async-database-url", help="异步连接字符串（postgresql+asyncpg）")
+    parser.add_argument("--symbols", nargs="*", help="PostgreSQL模式下请求的股票代码")
+    args = parser.parse_args()
+
+    # 快照水位检查不计入本基准
+    for asset_type in latest_quote.ASSET_SOURCES:
+        latest_quote._last_checked[asset_type] = float("inf")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database_url:
+            sync_url, async_url, latency = args.database_url, args.async_database_url, 0.0
+            codes = args.symbols or ["sh600000"]
+        else:
+            path = os.path.join(directory, "bench.db")
+            codes = make_dataset(path)
+            sync_url, async_url = f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+            latency = args.latency_ms / 1000
+
+        results = asyncio.run(bench(sync_url, async_url, codes, latency, args.clients, args.requests))
+
+    print(f"并发吞吐量基准（{args.clients}个并发客户端，每个{args.requests}个请求，"
+          f"模拟SQL延迟{latency * 1000:.1f} ms）")
+    print(f"{'场景':<6}{'同步会话 (req/s)':>18}{'异步会话 (req/s)':>18}{'提升':>8}")
+    for scenario in ("K线", "列表"):
+        sync_rps = results[(scenario, "同步会话")]
+        async_rps = results[(scenario, "异步会话")]
+        print(f"{scenario:<6}{sync_rps:>18.1f}{async_rps:>18.1f}{async_rps / sync_rps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
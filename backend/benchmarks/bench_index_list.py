@@ -0,0 +1,177 @@
+# backend/benchmarks/bench_index_list.py
+"""
+指数列表查询性能基准。
+合成500个指数、1/5/10年的日线数据，对比：
+1. 原get_index_list：对daily_index全表计算first_value窗口函数后DISTINCT、排序、分页；
+2. 按代码逐个定位最新一行：每个代码沿(symbol, date)主键索引倒序取第一行，用于生成快照；
+3. 现get_index_list：读取latest_quote快照（含新交易日水位检查和总数计算，不使用总数缓存）。
+原查询耗时随历史长度线性增长，后两者只与指数个数有关。
+
+运行方式（项目根目录，使用内存SQLite，无需数据库服务）:
+    python -m backend.benchmarks.bench_index_list
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from backend.database import latest_quote
+from backend.database.count_cache import invalidate_counts
+from backend.database.queries import get_index_list
+from backend.models.latest_quote_model import LatestQuote, LatestQuoteState
+
+SYMBOLS = 500
+YEARS = (1, 5, 10)
+PAGE_SIZE = 20
+REPEAT = 3
+
+# 原get_index_list的第一页查询（页码分页；ORDER BY加表别名以兼容SQLite）
+LEGACY_QUERY = f"""
+SELECT DISTINCT di.symbol,
+       COALESCE(ii.name, 'N/A') as name,
+       first_value(di.close) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as latest_price,
+       first_value(di.change_rate) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as change_rate,
+       first_value(di.volume) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as volume
+FROM daily_index di
+LEFT JOIN index_info ii ON di.symbol = ii.symbol
+ORDER BY di.symbol ASC LIMIT {PAGE_SIZE} OFFSET 0
+"""
+LEGACY_COUNT_QUERY = "SELECT COUNT(DISTINCT di.symbol) FROM daily_index di"
+
+# 按代码逐个定位最新一行：每列都是沿(symbol, date)主键索引倒序取第一行的标量子查询，
+# 写成标量子查询而不是JOIN，避免规划器改为扫描daily_index
+_LATEST = "(SELECT d.{column} FROM daily_index d WHERE d.symbol = ii.symbol ORDER BY d.date DESC LIMIT 1)"
+LATEST_ROW_QUERY = f"""
+SELECT ii.symbol, ii.name,
+       {_LATEST.format(column="close")} AS close,
+       {_LATEST.format(column="change_rate")} AS change_rate,
+       {_LATEST.format(column="volume")} AS volume,
+       {_LATEST.format(column="date")} AS date
+FROM index_info ii
+"""
+
+
+def make_engine():
+    """创建内存SQLite引擎（单连接，保证各会话看到同一份数据）。"""
+    return create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES},
+        poolclass=StaticPool,
+    )
+
+
+def make_dataset(engine, years, symbols=SYMBOLS, seed=0):
+    """
+    生成合成的指数日线数据（每个工作日一行）并建立与生产环境一致的索引。
+
+    Returns:
+        int: daily_index行数
+    """
+    rng = np.random.default_rng(seed)
+    start = date(2025, 1, 1) - timedelta(days=365 * years)
+    days = [d for d in (start + timedelta(days=i) for i in range(365 * years)) if d.weekday() < 5]
+    codes = [f"{i:06d}" for i in range(symbols)]
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_index (symbol TEXT, date DATE, open REAL, close REAL, high REAL, low REAL, "
+            "volume INTEGER, amount REAL, amplitude REAL, change_rate REAL, change_amount REAL, "
+            "turnover_rate REAL, PRIMARY KEY (symbol, date))"
+        )
+        conn.exec_driver_sql("CREATE TABLE index_info (symbol TEXT PRIMARY KEY, name TEXT)")
+        conn.exec_driver_sql("CREATE INDEX idx_daily_index_date ON daily_index (date)")
+        conn.exec_driver_sql(
+            "INSERT INTO index_info VALUES (?, ?)", [(code, f"指数{code}") for code in codes]
+        )
+        for code in codes:
+            change_rate = rng.standard_normal(len(days))
+            close = 1000 * np.cumprod(1 + change_rate / 100)
+            volume = rng.integers(10 ** 8, 10 ** 10, len(days))
+            conn.exec_driver_sql(
+                "INSERT INTO daily_index VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (code, d, c, c, c * 1.01, c * 0.99, int(v), c * v, 2.0, r, c * r / 100, 1.0)
+                    for d, c, v, r in zip(days, close.tolist(), volume.tolist(), change_rate.tolist())
+                ],
+            )
+    LatestQuote.__table__.create(bind=engine)
+    # 水位检查读取快照全量重建的时间
+    LatestQuoteState.__table__.create(bind=engine)
+    return len(days) * symbols
+
+
+def build_snapshot(engine):
+    """按代码定位最新一行并写入latest_quote快照。"""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM latest_quote WHERE asset_type = 'index'"))
+        conn.execute(text(
+            "INSERT INTO latest_quote (asset_type, symbol, name, last_close, change_percent, volume, last_date) "
+            "SELECT 'index', symbol, name, close, change_rate, volume, date FROM (" + LATEST_ROW_QUERY + ")"
+        ))
+
+
+def legacy_first_page(engine):
+    """原实现：计数 + 窗口函数查询第一页。"""
+    with engine.connect() as conn:
+        conn.execute(text(LEGACY_COUNT_QUERY)).scalar()
+    return pd.read_sql(text(LEGACY_QUERY), engine)
+
+
+def latest_rows(engine):
+    """按代码逐个定位最新一行。"""
+    return pd.read_sql(text(LATEST_ROW_QUERY), engine)
+
+
+def snapshot_first_page(engine):
+    """现实现：每次都做水位检查并重新计数，测得的是不命中任何进程内缓存时的耗时。"""
+    latest_quote._last_checked.clear()
+    invalidate_counts("index")
+    with Session(engine) as db:
+        return get_index_list(db, PAGE_SIZE, page=1)
+
+
+def _best_ms(func, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _check_same(legacy, snapshot):
+    """校验两种实现第一页的代码、价格、涨跌幅和成交量一致。"""
+    items = snapshot["items"]
+    assert list(legacy["symbol"]) == [item["symbol"] for item in items], "指数列表代码不一致"
+    assert np.allclose(legacy["latest_price"], [item["current_price"] for item in items]), "最新价不一致"
+    assert np.allclose(legacy["change_rate"], [item["change_rate"] for item in items]), "涨跌幅不一致"
+    assert np.allclose(legacy["volume"], [item["volume"] for item in items]), "成交量不一致"
+    assert snapshot["total"] == SYMBOLS, "指数总数不一致"
+
+
+def main():
+    print(f"指数列表第一页基准（{SYMBOLS}个指数，每页{PAGE_SIZE}条，取{REPEAT}次最好成绩）")
+    print(f"{'历史':<6}{'日线行数':>12}{'原窗口函数 (ms)':>18}{'逐代码定位 (ms)':>18}{'快照读取 (ms)':>16}{'加速比':>10}")
+    for years in YEARS:
+        engine = make_engine()
+        rows = make_dataset(engine, years)
+        build_snapshot(engine)
+        _check_same(legacy_first_page(engine), snapshot_first_page(engine))
+
+        legacy = _best_ms(legacy_first_page, engine)
+        lookup = _best_ms(latest_rows, engine)
+        snapshot = _best_ms(snapshot_first_page, engine)
+        print(f"{years:>2}年{rows:>16,}{legacy:>18.1f}{lookup:>18.1f}{snapshot:>16.1f}{legacy / snapshot:>9.0f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ class Settings(BaseSettings):
         PROJECT_NAME: 项目名称
         API_V1_STR: API路径前缀
         DATABASE_URL: 数据库连接URL
+        ASYNC_DATABASE_URL: 异步引擎（asyncpg）使用的数据库连接URL
         LOG_LEVEL: 日志级别
 
     Examples:
@@ -70,6 +71,32 @@ class Settings(BaseSettings):
     
     DATABASE_URL: str = get_database_url()
 
+    @staticmethod
+    def get_async_database_url(db_url: str):
+        """
+        获取异步引擎使用的数据库连接字符串
+        优先使用环境变量ASYNC_DATABASE_URL，否则将DATABASE_URL的驱动替换为asyncpg
+        """
+        async_url = os.getenv("ASYNC_DATABASE_URL")
+        if async_url:
+            return async_url
+        scheme, separator, rest = db_url.partition("://")
+        if scheme.split("+")[0] in ("postgresql", "postgres"):
+            return f"postgresql+asyncpg{separator}{rest}"
+        return db_url
+
+    ASYNC_DATABASE_URL: str = get_async_database_url(DATABASE_URL)
+
+    # 数据库连接池设置（同步和异步引擎各自使用一个连接池，每个工作进程分别创建）：
+    # 连接池大小、允许的溢出连接数、等待连接的超时时间（秒）、连接回收时间（秒，-1为不回收）、
+    # 借出前是否检测连接可用（pre-ping）、单条语句的超时时间（毫秒，0为不限制）
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+    DB_STATEMENT_TIMEOUT: int = int(os.getenv("DB_STATEMENT_TIMEOUT", "0"))
+
     # 日志设置
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
@@ -80,6 +107,48 @@ class Settings(BaseSettings):
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
 
+    # 最新行情快照设置：检查日线表是否有新交易日的最小间隔（秒）
+    LATEST_QUOTE_CHECK_INTERVAL: int = int(os.getenv("LATEST_QUOTE_CHECK_INTERVAL", "60"))
+
+    # K线流式输出（format=ndjson）设置：每次从服务端游标读取的行数
+    KLINE_STREAM_CHUNK_SIZE: int = int(os.getenv("KLINE_STREAM_CHUNK_SIZE", "1000"))
+
+    # 日线历史缓存设置：缓存的日线数组总字节数上限（默认256MB）
+    KLINE_CACHE_MAX_BYTES: int = int(os.getenv("KLINE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # 日线导出文件设置：导出根目录、检查新版本的最小间隔（秒）和导出时每次读取的行数
+    KLINE_STORE_DIR: str = os.getenv("KLINE_STORE_DIR", "data/kline_store")
+    KLINE_STORE_CHECK_INTERVAL: int = int(os.getenv("KLINE_STORE_CHECK_INTERVAL", "60"))
+    KLINE_STORE_CHUNK_SIZE: int = int(os.getenv("KLINE_STORE_CHUNK_SIZE", "200000"))
+
+    # 周线、月线、季线缓存设置：缓存的(资产类型, 代码, 周期)组合数上限
+    KLINE_PERIOD_CACHE_SIZE: int = int(os.getenv("KLINE_PERIOD_CACHE_SIZE", "512"))
+
+    # 技术指标缓存设置：缓存的(资产类型, 代码, 周期, 指标, 参数)组合数上限
+    INDICATOR_CACHE_SIZE: int = int(os.getenv("INDICATOR_CACHE_SIZE", "2048"))
+
+    # 批量K线接口设置：单次请求最多的代码数
+    KLINE_BATCH_MAX_SYMBOLS: int = int(os.getenv("KLINE_BATCH_MAX_SYMBOLS", "100"))
+
+    # 列表总数缓存设置：缓存的(资产类型, 搜索关键字)组合数上限；
+    # 搜索关键字长度不超过该值时使用查询计划器的估算行数
+    COUNT_CACHE_SIZE: int = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+    COUNT_ESTIMATE_MAX_SEARCH_LENGTH: int = int(os.getenv("COUNT_ESTIMATE_MAX_SEARCH_LENGTH", "1"))
+
+    # 上游数据源（akshare）调用设置：专用线程池的线程数、单次调用的超时时间（秒，包括排队时间）
+    UPSTREAM_MAX_WORKERS: int = int(os.getenv("UPSTREAM_MAX_WORKERS", "8"))
+    UPSTREAM_TIMEOUT: float = float(os.getenv("UPSTREAM_TIMEOUT", "20"))
+
+    # akshare数据集快照缓存设置：默认有效期（秒）、过期后仍可返回旧快照并后台刷新的时长（秒）、最多缓存的快照数
+    UPSTREAM_CACHE_TTL: float = float(os.getenv("UPSTREAM_CACHE_TTL", "30"))
+    UPSTREAM_CACHE_MAX_STALE: float = float(os.getenv("UPSTREAM_CACHE_MAX_STALE", "300"))
+    UPSTREAM_CACHE_MAX_ENTRIES: int = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "256"))
+
+    # 首页行情数据后台刷新设置：是否启用、交易时段和其他时间的刷新间隔（秒）
+    MARKET_REFRESH_ENABLED: bool = os.getenv("MARKET_REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+    MARKET_REFRESH_TRADING_INTERVAL: int = int(os.getenv("MARKET_REFRESH_TRADING_INTERVAL", "30"))
+    MARKET_REFRESH_IDLE_INTERVAL: int = int(os.getenv("MARKET_REFRESH_IDLE_INTERVAL", "900"))
+
     class Config:
         """Pydantic配置类"""
         case_sensitive = True
@@ -0,0 +1,59 @@
+# backend/database/async_queries.py
+"""
+此模块提供queries.py中列表、详情和K线查询以及kline_batch.py中批量K线查询的异步版本，
+供async路由通过AsyncSession调用。
+每个函数通过AsyncSession.run_sync在greenlet中执行对应的同步查询：SQL语句、快照检查、
+总数缓存、搜索索引和列式序列化逻辑与同步版本完全一致，而数据库I/O由asyncpg完成，
+等待结果期间事件循环可以处理其他请求。
+
+同步查询中持有锁的代码段在异步环境下可能跨越数据库等待，因此这些锁都以非阻塞方式获取，
+不会因同一线程上的其他协程持有锁而卡住事件循环。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import kline_batch, queries
+
+
+def _run_sync(func):
+    """
+    将以Session为第一个参数的同步查询函数包装为以AsyncSession为第一个参数的协程函数。
+
+    Args:
+        func (callable): 同步查询函数
+
+    Returns:
+        callable: 协程函数，参数与func相同
+    """
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(func, *args, **kwargs)
+    return wrapper
+
+
+get_latest_quote_list = _run_sync(queries.get_latest_quote_list)
+get_stock_list = _run_sync(queries.get_stock_list)
+get_index_list = _run_sync(queries.get_index_list)
+
+get_stock_kline_data = _run_sync(queries.get_stock_kline_data)
+get_stock_kline_columns = _run_sync(queries.get_stock_kline_columns)
+get_stock_info = _run_sync(queries.get_stock_info)
+get_stock_real_change_data = _run_sync(queries.get_stock_real_change_data)
+
+get_index_kline_data = _run_sync(queries.get_index_kline_data)
+get_index_kline_columns = _run_sync(queries.get_index_kline_columns)
+get_index_info = _run_sync(queries.get_index_info)
+
+get_etf_kline_data = _run_sync(queries.get_etf_kline_data)
+get_etf_kline_columns = _run_sync(queries.get_etf_kline_columns)
+get_etf_info = _run_sync(queries.get_etf_info)
+
+get_kline_table = _run_sync(queries.get_kline_table)
+get_kline_indicators = _run_sync(queries.get_kline_indicators)
+
+get_kline_batch_frames = _run_sync(kline_batch.get_kline_batch_frames)
+get_info_names = _run_sync(kline_batch.get_info_names)
@@ -1,23 +1,40 @@
 # backend/database/connection.py
 """
 此模块负责建立和管理与PostgreSQL数据库的连接。
-提供了数据库会话和引擎的创建功能。
+提供了数据库会话和引擎的创建功能，包括同步（psycopg2）和异步（asyncpg）两套引擎。
 Authors: hovi.hyw & AI
 Date: 2025-03-12
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from backend.config.settings import settings
+from backend.database.pool_metrics import async_pool_metrics, engine_options, sync_pool_metrics
 
-# 创建数据库引擎
-engine = create_engine(settings.DATABASE_URL)
+# 创建数据库引擎，连接池参数由DB_POOL_*配置，连接池事件计入运行指标
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=sync_pool_metrics.pool_class(QueuePool),
+    **engine_options(),
+)
+sync_pool_metrics.attach(engine)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步数据库引擎和会话工厂，供async路由使用，查询等待期间不阻塞事件循环
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=async_pool_metrics.pool_class(AsyncAdaptedQueuePool),
+    **engine_options(is_async=True),
+)
+async_pool_metrics.attach(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -41,4 +58,23 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """
+    获取异步数据库会话。
+    创建一个新的异步数据库会话，并在使用完毕后关闭它。
+
+    Yields:
+        AsyncSession: SQLAlchemy异步会话对象
+
+    Examples:
+        >>> from fastapi import Depends
+        >>> from backend.database.connection import get_async_db
+        >>> async def my_endpoint(db: AsyncSession = Depends(get_async_db)):
+        >>>     # 使用异步数据库会话
+        >>>     pass
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
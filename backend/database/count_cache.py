@@ -0,0 +1,132 @@
+# backend/database/count_cache.py
+"""
+此模块为列表接口提供总数缓存。
+同一资产类型、同一搜索关键字的总数只在快照更新后才会变化，因此按(资产类型, 规范化搜索关键字)缓存，
+各进程检查到日线表水位变化（快照随之更新，无论由哪个进程刷新）时按资产类型失效；过于宽泛的搜索（如只有一个字符）几乎匹配全表，
+改用查询计划器的估算行数，并在响应中标明total是否精确。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# (asset_type, search, search_name) -> (total, exact)，按最近使用顺序排列
+_counts = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_search(search: str | None):
+    """
+    规范化搜索关键字：去掉首尾空白，空字符串视为无搜索。
+
+    Args:
+        search (str, optional): 原始搜索关键字
+
+    Returns:
+        str: 规范化后的关键字，无搜索时返回None
+    """
+    if search is None:
+        return None
+    search = str(search).strip()
+    return search or None
+
+
+def is_broad_search(search: str | None):
+    """
+    判断搜索是否过于宽泛（关键字长度不超过COUNT_ESTIMATE_MAX_SEARCH_LENGTH）。
+
+    Args:
+        search (str, optional): 规范化后的搜索关键字
+
+    Returns:
+        bool: 是否应使用估算行数
+    """
+    return search is not None and len(search) <= settings.COUNT_ESTIMATE_MAX_SEARCH_LENGTH
+
+
+def estimate_count(db: Session, query: str, params: dict):
+    """
+    使用EXPLAIN获取查询计划器对结果行数的估算，不实际执行查询。
+
+    Args:
+        db (Session): 数据库会话
+        query (str): 不含ORDER BY/LIMIT的SELECT语句
+        params (dict): 绑定参数
+
+    Returns:
+        int: 估算行数，无法估算时返回None
+    """
+    try:
+        plan = db.execute(text("EXPLAIN (FORMAT JSON) " + query), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug("计划器估算失败，改用精确计数: %s", e)
+        db.rollback()
+        return None
+
+
+def get_cached_count(db: Session, asset_type: str, search: str | None, search_name: bool,
+                     from_clause: str, filters: list, params: dict, allow_estimate: bool = True):
+    """
+    获取列表总数，优先读取缓存。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+        search (str, optional): 规范化后的搜索关键字
+        search_name (bool): 搜索是否匹配名称（影响结果，因此作为缓存键的一部分）
+        from_clause (str): FROM及WHERE子句
+        filters (list): 附加的过滤条件（SQL片段，以AND连接）
+        params (dict): 绑定参数
+        allow_estimate (bool): 宽泛搜索时是否允许使用估算值，默认为True
+
+    Returns:
+        tuple: (total, exact)，exact为False表示total是估算值
+    """
+    key = (asset_type, search, search_name)
+    with _lock:
+        if key in _counts:
+            _counts.move_to_end(key)
+            return _counts[key]
+
+    where = "".join(f" AND {condition}" for condition in filters)
+    total, exact = None, True
+    if allow_estimate and is_broad_search(search):
+        total = estimate_count(db, "SELECT 1 " + from_clause + where, params)
+        exact = total is None
+    if total is None:
+        total = db.execute(text("SELECT COUNT(*) " + from_clause + where), params).scalar() or 0
+
+    with _lock:
+        _counts[key] = (total, exact)
+        _counts.move_to_end(key)
+        while len(_counts) > settings.COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return total, exact
+
+
+def invalidate_counts(asset_type: str | None = None):
+    """
+    使总数缓存失效。
+
+    Args:
+        asset_type (str, optional): 资产类型，为None时清空全部缓存
+    """
+    with _lock:
+        if asset_type is None:
+            _counts.clear()
+            return
+        for key in [k for k in _counts if k[0] == asset_type]:
+            del _counts[key]
@@ -0,0 +1,198 @@
+# backend/database/indicator_cache.py
+"""
+此模块在进程内缓存K线技术指标。
+EMA、MACD等递推指标依赖全部历史，只对请求的日期范围计算会得到不同的结果，
+因此每个指标都在完整历史上计算，按(资产类型, 代码, 周期, 指标, 参数)缓存，
+请求时按日期二分查找对齐到返回的K线（包括按日期范围筛选、降采样后的K线），重复加载图表不再重复计算。
+
+每个缓存项同时保存处理完倒数第二根K线后的递推状态（EMA等的最后一个值、滑动窗口缓冲区）。
+本进程检查到日线表水位变化（无论快照由哪个进程刷新）后缓存项只标记为需要追加，下次请求时从倒数第二根K线起读取少量新数据，
+从保存的状态逐根递推，每根新K线的计算量与历史长度无关（最后一根K线可能是同一交易日分批导入的，
+周线、月线的最后一根也会随新交易日变化，因此总是重新计算）。
+只有历史被修正时才在完整历史上重新计算：读取到的倒数第二根K线与缓存不一致，
+或者任一进程执行了快照全量重建（python -m backend.database.latest_quote --full）时。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.utils.indicators import advance_indicator, compute_indicator_state, indicator_inputs, INPUT_FIELDS
+
+# (资产类型, 代码, 周期, 指标名称, 参数) -> IndicatorSeries，按最近使用顺序排列
+_series = OrderedDict()
+# 资产类型 -> 本进程观察到的日线表水位，缓存项记录的水位与之不同时需要追加新K线
+_generations = {}
+_lock = threading.Lock()
+
+
+class IndicatorSeries(NamedTuple):
+    """
+    一个指标在完整历史上的计算结果及递推状态。
+
+    Attributes:
+        dates (numpy.ndarray): 按升序排列的K线日期（datetime64[D]）
+        values (dict): 输出列名 -> 与dates等长的float64数组
+        state (dict): 处理完倒数第二根K线后的递推状态（K线不足两根时为初始状态）
+        anchor (tuple): 倒数第二根K线的(close, high, low)，用于判断历史是否被修正；K线不足两根时为None
+        generation (tuple): 计算时本进程观察到的日线表水位，尚未检查过时为None
+    """
+    dates: np.ndarray
+    values: dict
+    state: dict
+    anchor: tuple | None
+    generation: tuple | None
+
+
+def _to_days(values):
+    """将日期序列转换为datetime64[D]数组。"""
+    return pd.to_datetime(pd.Series(values)).to_numpy().astype("datetime64[D]")
+
+
+def _anchor(inputs, position):
+    """position处K线的指标输入字段，position < 0时为None。"""
+    if position < 0:
+        return None
+    return tuple(float(inputs[column][position]) for column in INPUT_FIELDS)
+
+
+def _same_bar(a, b):
+    """比较两根K线的指标输入字段（NaN视为相等）。"""
+    return np.array_equal(np.array(a), np.array(b), equal_nan=True)
+
+
+def _compute(history: pd.DataFrame, spec, generation):
+    """在完整历史上计算指标。"""
+    inputs = indicator_inputs(history)
+    values, state = compute_indicator_state(inputs, spec)
+    return IndicatorSeries(_to_days(history["date"]), values, state, _anchor(inputs, len(history) - 2), generation)
+
+
+def _advance(series: IndicatorSeries, spec, recent: pd.DataFrame, generation):
+    """
+    从缓存的递推状态追加新K线。recent为从倒数第二根K线（含）开始的数据；
+    倒数第二根K线缺失或与缓存不一致（历史被修正）时返回None，由调用方在完整历史上重新计算。
+    """
+    if len(recent) < 2:
+        return None
+    inputs = indicator_inputs(recent)
+    days = _to_days(recent["date"])
+    if days[0] != series.dates[-2] or not _same_bar(_anchor(inputs, 0), series.anchor):
+        return None
+
+    # 缓存的最后一根K线连同新K线一起从倒数第二根K线之后的状态重新递推
+    bars = {column: values[1:] for column, values in inputs.items()}
+    state, head = advance_indicator(spec, series.state, {column: values[:-1] for column, values in bars.items()})
+    _, tail = advance_indicator(spec, state, {column: values[-1:] for column, values in bars.items()})
+    values = {name: np.concatenate([previous[:-1], head[name], tail[name]])
+              for name, previous in series.values.items()}
+    anchor = _anchor(inputs, len(recent) - 2) if len(recent) > 2 else series.anchor
+    return IndicatorSeries(np.concatenate([series.dates[:-1], days[1:]]), values, state, anchor, generation)
+
+
+def _align(series: IndicatorSeries, days):
+    """按日期对齐指标值，缓存中没有的日期为NaN。"""
+    positions = np.searchsorted(series.dates, days)
+    clipped = np.minimum(positions, max(len(series.dates) - 1, 0))
+    matched = series.dates[clipped] == days if len(series.dates) else np.zeros(len(days), dtype=bool)
+    aligned = {}
+    for name, values in series.values.items():
+        result = np.full(len(days), np.nan)
+        result[matched] = values[clipped[matched]]
+        aligned[name] = result
+    return aligned
+
+
+def get_indicators(db: Session, asset_type: str, symbol: str, period: str, specs, dates, loader):
+    """
+    获取与dates对齐的指标值。未缓存的指标通过loader读取完整历史后计算；
+    本进程观察到的日线表水位变化后或请求的日期晚于缓存的最后日期时，从递推状态追加新K线。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+        symbol (str): 日线表中的代码
+        period (str): K线周期
+        specs (iterable): IndicatorSpec列表
+        dates (iterable): 返回的K线日期（升序）
+        loader (callable): loader(db, symbol, start_date=None)返回按日期升序排列的K线，
+            指定start_date时只返回该日期（含）之后的K线（周期K线为与之有交集的周期）
+
+    Returns:
+        dict: 输出列名 -> 与dates等长的float64数组，按specs的顺序排列
+    """
+    days = _to_days(dates)
+    through = days.max() if len(days) else None
+    with _lock:
+        generation = _generations.get(asset_type)
+    history = None
+    # 倒数第二根K线的日期 -> 从该日期开始的K线，同一次请求的多个指标共用
+    recent = {}
+    result = {}
+    for spec in specs:
+        key = (asset_type, symbol, period, spec.name, spec.params)
+        with _lock:
+            series = _series.get(key)
+            if series is not None:
+                _series.move_to_end(key)
+
+        if series is not None and (series.generation != generation
+                                   or (through is not None and len(series.dates) and through > series.dates[-1])):
+            if series.anchor is None:
+                series = None
+            else:
+                since = series.dates[-2]
+                if since not in recent:
+                    recent[since] = loader(db, symbol, since.astype(object))
+                series = _advance(series, spec, recent[since], generation)
+
+        if series is None:
+            if history is None:
+                # 同一次请求的多个指标共用一次完整历史读取
+                history = loader(db, symbol)
+            series = _compute(history, spec, generation)
+
+        if len(series.dates):
+            with _lock:
+                _series[key] = series
+                _series.move_to_end(key)
+                while len(_series) > settings.INDICATOR_CACHE_SIZE:
+                    _series.popitem(last=False)
+
+        result.update(_align(series, days))
+    return result
+
+
+def expire_indicators(asset_type: str, watermark: tuple):
+    """
+    记录本进程观察到的日线表水位，水位不同的缓存项下次请求时从递推状态追加新K线。
+
+    Args:
+        asset_type (str): 资产类型
+        watermark (tuple): 本进程新观察到的日线表水位
+    """
+    with _lock:
+        _generations[asset_type] = watermark
+
+
+def invalidate_indicators(asset_type: str | None = None, symbol: str | None = None):
+    """
+    使指标缓存失效，下次请求时在完整历史上重新计算（历史数据被修正时调用）。
+
+    Args:
+        asset_type (str, optional): 资产类型，为None时清空全部缓存
+        symbol (str, optional): 代码，为None时清除该资产类型的全部代码
+    """
+    with _lock:
+        if asset_type is None:
+            _series.clear()
+            return
+        for key in [k for k in _series if k[0] == asset_type and symbol in (None, k[1])]:
+            del _series[key]
@@ -0,0 +1,174 @@
+# backend/database/kline_batch.py
+"""
+此模块提供多代码批量查询K线数据的功能。
+逐个调用K线接口对比多只ETF时，每个代码都要各自执行日线查询、参考指数对齐和信息表查询；
+批量查询按资产类型分组，每张日线表只执行一次symbol = ANY(...)查询，名称也按信息表一次查出，
+参考指数序列由进程内缓存共享，按代码分组后逐个对齐。
+输出的每个代码都带有资产类型、名称和参考指数，数值缺失统一为null，可直接编码为JSON。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import date
+from typing import NamedTuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.database.latest_quote import ASSET_SOURCES
+from backend.database.queries import (
+    build_kline_query,
+    get_etf_reference,
+    get_index_reference,
+    _attach_reference_change,
+)
+from backend.utils.kline_sampling import downsample_kline, OHLC
+from backend.utils.kline_serializer import (
+    frame_to_records,
+    frame_to_columns,
+    nullable_schema,
+    DATE_STR,
+    STOCK_KLINE_SCHEMA,
+    INDEX_KLINE_SCHEMA,
+    ETF_KLINE_SCHEMA,
+    STOCK_KLINE_COLUMNS,
+    INDEX_KLINE_COLUMNS,
+    ETF_KLINE_COLUMNS,
+)
+
+
+def _json_schema(schema):
+    """直接编码为JSON的records字段定义：数值缺失为null，日期为YYYY-MM-DD字符串。"""
+    return tuple((key, DATE_STR if key == "date" else kind) for key, kind in nullable_schema(schema))
+
+
+# 资产类型 -> (records字段定义, 列式字段定义, 参考指数函数)；股票没有参考指数
+KLINE_BATCH_SOURCES = {
+    "stock": (_json_schema(STOCK_KLINE_SCHEMA), STOCK_KLINE_COLUMNS, None),
+    "index": (_json_schema(INDEX_KLINE_SCHEMA), INDEX_KLINE_COLUMNS, get_index_reference),
+    "etf": (_json_schema(ETF_KLINE_SCHEMA), ETF_KLINE_COLUMNS, get_etf_reference),
+}
+
+
+class BatchTarget(NamedTuple):
+    """
+    批量请求中的一个代码。
+
+    Attributes:
+        key (str): 请求中的代码写法，作为结果的键
+        asset_type (str): 资产类型
+        daily_symbol (str): 日线表中的代码写法
+        info_symbol (str): 信息表中的代码写法
+    """
+    key: str
+    asset_type: str
+    daily_symbol: str
+    info_symbol: str
+
+
+def group_targets(targets):
+    """
+    按资产类型和日线表代码分组（不同写法可能指向同一代码，只查询一次）。
+
+    Args:
+        targets (list): BatchTarget列表
+
+    Returns:
+        dict: 资产类型 -> {日线表代码: [BatchTarget, ...]}，保持请求顺序
+    """
+    groups = {}
+    for target in targets:
+        groups.setdefault(target.asset_type, {}).setdefault(target.daily_symbol, []).append(target)
+    return groups
+
+
+def get_kline_batch_frames(db: Session, asset_type: str, symbols: list, start_date: date = None,
+                           end_date: date = None, max_points: int | None = None, sampling: str = OHLC):
+    """
+    用一次查询获取同一资产类型多个代码的K线原始数据，并对齐参考指数涨跌幅。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，stock、index或etf
+        symbols (list): 日线表中的代码列表
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期
+        max_points (int, optional): 每个代码的最大数据点数，超过时降采样
+        sampling (str): 降采样方式，ohlc或lttb
+
+    Returns:
+        dict: 代码 -> 按日期升序排列的DataFrame，没有数据的代码不在结果中
+    """
+    query, params = build_kline_query(asset_type, list(symbols), start_date, end_date)
+    kline_data = pd.read_sql(text(query), db.bind, params=params)
+
+    _, _, reference = KLINE_BATCH_SOURCES[asset_type]
+    frames = {}
+    for symbol, frame in kline_data.groupby("symbol", sort=False):
+        frame = frame.reset_index(drop=True)
+        if reference is not None:
+            frame = _attach_reference_change(db, frame, reference(symbol)[0])
+        frames[symbol] = downsample_kline(frame, max_points, sampling)
+    return frames
+
+
+def get_info_names(db: Session, asset_type: str, symbols: list):
+    """
+    用一次查询获取多个代码在信息表中的名称。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+        symbols (list): 信息表中的代码列表
+
+    Returns:
+        dict: 代码 -> 名称
+    """
+    symbols = [symbol for symbol in symbols if symbol]
+    if not symbols:
+        return {}
+    info_table = ASSET_SOURCES[asset_type]["info_table"]
+    rows = db.execute(
+        text(f"SELECT symbol, name FROM {info_table} WHERE symbol = ANY(:symbols)"),
+        {"symbols": symbols},
+    ).fetchall()
+    return {row.symbol: row.name for row in rows}
+
+
+def kline_payload(target: BatchTarget, frame: pd.DataFrame, name: str | None, response_format: str = "records"):
+    """
+    将一个代码的K线数据转换为批量接口的结果项。
+
+    Args:
+        target (BatchTarget): 请求中的代码
+        frame (pandas.DataFrame): 该代码的K线数据（指数和ETF已对齐参考指数）
+        name (str, optional): 名称
+        response_format (str): records（逐日对象列表）或columnar（每个字段一个数组）
+
+    Returns:
+        dict: 包含资产类型、代码、名称、参考指数和K线数据的字典
+    """
+    schema, columns_schema, reference = KLINE_BATCH_SOURCES[target.asset_type]
+    symbol = target.daily_symbol
+    reference_index, reference_name = reference(symbol) if reference is not None else (None, None)
+    columns = {"reference_change_rate": "ref_change_rate"}
+
+    if response_format == "columnar":
+        data = frame_to_columns(frame, columns_schema, columns=columns)
+    else:
+        data = frame_to_records(
+            frame,
+            schema,
+            constants={"symbol": symbol, "reference_index": reference_index, "reference_name": reference_name},
+            columns=columns,
+        )
+
+    return {
+        "asset_type": target.asset_type,
+        "symbol": symbol,
+        "name": name,
+        "reference_index": reference_index,
+        "reference_name": reference_name,
+        "data": data,
+    }
@@ -0,0 +1,212 @@
+# backend/database/kline_cache.py
+"""
+此模块在进程内缓存各代码的完整日线历史，供股票、指数和ETF的K线查询共用。
+热门代码（000001、399001、510300等）每次加载图表都要从daily_stock、daily_index、daily_etf重新读取数千行，
+这里把每个代码的完整历史保存为连续的NumPy数组：日期为int32日序号（1970-01-01起的天数），数值字段为float64，
+任意日期范围的请求通过二分查找切片得到，不再访问日线表。
+- 缓存按字节数计量，总量超过KLINE_CACHE_MAX_BYTES时淘汰最久未使用的代码；
+- 没有数据的代码不缓存，避免无效代码的请求占用缓存；
+- 本进程检查到日线表水位变化（出现新交易日或同一交易日分批导入）时按资产类型失效，与快照由哪个进程刷新无关；
+  读取期间缓存被失效时，读到的历史只返回给本次请求，不写入缓存；
+- 命中、未命中、淘汰次数及当前字节数通过metrics()提供。
+参考指数涨跌幅不在缓存中，由调用方在切片结果上对齐（参考指数序列另有缓存）。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+
+# 不转换为float64数组的字段：代码为常量，日期保存为日序号
+_KEY_FIELDS = ("symbol", "date")
+
+
+class KlineSeries(NamedTuple):
+    """
+    一个代码的完整日线历史（列式，只读）。
+
+    Attributes:
+        days (numpy.ndarray): 按升序排列的日期（int32，1970-01-01起的天数）
+        columns (dict): 字段名 -> 与days等长的float64数组，按查询结果的字段顺序排列
+        nbytes (int): 数组占用的字节数
+    """
+    days: np.ndarray
+    columns: dict
+    nbytes: int
+
+
+def _to_series(df: pd.DataFrame):
+    """将按日期升序排列的日线查询结果转换为列式数组。"""
+    days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype("int32")
+    columns = {}
+    for column in df.columns:
+        if column in _KEY_FIELDS:
+            continue
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+        # 缓存在请求之间共享，设为只读避免被意外修改
+        values.flags.writeable = False
+        columns[column] = values
+    days.flags.writeable = False
+    return KlineSeries(days, columns, days.nbytes + sum(values.nbytes for values in columns.values()))
+
+
+def _day_number(value):
+    """将日期转换为日序号。"""
+    return int(np.datetime64(value, "D").astype("int64"))
+
+
+def slice_history(symbol: str, days, columns: dict, start_date=None, end_date=None, open_ended: bool = False):
+    """
+    按日期范围从列式日线历史中切片，构造与日线查询结果相同的DataFrame。
+
+    Args:
+        symbol (str): 代码
+        days (numpy.ndarray): 按升序排列的日序号（int32）
+        columns (dict): 字段名 -> 与days等长的float64数组
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期
+        open_ended (bool): 是否支持只提供开始或结束日期，否则只在两者都提供时筛选
+
+    Returns:
+        pandas.DataFrame: 日期范围内的日线数据（日期为date对象，数值字段为float64）
+    """
+    if not (start_date and end_date) and not open_ended:
+        start_date = end_date = None
+    # 二分查找日期范围在数组中的位置
+    first = np.searchsorted(days, _day_number(start_date), "left") if start_date else 0
+    last = np.searchsorted(days, _day_number(end_date), "right") if end_date else len(days)
+    selected = days[first:last]
+
+    data = {"symbol": np.full(len(selected), symbol, dtype=object),
+            "date": selected.astype("datetime64[D]").astype(object)}
+    data.update((column, values[first:last]) for column, values in columns.items())
+    # 构造DataFrame时复制数组，调用方增加或修改列不会影响缓存（或映射的文件）
+    return pd.DataFrame(data, copy=True)
+
+
+class KlineCache:
+    """
+    按(资产类型, 代码)缓存完整日线历史的LRU缓存，按字节数限制总量。
+
+    Attributes:
+        max_bytes (int): 缓存数组的总字节数上限
+
+    Examples:
+        >>> kline_cache = KlineCache(256 * 1024 * 1024)
+        >>> frame = kline_cache.get_frame(db, "stock", "sh600000", load, date(2024, 1, 1), date(2024, 6, 30))
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._series = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        # 失效次数：全部失效的次数，以及资产类型 -> 按资产类型失效的次数
+        self._cleared = 0
+        self._generations = {}
+
+    def _generation(self, asset_type: str):
+        """资产类型当前的失效代数（调用方持有锁）。"""
+        return self._cleared, self._generations.get(asset_type, 0)
+
+    def _lookup(self, key):
+        """返回(缓存的历史, 失效代数)，未缓存时历史为None。"""
+        with self._lock:
+            generation = self._generation(key[0])
+            series = self._series.get(key)
+            if series is None:
+                self._stats["misses"] += 1
+                return None, generation
+            self._series.move_to_end(key)
+            self._stats["hits"] += 1
+            return series, generation
+
+    def _store(self, key, series: KlineSeries, generation: tuple):
+        """
+        写入缓存并按字节数淘汰最久未使用的代码；单个代码超过上限时不缓存。
+        generation为读取前的失效代数，读取期间缓存被失效时（读到的可能是旧数据）不缓存。
+        """
+        if series.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if self._generation(key[0]) != generation:
+                return
+            previous = self._series.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._series[key] = series
+            self._bytes += series.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._series.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    def get_frame(self, db: Session, asset_type: str, symbol: str, loader, start_date=None, end_date=None,
+                  open_ended: bool = False):
+        """
+        获取日线数据，优先读取缓存；未缓存时通过loader读取完整历史并缓存。
+
+        Args:
+            db (Session): 数据库会话
+            asset_type (str): 资产类型
+            symbol (str): 日线表中的代码
+            loader (callable): loader(db, asset_type, symbol)返回按日期升序排列的完整日线查询结果
+            start_date (date, optional): 开始日期
+            end_date (date, optional): 结束日期
+            open_ended (bool): 是否支持只提供开始或结束日期（与日线查询的规则一致），否则只在两者都提供时筛选
+
+        Returns:
+            pandas.DataFrame: 日期范围内的日线数据，字段与查询结果相同（日期为date对象，数值字段为float64）
+        """
+        key = (asset_type, symbol)
+        series, generation = self._lookup(key)
+        if series is None:
+            daily = loader(db, asset_type, symbol)
+            if daily.empty:
+                return daily
+            series = _to_series(daily)
+            self._store(key, series, generation)
+
+        return slice_history(symbol, series.days, series.columns, start_date, end_date, open_ended)
+
+    def invalidate(self, asset_type: str | None = None):
+        """
+        使缓存失效。
+
+        Args:
+            asset_type (str, optional): 资产类型，为None时清空全部缓存
+        """
+        with self._lock:
+            if asset_type is None:
+                self._cleared += 1
+            else:
+                self._generations[asset_type] = self._generations.get(asset_type, 0) + 1
+            for key in [k for k in self._series if asset_type is None or k[0] == asset_type]:
+                self._bytes -= self._series.pop(key).nbytes
+
+    def metrics(self):
+        """
+        获取缓存的运行指标。
+
+        Returns:
+            dict: 缓存的代码数、当前字节数和字节数上限，以及累计的命中、未命中和淘汰次数
+        """
+        with self._lock:
+            return {
+                "symbols": len(self._series),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats,
+            }
+
+
+# 全局日线历史缓存
+kline_cache = KlineCache(settings.KLINE_CACHE_MAX_BYTES)
@@ -0,0 +1,76 @@
+# backend/database/kline_export.py
+"""
+此模块将日线表导出为内存映射的列式文件（格式见kline_store），供K线查询在进程冷启动后直接读取。
+每次导出写入新的版本目录，完成后原子切换CURRENT，正在运行的进程在KLINE_STORE_CHECK_INTERVAL内切换到新版本。
+建议在每日数据导入完成后运行；历史数据被修正（复权调整、补录）后也需要重新运行，否则导出文件中的旧数据会继续被使用:
+    python -m backend.database.kline_export [--asset-type stock] [--dir data/kline_store]
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import logging
+
+import pandas as pd
+from sqlalchemy import text
+
+from backend.config.settings import settings
+from backend.database.kline_store import write_kline_store
+from backend.database.queries import KLINE_SOURCES
+
+logger = logging.getLogger(__name__)
+
+
+def export_kline_store(engine, asset_type: str, root: str | None = None, chunk_size: int | None = None):
+    """
+    导出一类资产全部代码的日线历史。导出范围固定为开始时日线表的最新日期及之前的数据，
+    按块流式读取，内存占用与日线表大小无关。
+
+    Args:
+        engine: SQLAlchemy引擎
+        asset_type (str): 资产类型，stock、index或etf
+        root (str, optional): 导出根目录，默认为KLINE_STORE_DIR
+        chunk_size (int, optional): 每次读取的行数，默认为KLINE_STORE_CHUNK_SIZE
+
+    Returns:
+        str: 新版本的目录，日线表为空时返回None
+
+    Raises:
+        RuntimeError: 如果导出期间日线表被修改
+    """
+    table, fields, _ = KLINE_SOURCES[asset_type]
+    columns = [field.strip() for field in fields.split(",") if field.strip() not in ("symbol", "date")]
+    with engine.connect() as conn:
+        through = conn.execute(text(f"SELECT MAX(date) FROM {table}")).scalar()
+        if through is None:
+            logger.warning("K线导出跳过，日线表为空: asset_type=%s", asset_type)
+            return None
+        through = pd.Timestamp(through).date()
+        row_count = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE date <= :through"),
+                                 {"through": through}).scalar()
+
+        # 服务端游标分块读取，避免一次性加载整张日线表
+        stream = conn.execution_options(stream_results=True)
+        chunks = pd.read_sql(
+            text(f"SELECT {fields} FROM {table} WHERE date <= :through ORDER BY symbol, date"),
+            stream, params={"through": through}, chunksize=chunk_size or settings.KLINE_STORE_CHUNK_SIZE,
+        )
+        version_dir = write_kline_store(root or settings.KLINE_STORE_DIR, asset_type, columns, row_count, chunks,
+                                        through)
+    logger.info("K线导出完成: asset_type=%s, through=%s, rows=%s, dir=%s", asset_type, through, row_count,
+                version_dir)
+    return version_dir
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.database.connection import engine
+
+    parser = argparse.ArgumentParser(description="导出日线历史到内存映射的列式文件")
+    parser.add_argument("--asset-type", choices=list(KLINE_SOURCES), help="只导出一类资产，默认全部导出")
+    parser.add_argument("--dir", help="导出根目录，默认为KLINE_STORE_DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    for asset in [args.asset_type] if args.asset_type else KLINE_SOURCES:
+        export_kline_store(engine, asset, args.dir)
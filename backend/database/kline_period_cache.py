@@ -0,0 +1,127 @@
+# backend/database/kline_period_cache.py
+"""
+此模块在进程内缓存周线、月线和季线数据。
+多年的周线、月线视图需要先读取数千行日线再分组合并，而合并结果只在日线出现新交易日时才会变化，
+因此按(资产类型, 代码, 周期)缓存完整历史的合并结果，请求时按日期范围筛选周期，不再访问日线表。
+筛选时返回与日期范围有交集的完整周期（不截断周期内的交易日），周期的日期为该周期最后一个交易日。
+本进程检查到日线表水位变化时按资产类型失效（与快照由哪个进程刷新无关）；指数日线变化时全部失效，因为指数和ETF的参考指数涨跌幅依赖指数日线。
+读取日线期间缓存被失效时，合并结果只返回给本次请求，不写入缓存。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.utils.kline_sampling import aggregate_buckets, period_starts
+
+# (资产类型, 代码, 周期) -> PeriodFrame，按最近使用顺序排列
+_frames = OrderedDict()
+# 资产类型 -> 按资产类型失效的次数，None -> 全部失效的次数
+_generations = {}
+_lock = threading.Lock()
+
+
+class PeriodFrame(NamedTuple):
+    """
+    一个代码完整历史的周期K线。
+
+    Attributes:
+        frame (pandas.DataFrame): 合并后的K线数据（只读，每个周期一行）
+        first_days (numpy.ndarray): 各周期第一个交易日（datetime64[D]）
+        last_days (numpy.ndarray): 各周期最后一个交易日（datetime64[D]）
+    """
+    frame: pd.DataFrame
+    first_days: np.ndarray
+    last_days: np.ndarray
+
+
+def _to_days(values):
+    """将日期序列转换为datetime64[D]数组。"""
+    return pd.to_datetime(pd.Series(values)).to_numpy().astype("datetime64[D]")
+
+
+def _generation(asset_type: str):
+    """资产类型当前的失效代数（调用方持有锁）。"""
+    return _generations.get(None, 0), _generations.get(asset_type, 0)
+
+
+def _build_period_frame(daily: pd.DataFrame, period: str):
+    """将完整的日线数据合并为周期K线，并记录每个周期的起止交易日。"""
+    starts = period_starts(daily["date"], period)
+    days = _to_days(daily["date"])
+    lasts = np.append(starts[1:], len(days)) - 1
+    return PeriodFrame(aggregate_buckets(daily, starts), days[starts], days[lasts])
+
+
+def get_period_frame(db: Session, asset_type: str, symbol: str, period: str, loader, start_date=None,
+                     end_date=None, open_ended: bool = False):
+    """
+    获取周期K线，优先读取缓存；未缓存时通过loader读取完整日线并合并。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+        symbol (str): 日线表中的代码
+        period (str): W、M或Q
+        loader (callable): loader(db, symbol)返回按日期升序排列的完整日线数据
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期
+        open_ended (bool): 是否支持只提供开始或结束日期（与日线查询的规则一致），否则只在两者都提供时筛选
+
+    Returns:
+        pandas.DataFrame: 与日期范围有交集的周期K线，没有日线数据时返回空DataFrame
+    """
+    key = (asset_type, symbol, period)
+    with _lock:
+        generation = _generation(asset_type)
+        cached = _frames.get(key)
+        if cached is not None:
+            _frames.move_to_end(key)
+
+    if cached is None:
+        daily = loader(db, symbol)
+        if daily.empty:
+            # 没有数据的代码不缓存，避免无效代码占满缓存
+            return daily
+        cached = _build_period_frame(daily, period)
+        with _lock:
+            # 读取期间缓存被失效时读到的可能是旧数据，不缓存
+            if _generation(asset_type) == generation:
+                _frames[key] = cached
+                _frames.move_to_end(key)
+                while len(_frames) > settings.KLINE_PERIOD_CACHE_SIZE:
+                    _frames.popitem(last=False)
+
+    if not (start_date and end_date) and not open_ended:
+        start_date = end_date = None
+    mask = np.ones(len(cached.frame), dtype=bool)
+    if start_date:
+        mask &= cached.last_days >= np.datetime64(start_date, "D")
+    if end_date:
+        mask &= cached.first_days <= np.datetime64(end_date, "D")
+    # 返回新的DataFrame，调用方增加或修改列不会影响缓存
+    return cached.frame[mask].reset_index(drop=True)
+
+
+def invalidate_period_frames(asset_type: str | None = None):
+    """
+    使周期K线缓存失效。
+
+    Args:
+        asset_type (str, optional): 资产类型，为None或index时清空全部缓存
+    """
+    with _lock:
+        if asset_type is None or asset_type == "index":
+            _generations[None] = _generations.get(None, 0) + 1
+            _frames.clear()
+            return
+        _generations[asset_type] = _generations.get(asset_type, 0) + 1
+        for key in [k for k in _frames if k[0] == asset_type]:
+            del _frames[key]
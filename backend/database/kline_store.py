@@ -0,0 +1,316 @@
+# backend/database/kline_store.py
+"""
+此模块提供导出到磁盘的日线历史（内存映射的列式文件），供进程冷启动后直接读取。
+部署或重启后每个工作进程的日线缓存都是空的，最初几分钟的图表请求会集中读取日线表；
+导出任务（python -m backend.database.kline_export）把每类资产全部代码的日线历史写成列式文件，
+K线查询直接从映射的页面切片，新进程不执行SQL即可返回完整历史，同一台机器上的工作进程共享操作系统的页缓存。
+
+文件布局（KLINE_STORE_DIR/资产类型/）：
+    CURRENT             当前版本的目录名，导出完成后原子替换
+    <版本>/index.json   代码列表、字段列表、导出时日线表的最新日期（through）和总行数
+    <版本>/offsets.npy  int64，第i个代码的数据位于[offsets[i], offsets[i + 1])
+    <版本>/date.npy     int32日序号（1970-01-01起的天数），每个代码内按日期升序
+    <版本>/<字段>.npy   float64，每个数值字段一个文件
+导出文件覆盖到进程最近检查到的日线最新日期时直接使用；导出之后出现新交易日时，
+由调用方在导出的历史后面追加新数据（见queries._load_kline_history）。历史被修正后需要重新导出。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.database.kline_cache import slice_history
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.json"
+OFFSETS_FILE = "offsets.npy"
+DATE_FILE = "date.npy"
+
+
+class StoreVersion(NamedTuple):
+    """
+    一类资产已导出的一个版本（数组为只读的内存映射）。
+
+    Attributes:
+        name (str): 版本目录名
+        through (date): 导出时日线表的最新日期
+        positions (dict): 代码 -> 在offsets中的序号
+        offsets (numpy.ndarray): 各代码数据的起止位置（int64）
+        days (numpy.ndarray): 日序号（int32，内存映射）
+        columns (dict): 字段名 -> float64数组（内存映射），按导出时的字段顺序排列
+    """
+    name: str
+    through: date
+    positions: dict
+    offsets: np.ndarray
+    days: np.ndarray
+    columns: dict
+
+
+def _column_file(column: str):
+    return f"{column}.npy"
+
+
+def _read_current(directory: str):
+    """读取CURRENT指向的版本目录名，尚未导出时为None。"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _remove_old_versions(directory: str, keep: set, written_at: float):
+    """
+    删除早于written_at完成的版本，keep中的版本保留。
+    没有index.json的目录是其他正在进行（或中断）的导出，不删除。
+    """
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if entry in keep or not os.path.isdir(path):
+            continue
+        try:
+            completed_at = os.path.getmtime(os.path.join(path, INDEX_FILE))
+        except FileNotFoundError:
+            continue
+        if completed_at < written_at:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_kline_store(root: str, asset_type: str, columns: list, row_count: int, chunks, through: date):
+    """
+    将按代码、日期排序的日线数据写入一个新版本，写完后切换CURRENT并删除更早的版本。
+    切换前的版本保留一代，供正在打开它的进程使用；其他正在进行的导出不受影响。
+    数据按块写入预先分配的内存映射文件，内存占用只与块大小有关。
+
+    Args:
+        root (str): 导出根目录
+        asset_type (str): 资产类型
+        columns (list): 数值字段列表（不含symbol和date）
+        row_count (int): 总行数
+        chunks (iterable): 按代码、日期排序的DataFrame块，包含symbol、date和columns
+        through (date): 导出数据的最新日期
+
+    Returns:
+        str: 新版本的目录
+
+    Raises:
+        RuntimeError: 如果写入的行数与row_count不一致（导出期间日线表被修改）
+    """
+    directory = os.path.join(root, asset_type)
+    os.makedirs(directory, exist_ok=True)
+    version_dir = tempfile.mkdtemp(prefix=time.strftime("%Y%m%d%H%M%S-"), dir=directory)
+    # mkdtemp只允许当前用户访问，以其他用户运行的服务进程也需要读取
+    os.chmod(version_dir, 0o755)
+    name = os.path.basename(version_dir)
+    try:
+        open_memmap = np.lib.format.open_memmap
+        days = open_memmap(os.path.join(version_dir, DATE_FILE), mode="w+", dtype="int32", shape=(row_count,))
+        arrays = {
+            column: open_memmap(os.path.join(version_dir, _column_file(column)), mode="w+", dtype="float64",
+                                shape=(row_count,))
+            for column in columns
+        }
+        symbols, offsets = [], []
+        position = 0
+        for chunk in chunks:
+            size = len(chunk)
+            if position + size > row_count:
+                raise RuntimeError(f"{asset_type} daily data changed during export, please retry")
+            chunk_days = chunk["date"].to_numpy().astype("datetime64[D]").astype("int32")
+            days[position:position + size] = chunk_days
+            for column, array in arrays.items():
+                array[position:position + size] = chunk[column].to_numpy(dtype="float64", na_value=np.nan)
+            # 每个代码的第一行：与上一行代码不同的位置
+            chunk_symbols = chunk["symbol"].to_numpy()
+            previous = symbols[-1] if symbols else None
+            starts = np.flatnonzero(np.r_[True, chunk_symbols[1:] != chunk_symbols[:-1]]) if size else []
+            for start in starts:
+                if chunk_symbols[start] != previous:
+                    symbols.append(chunk_symbols[start])
+                    offsets.append(position + int(start))
+                    previous = chunk_symbols[start]
+            position += size
+        if position != row_count:
+            raise RuntimeError(f"{asset_type} daily data changed during export, please retry")
+
+        days.flush()
+        for array in arrays.values():
+            array.flush()
+        del days, arrays
+        np.save(os.path.join(version_dir, OFFSETS_FILE), np.array(offsets + [row_count], dtype="int64"))
+        with open(os.path.join(version_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "asset_type": asset_type,
+                "symbols": [str(symbol) for symbol in symbols],
+                "columns": list(columns),
+                "through": through.isoformat() if through else None,
+                "rows": row_count,
+            }, f, ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    # 原子替换CURRENT（临时文件名按版本区分，并发导出不会互相覆盖）；
+    # 已映射旧版本的进程在下次检查前继续使用旧文件（删除后映射仍然有效）
+    previous = _read_current(directory)
+    pointer = os.path.join(directory, CURRENT_FILE)
+    temporary = f"{pointer}.{name}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(temporary, pointer)
+    _remove_old_versions(directory, {name, previous}, os.path.getmtime(os.path.join(version_dir, INDEX_FILE)))
+    return version_dir
+
+
+def _open_version(directory: str, name: str):
+    """以只读内存映射方式打开一个版本。"""
+    version_dir = os.path.join(directory, name)
+    with open(os.path.join(version_dir, INDEX_FILE), encoding="utf-8") as f:
+        index = json.load(f)
+    return StoreVersion(
+        name=name,
+        through=date.fromisoformat(index["through"]) if index["through"] else None,
+        positions={symbol: i for i, symbol in enumerate(index["symbols"])},
+        offsets=np.load(os.path.join(version_dir, OFFSETS_FILE)),
+        days=np.load(os.path.join(version_dir, DATE_FILE), mmap_mode="r"),
+        columns={column: np.load(os.path.join(version_dir, _column_file(column)), mmap_mode="r")
+                 for column in index["columns"]},
+    )
+
+
+class KlineStore:
+    """
+    导出的日线历史的只读访问。每类资产的CURRENT按KLINE_STORE_CHECK_INTERVAL检查，导出新版本后自动切换。
+
+    Attributes:
+        root (str): 导出根目录
+
+    Examples:
+        >>> frame = kline_store.get_frame("etf", "510300", date(2024, 1, 1), date(2024, 6, 30), open_ended=True)
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._versions = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def _version(self, asset_type: str):
+        """获取当前版本，到检查间隔时重新读取CURRENT；读取失败时保留已映射的版本，从未加载过时为None。"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked.get(asset_type, float("-inf")) < settings.KLINE_STORE_CHECK_INTERVAL:
+                return self._versions.get(asset_type)
+            self._checked[asset_type] = now
+            current = self._versions.get(asset_type)
+        directory = os.path.join(self.root, asset_type)
+        try:
+            name = _read_current(directory)
+            if name is not None and (current is None or current.name != name):
+                current = _open_version(directory, name)
+                logger.info("K线导出文件已加载: asset_type=%s, version=%s, through=%s",
+                            asset_type, name, current.through)
+        except FileNotFoundError as e:
+            # CURRENT指向的版本已被删除（如切换期间被清理），保留已映射的版本
+            logger.warning("K线导出文件不存在: asset_type=%s, error=%s", asset_type, e)
+        except Exception as e:
+            # 文件损坏等情况下退回数据库查询，保留已映射的版本
+            logger.error("K线导出文件加载失败: asset_type=%s, error=%s", asset_type, e)
+        with self._lock:
+            self._versions[asset_type] = current
+        return current
+
+    def _locate(self, asset_type: str, symbol: str):
+        """返回(版本, 起始位置, 结束位置)，没有导出该代码时为None。"""
+        version = self._version(asset_type)
+        position = version.positions.get(symbol) if version is not None else None
+        if position is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        return version, int(version.offsets[position]), int(version.offsets[position + 1])
+
+    def get_frame(self, asset_type: str, symbol: str, start_date=None, end_date=None, open_ended: bool = False,
+                  through: date | None = None):
+        """
+        从映射的文件按日期范围读取一个代码的日线数据。
+
+        Args:
+            asset_type (str): 资产类型
+            symbol (str): 日线表中的代码
+            start_date (date, optional): 开始日期
+            end_date (date, optional): 结束日期
+            open_ended (bool): 是否支持只提供开始或结束日期（与日线查询的规则一致）
+            through (date, optional): 日线表的最新日期；导出文件早于该日期时不使用
+
+        Returns:
+            pandas.DataFrame: 与日线查询结果相同的DataFrame；没有导出该代码或导出文件不是最新时为None
+        """
+        located = self._locate(asset_type, symbol)
+        if located is None:
+            return None
+        version, first, last = located
+        if through is not None and (version.through is None or version.through < through):
+            with self._lock:
+                self._stats["stale"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        columns = {column: values[first:last] for column, values in version.columns.items()}
+        return slice_history(symbol, version.days[first:last], columns, start_date, end_date, open_ended)
+
+    def get_history(self, asset_type: str, symbol: str):
+        """
+        读取一个代码导出的完整日线历史及导出日期，用于在后面追加导出之后的新交易日。
+
+        Args:
+            asset_type (str): 资产类型
+            symbol (str): 日线表中的代码
+
+        Returns:
+            tuple: (DataFrame, 导出数据的最新日期)；没有导出该代码时为(None, None)
+        """
+        located = self._locate(asset_type, symbol)
+        if located is None:
+            return None, None
+        version, first, last = located
+        columns = {column: values[first:last] for column, values in version.columns.items()}
+        return slice_history(symbol, version.days[first:last], columns), version.through
+
+    def metrics(self):
+        """
+        获取导出文件的使用情况。
+
+        Returns:
+            dict: 各资产类型当前加载的版本、导出日期、代码数和行数，以及累计的命中、未命中和因导出文件过期未使用的次数
+        """
+        with self._lock:
+            versions = {
+                asset_type: {
+                    "version": version.name,
+                    "through": version.through.isoformat() if version.through else None,
+                    "symbols": len(version.positions),
+                    "rows": int(version.offsets[-1]),
+                }
+                for asset_type, version in self._versions.items() if version is not None
+            }
+            return {"root": self.root, "versions": versions, **self._stats}
+
+
+# 全局日线导出文件
+kline_store = KlineStore(settings.KLINE_STORE_DIR)
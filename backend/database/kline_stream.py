@@ -0,0 +1,197 @@
+# backend/database/kline_stream.py
+"""
+此模块提供K线数据的流式输出（NDJSON，每行一个K线对象）。
+不指定日期范围时K线接口会读取全部历史：一次性读取需要先把整个序列装入DataFrame、
+构建字典列表并逐行校验，首字节时间和内存峰值都随序列长度增长。
+流式输出通过服务端游标按KLINE_STREAM_CHUNK_SIZE行分块读取，每块转换为JSON行后立即发送，
+首字节时间和内存峰值只与分块大小有关。
+每行的字段与records格式相同，缺失值统一输出为null。
+批量K线接口的流式输出也在这里：按代码和日期排序读取，每个代码的数据读完后立即输出为一行。
+
+流式响应在路由返回后才开始发送，请求依赖中的会话此时可能已经关闭，因此每个流使用独立的异步会话，
+发送结束或客户端断开时关闭游标和会话。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import json
+
+import pandas as pd
+from sqlalchemy import text
+
+from backend.config.settings import settings
+from backend.database import connection
+from backend.database.kline_batch import get_info_names, kline_payload
+from backend.database.queries import (
+    build_kline_query,
+    get_etf_reference,
+    get_index_reference,
+    _attach_reference_change,
+)
+from backend.utils.kline_sampling import downsample_kline, OHLC
+from backend.utils.kline_serializer import (
+    frame_to_records,
+    nullable_schema,
+    STOCK_KLINE_SCHEMA,
+    INDEX_KLINE_SCHEMA,
+    ETF_KLINE_SCHEMA,
+)
+
+# 资产类型 -> (records字段定义, 参考指数函数)；股票没有参考指数
+_STREAM_SOURCES = {
+    "stock": (STOCK_KLINE_SCHEMA, None),
+    "index": (INDEX_KLINE_SCHEMA, get_index_reference),
+    "etf": (ETF_KLINE_SCHEMA, get_etf_reference),
+}
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _encode(records):
+    """将字典列表编码为NDJSON字节串（日期按ISO格式输出）。"""
+    return "".join(
+        json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records
+    ).encode("utf-8")
+
+
+async def open_kline_stream(asset_type: str, symbol: str, start_date=None, end_date=None,
+                            chunk_size: int | None = None):
+    """
+    打开K线数据流：执行查询并读取第一块数据，没有数据时直接抛出异常，以便路由在发送响应前返回404。
+
+    Args:
+        asset_type (str): 资产类型，stock、index或etf
+        symbol (str): 日线表中的代码
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期
+        chunk_size (int, optional): 每块读取的行数，默认为KLINE_STREAM_CHUNK_SIZE
+
+    Returns:
+        AsyncIterator[bytes]: NDJSON数据块，每块包含若干行
+
+    Raises:
+        ValueError: 如果未找到数据
+
+    Examples:
+        >>> stream = await open_kline_stream("stock", "sh600000")
+        >>> return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+    """
+    schema, reference = _STREAM_SOURCES[asset_type]
+    chunk_size = chunk_size or settings.KLINE_STREAM_CHUNK_SIZE
+    query, params = build_kline_query(asset_type, symbol, start_date, end_date)
+
+    db = connection.AsyncSessionLocal()
+    try:
+        # stream()使用服务端游标，结果按块从数据库读取，不会一次性装入内存
+        result = await db.stream(text(query), params)
+        chunks = result.partitions(chunk_size)
+        first = await anext(chunks, None)
+        if first is None:
+            await result.close()
+            raise ValueError(f"No data found for {asset_type} {symbol} in the specified date range")
+    except BaseException:
+        await db.close()
+        raise
+
+    return _generate(db, result, chunks, first, symbol, schema, reference)
+
+
+async def _generate(db, result, chunks, first, symbol, schema, reference):
+    """逐块转换并输出NDJSON，结束或客户端断开时关闭游标和会话。"""
+    keys = list(result.keys())
+    constants, columns = None, None
+    if reference is not None:
+        reference_index, reference_name = reference(symbol)
+        constants = {"symbol": symbol, "reference_index": reference_index, "reference_name": reference_name}
+        columns = {"reference_change_rate": "ref_change_rate"}
+    schema = nullable_schema(schema)
+
+    try:
+        rows = first
+        while rows:
+            frame = pd.DataFrame(rows, columns=keys)
+            if reference is not None:
+                # 参考指数序列在进程内缓存，按块对齐查找
+                frame = await db.run_sync(_attach_reference_change, frame, constants["reference_index"])
+            yield _encode(frame_to_records(frame, schema, constants=constants, columns=columns))
+            rows = await anext(chunks, None)
+    finally:
+        await result.close()
+        await db.close()
+
+
+async def open_kline_batch_stream(groups: dict, missing: list, start_date=None, end_date=None,
+                                  max_points: int | None = None, sampling: str = OHLC,
+                                  chunk_size: int | None = None):
+    """
+    打开批量K线数据流：每张日线表执行一次按代码和日期排序的服务端游标查询，
+    每个代码的数据读完后输出一行（字段同批量接口的结果项，另加key），内存中只保留一个代码的数据。
+    没有数据的代码在最后各输出一行{"key": ..., "asset_type": ..., "missing": true}。
+
+    Args:
+        groups (dict): group_targets的结果，资产类型 -> {日线表代码: [BatchTarget, ...]}
+        missing (list): 无法解析的代码，元素为(请求中的代码, 资产类型)
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期
+        max_points (int, optional): 每个代码的最大数据点数，超过时降采样（每个代码的数据已完整读入后再处理）
+        sampling (str): 降采样方式，ohlc或lttb
+        chunk_size (int, optional): 每块读取的行数，默认为KLINE_STREAM_CHUNK_SIZE
+
+    Returns:
+        AsyncIterator[bytes]: NDJSON数据块，每块为一个代码
+    """
+    chunk_size = chunk_size or settings.KLINE_STREAM_CHUNK_SIZE
+    sample = (max_points, sampling)
+    return _generate_batch(connection.AsyncSessionLocal(), groups, list(missing), start_date, end_date, chunk_size,
+                           sample)
+
+
+async def _generate_batch(db, groups, missing, start_date, end_date, chunk_size, sample):
+    """按资产类型依次读取并输出每个代码的数据，结束或客户端断开时关闭会话。"""
+    try:
+        for asset_type, by_symbol in groups.items():
+            info_symbols = [target.info_symbol for targets in by_symbol.values() for target in targets]
+            names = await db.run_sync(get_info_names, asset_type, info_symbols)
+            query, params = build_kline_query(asset_type, list(by_symbol), start_date, end_date)
+
+            found = set()
+            result = await db.stream(text(query), params)
+            try:
+                keys = list(result.keys())
+                position = keys.index("symbol")
+                current, rows = None, []
+                async for partition in result.partitions(chunk_size):
+                    for row in partition:
+                        if row[position] != current and rows:
+                            found.add(current)
+                            yield await _encode_symbol(db, by_symbol[current], keys, rows, names, sample)
+                            rows = []
+                        current = row[position]
+                        rows.append(row)
+                if rows:
+                    found.add(current)
+                    yield await _encode_symbol(db, by_symbol[current], keys, rows, names, sample)
+            finally:
+                await result.close()
+
+            missing.extend((target.key, asset_type) for symbol, targets in by_symbol.items()
+                           if symbol not in found for target in targets)
+
+        if missing:
+            yield _encode({"key": key, "asset_type": asset_type, "missing": True} for key, asset_type in missing)
+    finally:
+        await db.close()
+
+
+async def _encode_symbol(db, targets, keys, rows, names, sample):
+    """将一个代码的数据对齐参考指数后编码为NDJSON行（同一代码有多种写法时每种写法一行）。"""
+    frame = pd.DataFrame(rows, columns=keys)
+    asset_type = targets[0].asset_type
+    _, reference = _STREAM_SOURCES[asset_type]
+    if reference is not None:
+        frame = await db.run_sync(_attach_reference_change, frame, reference(targets[0].daily_symbol)[0])
+    frame = downsample_kline(frame, *sample)
+    return _encode(
+        {"key": target.key, **kline_payload(target, frame, names.get(target.info_symbol))}
+        for target in targets
+    )
@@ -0,0 +1,453 @@
+# backend/database/latest_quote.py
+"""
+此模块负责维护最新行情快照表latest_quote。
+列表接口不再对日线表做MAX(date) GROUP BY全表聚合，而是读取该快照表；
+快照只在日线表出现新交易日时增量更新（仅处理最新交易日及之后的数据）。
+
+快照保存在共享的数据库中，可能由任一工作进程或导入任务刷新；各进程的内存缓存（日线历史等）
+则按本进程观察到的日线表水位（最新日期及该日期的行数）失效，不依赖本进程是否执行了快照刷新。
+
+外部数据导入任务完成后也可以直接运行本模块强制刷新:
+    python -m backend.database.latest_quote [--full]
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.database.count_cache import invalidate_counts
+from backend.database.indicator_cache import expire_indicators, invalidate_indicators
+from backend.database.kline_cache import kline_cache
+from backend.database.kline_period_cache import invalidate_period_frames
+from backend.database.reference_series import invalidate_reference_series
+from backend.database.search_index import refresh_search_index
+from backend.database.symbol_registry import refresh_symbol_registry
+from backend.models.latest_quote_model import LatestQuote, LatestQuoteState
+from backend.utils.arrow_serializer import frame_to_table
+from backend.utils.kline_serializer import (
+    frame_to_records,
+    RAW,
+    NULLABLE_FLOAT,
+    FLOAT_OR_ZERO,
+)
+
+logger = logging.getLogger(__name__)
+
+# 各资产类型对应的日线表、信息表和涨跌幅计算方式
+# 股票和ETF按前一交易日收盘价计算涨跌幅；指数直接使用日线表中的change_rate
+ASSET_SOURCES = {
+    "stock": {
+        "daily_table": "daily_stock",
+        "info_table": "stock_info",
+        "change_expr": "CASE WHEN prev.close IS NOT NULL AND prev.close <> 0 "
+                       "THEN ((cur.close - prev.close) / prev.close * 100) ELSE 0 END",
+    },
+    "index": {
+        "daily_table": "daily_index",
+        "info_table": "index_info",
+        "change_expr": "cur.change_rate",
+    },
+    "etf": {
+        "daily_table": "daily_etf",
+        "info_table": "etf_info",
+        "change_expr": "CASE WHEN prev.close IS NOT NULL AND prev.close <> 0 "
+                       "THEN ((cur.close - prev.close) / prev.close * 100) ELSE 0 END",
+    },
+}
+
+# 全量重建时使用的起始日期
+_EPOCH = date(1900, 1, 1)
+
+# 各资产类型上次检查时间（进程内），用于限制水位检查频率
+_last_checked = {}
+_sync_lock = threading.Lock()
+# 资产类型 -> 最近一次检查到的日线表最新日期，供日线导出文件判断是否为最新
+_source_dates = {}
+# 资产类型 -> 本进程缓存对应的日线表水位，检查到的水位与之不同时使本进程的缓存失效
+_observed = {}
+
+# 列表接口输出字段定义：(输出字段名, 转换类型)，输出字段名沿用各列表接口原有的命名
+QUOTE_ITEM_SCHEMAS = {
+    "stock": (
+        ("symbol", RAW),
+        ("name", RAW),
+        ("current_price", NULLABLE_FLOAT),
+        ("change_percent", FLOAT_OR_ZERO),
+        ("volume", FLOAT_OR_ZERO),
+    ),
+    "index": (
+        ("symbol", RAW),
+        ("name", RAW),
+        ("current_price", NULLABLE_FLOAT),
+        ("change_rate", NULLABLE_FLOAT),
+        ("volume", FLOAT_OR_ZERO),
+    ),
+    "etf": (
+        ("symbol", RAW),
+        ("name", RAW),
+        ("latest_price", NULLABLE_FLOAT),
+        ("change_rate", FLOAT_OR_ZERO),
+        ("volume", FLOAT_OR_ZERO),
+    ),
+}
+
+# 列表可用的排序字段：字段名到SQL表达式的映射（表达式取值不能为NULL，供键集分页使用）
+QUOTE_SORT_FIELDS = {
+    "symbol": "symbol",
+    "name": "COALESCE(name, '')",
+    "price": "COALESCE(last_close, 0)",
+    "change": "COALESCE(change_percent, 0)",
+    "volume": "COALESCE(volume, 0)",
+}
+
+# 输出字段名到快照列名的映射
+QUOTE_ITEM_COLUMNS = {
+    "current_price": "last_close",
+    "latest_price": "last_close",
+    "change_rate": "change_percent",
+}
+
+
+def ensure_latest_quote_table(engine):
+    """
+    创建latest_quote表以及日线表的日期索引（如果不存在）。
+    日期索引使MAX(date)和按日期增量扫描可以走索引；
+    排序字段索引使列表按任意排序字段做键集分页时都能直接在索引上定位。
+
+    Args:
+        engine: SQLAlchemy引擎
+    """
+    LatestQuote.__table__.create(bind=engine, checkfirst=True)
+    LatestQuoteState.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for field, expression in QUOTE_SORT_FIELDS.items():
+            if field == "symbol":
+                continue  # 主键(asset_type, symbol)已覆盖
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS idx_latest_quote_sort_{field} "
+                f"ON latest_quote (asset_type, ({expression}), symbol)"
+            ))
+        for source in ASSET_SOURCES.values():
+            table = source["daily_table"]
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table} (date)"))
+
+
+def get_snapshot_date(db: Session, asset_type: str):
+    """
+    获取快照中某类资产的最新数据日期。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+
+    Returns:
+        date: 快照最新日期，快照为空时返回None
+    """
+    return db.execute(
+        text("SELECT MAX(last_date) FROM latest_quote WHERE asset_type = :asset_type"),
+        {"asset_type": asset_type},
+    ).scalar()
+
+
+class SourceWatermark(NamedTuple):
+    """
+    日线表的数据水位，用于判断本进程的缓存是否仍与日线表一致。
+
+    Attributes:
+        date (date): 日线表最新日期，表为空时为None
+        rows (int): 最新日期的行数（同一交易日分批导入时增加）
+        rebuilt_at (datetime): 快照最近一次全量重建的时间，从未全量重建时为None
+    """
+    date: date | None
+    rows: int
+    rebuilt_at: datetime | None
+
+
+def get_source_date(db: Session, asset_type: str):
+    """
+    获取日线表中的最新交易日期。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+
+    Returns:
+        date: 日线表最新日期，表为空时返回None
+    """
+    table = ASSET_SOURCES[asset_type]["daily_table"]
+    return db.execute(text(f"SELECT MAX(date) FROM {table}")).scalar()
+
+
+def get_source_watermark(db: Session, asset_type: str):
+    """
+    获取日线表的数据水位（最新日期及该日期的行数，均通过日期索引查询）以及快照的全量重建时间。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+
+    Returns:
+        SourceWatermark: 日线表水位
+    """
+    rebuilt_at = db.execute(
+        text("SELECT rebuilt_at FROM latest_quote_state WHERE asset_type = :asset_type"),
+        {"asset_type": asset_type},
+    ).scalar()
+    source_date = get_source_date(db, asset_type)
+    if source_date is None:
+        return SourceWatermark(None, 0, rebuilt_at)
+    table = ASSET_SOURCES[asset_type]["daily_table"]
+    rows = db.execute(text(f"SELECT COUNT(*) FROM {table} WHERE date = :date"), {"date": source_date}).scalar()
+    return SourceWatermark(source_date, rows, rebuilt_at)
+
+
+def refresh_latest_quote(db: Session, asset_type: str, since: date | None = None):
+    """
+    从日线表增量更新快照。
+    只扫描date >= since的日线数据，对这些代码取最新一行，并通过索引查找其前一交易日收盘价，
+    然后以(asset_type, symbol)为键写入快照。since为None时全量重建。
+    这里只更新共享的快照；各进程的内存缓存由sync_latest_quote按本进程观察到的日线表水位失效。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，取值为stock、index、etf
+        since (date, optional): 增量起始日期（包含），默认为None（全量重建）
+
+    Returns:
+        int: 写入的行数
+    """
+    source = ASSET_SOURCES[asset_type]
+    daily_table = source["daily_table"]
+    upsert_query = f"""
+    INSERT INTO latest_quote (
+        asset_type, symbol, name, last_close, prev_close, change_percent, volume, last_date, updated_at
+    )
+    SELECT
+        :asset_type,
+        cur.symbol,
+        info.name,
+        cur.close,
+        prev.close,
+        {source["change_expr"]},
+        cur.volume,
+        cur.date,
+        NOW()
+    FROM (
+        SELECT DISTINCT ON (symbol) *
+        FROM {daily_table}
+        WHERE date >= :since
+        ORDER BY symbol, date DESC
+    ) cur
+    LEFT JOIN LATERAL (
+        -- 通过(symbol, date)主键索引查找前一交易日收盘价
+        SELECT p.close
+        FROM {daily_table} p
+        WHERE p.symbol = cur.symbol AND p.date < cur.date
+        ORDER BY p.date DESC
+        LIMIT 1
+    ) prev ON TRUE
+    LEFT JOIN {source["info_table"]} info ON info.symbol = cur.symbol
+    ON CONFLICT (asset_type, symbol) DO UPDATE SET
+        name = EXCLUDED.name,
+        last_close = EXCLUDED.last_close,
+        prev_close = EXCLUDED.prev_close,
+        change_percent = EXCLUDED.change_percent,
+        volume = EXCLUDED.volume,
+        last_date = EXCLUDED.last_date,
+        updated_at = EXCLUDED.updated_at
+    WHERE latest_quote.last_date <= EXCLUDED.last_date
+    """
+    with db.bind.begin() as conn:
+        result = conn.execute(text(upsert_query), {
+            "asset_type": asset_type,
+            "since": since or _EPOCH,
+        })
+        if since is None:
+            # 记录全量重建，各进程检查水位时据此在完整历史上重新计算技术指标
+            conn.execute(text("""
+            INSERT INTO latest_quote_state (asset_type, rebuilt_at) VALUES (:asset_type, NOW())
+            ON CONFLICT (asset_type) DO UPDATE SET rebuilt_at = EXCLUDED.rebuilt_at
+            """), {"asset_type": asset_type})
+    logger.info("latest_quote刷新完成: asset_type=%s, since=%s, rows=%s", asset_type, since, result.rowcount)
+    return result.rowcount
+
+
+def _reset_process_caches(db: Session, asset_type: str, watermark: SourceWatermark, rebuilt: bool):
+    """使本进程中依赖某类资产日线数据的缓存失效，watermark为本进程新观察到的水位。"""
+    # 快照可能已由其他进程刷新，该类资产的列表总数需要重新计算
+    invalidate_counts(asset_type)
+    kline_cache.invalidate(asset_type)
+    # 周线、月线、季线缓存同样按资产类型失效（周期缓存在指数日线变化时全部失效）
+    invalidate_period_frames(asset_type)
+    if rebuilt:
+        # 快照全量重建（如修正历史数据后）时技术指标在完整历史上重新计算
+        invalidate_indicators(asset_type)
+    # 其他情况只追加新交易日，技术指标从保存的递推状态继续计算
+    expire_indicators(asset_type, watermark)
+    if asset_type == "index":
+        # 指数日线有新数据，参考指数序列需要重新加载
+        invalidate_reference_series()
+    # 新上市的代码出现在日线表后，搜索索引和代码注册表随之重建
+    try:
+        refresh_search_index(db, asset_type)
+    except Exception as e:
+        db.rollback()
+        logger.error("搜索索引刷新失败: asset_type=%s, error=%s", asset_type, e)
+    try:
+        refresh_symbol_registry(db, asset_type)
+    except Exception as e:
+        db.rollback()
+        logger.error("代码注册表刷新失败: asset_type=%s, error=%s", asset_type, e)
+
+
+def sync_latest_quote(db: Session, asset_type: str, force: bool = False):
+    """
+    检查日线表是否出现新的交易日，如有则增量更新快照。
+    同一进程内每类资产的检查频率受LATEST_QUOTE_CHECK_INTERVAL限制，
+    未到检查间隔时直接返回，不访问数据库。
+    快照可能已由其他进程刷新，因此本进程的缓存按检查到的日线表水位是否变化失效，与本次是否刷新快照无关；
+    最新日期不变而行数增加（同一交易日分批导入）时同样重新刷新快照。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型
+        force (bool): 是否忽略检查间隔，默认为False
+
+    Returns:
+        bool: 本次是否执行了刷新
+    """
+    now = time.monotonic()
+    if not force and now - _last_checked.get(asset_type, float("-inf")) < settings.LATEST_QUOTE_CHECK_INTERVAL:
+        return False
+
+    # 其他请求正在检查或刷新时直接使用现有快照；请求中不阻塞等待锁，
+    # 异步会话中持有锁的协程可能正在同一线程上等待数据库，阻塞等待会卡住事件循环
+    if not _sync_lock.acquire(blocking=force):
+        return False
+    try:
+        # 获得锁后再次检查，避免并发请求重复刷新
+        if not force and now - _last_checked.get(asset_type, float("-inf")) < settings.LATEST_QUOTE_CHECK_INTERVAL:
+            return False
+        try:
+            snapshot_date = get_snapshot_date(db, asset_type)
+            watermark = get_source_watermark(db, asset_type)
+            previous = _observed.get(asset_type)
+            source_date = watermark.date
+            _source_dates[asset_type] = source_date
+            same_day_batch = (previous is not None and previous.date == source_date
+                              and previous.rows != watermark.rows)
+            refreshed = False
+            if source_date is not None and (force or snapshot_date is None or source_date > snapshot_date
+                                            or (same_day_batch and source_date == snapshot_date)):
+                # 从快照最新日期开始增量更新（包含当天，以覆盖同一交易日分批导入的情况）
+                refresh_latest_quote(db, asset_type, snapshot_date)
+                refreshed = True
+                if snapshot_date is None:
+                    # 快照为空时执行的是全量重建，重新读取重建时间
+                    watermark = get_source_watermark(db, asset_type)
+            if watermark != previous:
+                rebuilt = previous is None or previous.rebuilt_at != watermark.rebuilt_at
+                _reset_process_caches(db, asset_type, watermark, rebuilt)
+                _observed[asset_type] = watermark
+            return refreshed
+        finally:
+            _last_checked[asset_type] = time.monotonic()
+    finally:
+        _sync_lock.release()
+
+
+def get_checked_source_date(asset_type: str):
+    """
+    获取本进程最近一次检查到的日线表最新日期（不访问数据库）。
+
+    Args:
+        asset_type (str): 资产类型
+
+    Returns:
+        date: 日线表最新日期，尚未检查过时返回None
+    """
+    return _source_dates.get(asset_type)
+
+
+def sync_all_latest_quotes(db: Session, force: bool = False):
+    """
+    检查并刷新所有资产类型的快照。
+
+    Args:
+        db (Session): 数据库会话
+        force (bool): 是否忽略检查间隔
+
+    Returns:
+        list: 执行了刷新的资产类型列表
+    """
+    refreshed = []
+    for asset_type in ASSET_SOURCES:
+        try:
+            if sync_latest_quote(db, asset_type, force=force):
+                refreshed.append(asset_type)
+        except Exception as e:
+            logger.error("latest_quote刷新失败: asset_type=%s, error=%s", asset_type, e)
+    return refreshed
+
+
+def quotes_to_items(df, asset_type: str):
+    """
+    将快照查询结果转换为列表接口的返回项。
+
+    Args:
+        df (pandas.DataFrame): latest_quote查询结果
+        asset_type (str): 资产类型
+
+    Returns:
+        list: 列表项字典列表
+    """
+    if df.empty:
+        return []
+    df = df.assign(name=df["name"].fillna("N/A"))
+    return frame_to_records(df, QUOTE_ITEM_SCHEMAS[asset_type], columns=QUOTE_ITEM_COLUMNS)
+
+
+def quotes_to_table(df, asset_type: str):
+    """
+    将快照查询结果按列转换为Arrow表，字段与列表接口的返回项相同。
+
+    Args:
+        df (pandas.DataFrame): latest_quote查询结果
+        asset_type (str): 资产类型
+
+    Returns:
+        pyarrow.Table: 列表项表
+    """
+    if not df.empty:
+        df = df.assign(name=df["name"].fillna("N/A"))
+    return frame_to_table(df, QUOTE_ITEM_SCHEMAS[asset_type], columns=QUOTE_ITEM_COLUMNS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.database.connection import engine, SessionLocal
+
+    parser = argparse.ArgumentParser(description="刷新latest_quote最新行情快照")
+    parser.add_argument("--full", action="store_true", help="全量重建快照")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    ensure_latest_quote_table(engine)
+    session = SessionLocal()
+    try:
+        for asset in ASSET_SOURCES:
+            if args.full:
+                refresh_latest_quote(session, asset)
+            else:
+                sync_latest_quote(session, asset, force=True)
+    finally:
+        session.close()
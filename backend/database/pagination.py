@@ -0,0 +1,227 @@
+# backend/database/pagination.py
+"""
+此模块提供通用的键集（keyset）分页功能。
+按排序键的取值定位下一页/上一页，而不是使用OFFSET，翻到任意深度的代价都与第一页相同；
+同一次查询多取一行即可判断是否还有更多数据，不需要额外的“上一页游标”查询。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import base64
+import json
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 游标翻页方向
+NEXT = "next"
+PREV = "prev"
+
+
+def _to_builtin(value):
+    """将numpy/pandas标量转换为可JSON序列化的Python内置类型。"""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def encode_cursor(sort_by: str, sort_order: str, direction: str, values):
+    """
+    将排序方式、翻页方向和排序键取值编码为不透明的游标字符串。
+
+    Args:
+        sort_by (str): 排序字段
+        sort_order (str): 排序顺序，asc或desc
+        direction (str): 翻页方向，next或prev
+        values (list): 边界行的排序键取值
+
+    Returns:
+        str: URL安全的base64游标
+    """
+    payload = {
+        "s": sort_by,
+        "o": sort_order,
+        "d": direction,
+        "k": [_to_builtin(v) for v in values],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    解码游标字符串。
+
+    Args:
+        cursor (str): encode_cursor生成的游标
+
+    Returns:
+        dict: 包含s(排序字段)、o(排序顺序)、d(翻页方向)、k(排序键取值)的字典，无法解码时返回None
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(payload, dict) or not {"s", "o", "d", "k"} <= payload.keys():
+        return None
+    return payload
+
+
+class KeysetPaginator:
+    """
+    键集分页器。
+    对一条“SELECT 列 FROM 表 WHERE 固定条件”形式的查询，按白名单中的排序字段做前后双向的键集分页，
+    排序字段之后总是追加唯一的tiebreaker字段，保证排序稳定。
+
+    Attributes:
+        select_columns (str): SELECT子句中的列
+        from_clause (str): FROM及WHERE子句（必须包含WHERE，可以只是WHERE TRUE）
+        sort_fields (dict): 排序字段名到SQL表达式的映射，表达式取值不能为NULL
+        tiebreaker (str): 取值唯一的排序字段名，如symbol
+
+    Examples:
+        >>> paginator = KeysetPaginator(
+        ...     "q.symbol, q.name",
+        ...     "FROM latest_quote q WHERE q.asset_type = :asset_type",
+        ...     {"symbol": "q.symbol", "volume": "COALESCE(q.volume, 0)"},
+        ...     tiebreaker="symbol",
+        ... )
+        >>> result = paginator.paginate(db, {"asset_type": "stock"}, page_size=20, sort_by="volume", sort_order="desc")
+        >>> result["next_cursor"]
+        'eyJzIjoidm9sdW1lIiwi...'
+    """
+
+    def __init__(self, select_columns: str, from_clause: str, sort_fields: dict, tiebreaker: str):
+        if tiebreaker not in sort_fields:
+            raise ValueError(f"tiebreaker {tiebreaker} must be one of the sort fields")
+        self.select_columns = select_columns
+        self.from_clause = from_clause
+        self.sort_fields = sort_fields
+        self.tiebreaker = tiebreaker
+
+    def _sort_keys(self, sort_by: str):
+        """返回排序字段名列表（排序字段 + tiebreaker）。"""
+        if sort_by not in self.sort_fields:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+        if sort_by == self.tiebreaker:
+            return [sort_by]
+        return [sort_by, self.tiebreaker]
+
+    def _order_by(self, keys, sort_order: str, reverse: bool = False):
+        """构建ORDER BY子句，reverse为True时反转排序方向（用于向前翻页）。"""
+        descending = (sort_order == "desc") != reverse
+        direction = "DESC" if descending else "ASC"
+        return " ORDER BY " + ", ".join(f"{self.sort_fields[key]} {direction}" for key in keys)
+
+    def _seek_clause(self, keys, sort_order: str, direction: str):
+        """
+        构建定位条件。所有键同向排序，可以使用行值比较，数据库能直接在复合索引上定位。
+        """
+        after = (sort_order == "asc") == (direction == NEXT)
+        operator = ">" if after else "<"
+        left = ", ".join(self.sort_fields[key] for key in keys)
+        right = ", ".join(f":_cursor_{i}" for i in range(len(keys)))
+        return f" AND ({left}) {operator} ({right})"
+
+    def _select(self, keys):
+        """构建SELECT子句，额外选出排序键取值用于生成游标。"""
+        key_columns = ", ".join(f"{self.sort_fields[key]} AS _sort_{i}" for i, key in enumerate(keys))
+        return f"SELECT {self.select_columns}, {key_columns} "
+
+    def _boundary_values(self, rows: pd.DataFrame, position: int, keys):
+        """取出边界行的排序键取值。"""
+        row = rows.iloc[position]
+        return [row[f"_sort_{i}"] for i in range(len(keys))]
+
+    def paginate(self, db: Session, params: dict, page_size: int, cursor: str | None = None,
+                 sort_by: str | None = None, sort_order: str = "asc", filters: list | None = None,
+                 page: int | None = None):
+        """
+        执行分页查询。
+
+        Args:
+            db (Session): 数据库会话
+            params (dict): from_clause和filters中使用的绑定参数
+            page_size (int): 每页数量
+            cursor (str, optional): 上一次返回的next_cursor或prev_cursor
+            sort_by (str, optional): 排序字段，默认为tiebreaker；使用游标时以游标中记录的为准
+            sort_order (str): 排序顺序，asc或desc，默认为asc；使用游标时以游标中记录的为准
+            filters (list, optional): 附加的过滤条件（SQL片段，以AND连接）
+            page (int, optional): 页码，从1开始；提供时使用OFFSET定位（兼容旧的按页码分页）
+
+        Returns:
+            dict: 包含rows(DataFrame，已去掉排序键列)、next_cursor、prev_cursor、has_next、has_prev的字典
+
+        Raises:
+            ValueError: 如果排序字段不受支持或游标与排序方式不匹配
+        """
+        requested_sort = sort_by
+        sort_by = sort_by or self.tiebreaker
+        if sort_order not in ("asc", "desc"):
+            raise ValueError(f"Unsupported sort order: {sort_order}")
+
+        direction = NEXT
+        cursor_values = None
+        if cursor and page is None:
+            decoded = decode_cursor(cursor)
+            if decoded is None:
+                # 兼容旧版游标：直接使用上一页最后一个代码
+                sort_by, sort_order, cursor_values = self.tiebreaker, "asc", [cursor]
+            else:
+                if decoded["o"] not in ("asc", "desc") or decoded["d"] not in (NEXT, PREV) \
+                        or not isinstance(decoded["k"], list):
+                    raise ValueError("Malformed cursor")
+                if requested_sort and decoded["s"] != requested_sort:
+                    raise ValueError("Cursor does not match the requested sort field")
+                sort_by, sort_order, direction = decoded["s"], decoded["o"], decoded["d"]
+                cursor_values = decoded["k"]
+
+        keys = self._sort_keys(sort_by)
+        if cursor_values is not None and len(cursor_values) != len(keys):
+            raise ValueError("Malformed cursor")
+
+        query_params = dict(params)
+        where = "".join(f" AND {condition}" for condition in (filters or []))
+        if cursor_values is not None:
+            where += self._seek_clause(keys, sort_order, direction)
+            query_params.update({f"_cursor_{i}": value for i, value in enumerate(cursor_values)})
+
+        reverse = direction == PREV
+        query = self._select(keys) + self.from_clause + where + self._order_by(keys, sort_order, reverse)
+        if page is not None:
+            query += f" LIMIT {page_size + 1} OFFSET {(page - 1) * page_size}"
+        else:
+            query += f" LIMIT {page_size + 1}"
+
+        rows = pd.read_sql(text(query), db.bind, params=query_params)
+
+        # 多取的一行用于判断沿翻页方向是否还有数据
+        has_more = len(rows) > page_size
+        rows = rows.iloc[:page_size]
+        if reverse:
+            rows = rows.iloc[::-1]
+        rows = rows.reset_index(drop=True)
+
+        if page is not None:
+            has_next, has_prev = has_more, page > 1
+        elif reverse:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, cursor_values is not None
+
+        next_cursor = prev_cursor = None
+        if not rows.empty:
+            if has_next:
+                next_cursor = encode_cursor(sort_by, sort_order, NEXT, self._boundary_values(rows, -1, keys))
+            if has_prev:
+                prev_cursor = encode_cursor(sort_by, sort_order, PREV, self._boundary_values(rows, 0, keys))
+
+        return {
+            "rows": rows.drop(columns=[f"_sort_{i}" for i in range(len(keys))]),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "has_next": has_next,
+            "has_prev": has_prev,
+        }
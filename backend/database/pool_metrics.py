@@ -0,0 +1,192 @@
+# backend/database/pool_metrics.py
+"""
+此模块提供数据库连接池的配置参数和运行指标。
+压测时请求会排队等待数据库连接，但默认连接池没有任何可观察的数据，无法判断是连接池过小还是连接被长时间占用。
+这里基于SQLAlchemy连接池事件（connect、checkout、checkin、invalidate、close）统计：
+- 当前借出、空闲和溢出的连接数（直接读取连接池状态）；
+- 累计新建、借出、归还、失效和关闭的连接数；
+- 获取连接的等待时间（包括排队、新建连接和pre-ping），以及等待超时次数；
+- 连接被借出后的占用时间。
+同步引擎和异步引擎各有一个连接池，指标分别统计，可通过/api/metrics/pool查看，据此按部署调整连接池大小。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+from backend.config.settings import settings
+
+
+def engine_options(is_async: bool = False):
+    """
+    根据配置生成create_engine/create_async_engine的连接池参数。
+
+    Args:
+        is_async (bool): 是否为异步引擎（asyncpg），语句超时的传递方式与psycopg2不同
+
+    Returns:
+        dict: 连接池大小、溢出数、等待超时、连接回收时间、pre-ping及连接参数
+    """
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT > 0:
+        # 语句超时在建立连接时设置，对该连接上的所有查询生效（毫秒）
+        timeout = str(settings.DB_STATEMENT_TIMEOUT)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+class PoolMetrics:
+    """
+    单个引擎连接池的运行指标。
+
+    Attributes:
+        name (str): 引擎名称（sync/async）
+
+    Examples:
+        >>> metrics = PoolMetrics("sync")
+        >>> engine = create_engine(url, poolclass=metrics.pool_class(QueuePool), **engine_options())
+        >>> metrics.attach(engine)
+        >>> metrics.snapshot(engine.pool)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats = {
+            "connects": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "invalidated": 0,
+            "closed": 0,
+            "wait_timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "held_seconds_total": 0.0,
+            "held_seconds_max": 0.0,
+        }
+        self._waiting = 0
+
+    def _record_wait(self, elapsed: float, timed_out: bool):
+        with self._lock:
+            self._waiting -= 1
+            if timed_out:
+                self._stats["wait_timeouts"] += 1
+            self._stats["wait_seconds_total"] += elapsed
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], elapsed)
+
+    def pool_class(self, base):
+        """
+        生成记录连接等待时间的连接池类。
+        SQLAlchemy没有"开始等待连接"的事件，因此在连接池的connect()外层计时；
+        连接池在dispose时通过self.__class__重建，生成的类会一同沿用。
+
+        Args:
+            base (type): 连接池基类，如QueuePool或AsyncAdaptedQueuePool
+
+        Returns:
+            type: 连接池子类
+        """
+        metrics = self
+
+        def connect(pool):
+            with metrics._lock:
+                metrics._waiting += 1
+            started = time.monotonic()
+            timed_out = False
+            try:
+                return base.connect(pool)
+            except exc.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                metrics._record_wait(time.monotonic() - started, timed_out)
+
+        return type(f"Instrumented{base.__name__}", (base,), {"connect": connect})
+
+    def attach(self, engine: Engine):
+        """
+        在引擎上注册连接池事件（重建连接池后事件仍然有效）。
+
+        Args:
+            engine (Engine): 同步引擎，异步引擎传入其sync_engine
+        """
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self._stats["connects"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["checked_out_at"] = time.monotonic()
+            with self._lock:
+                self._stats["checkouts"] += 1
+
+        @event.listens_for(engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            checked_out_at = connection_record.info.pop("checked_out_at", None)
+            with self._lock:
+                self._stats["checkins"] += 1
+                if checked_out_at is not None:
+                    held = time.monotonic() - checked_out_at
+                    self._stats["held_seconds_total"] += held
+                    self._stats["held_seconds_max"] = max(self._stats["held_seconds_max"], held)
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self._stats["invalidated"] += 1
+
+        @event.listens_for(engine, "close")
+        def _on_close(dbapi_connection, connection_record):
+            with self._lock:
+                self._stats["closed"] += 1
+
+    def snapshot(self, pool):
+        """
+        获取连接池的当前状态和累计指标。
+
+        Args:
+            pool (Pool): 引擎当前的连接池（engine.pool）
+
+        Returns:
+            dict: 连接池配置、当前借出/空闲/溢出/等待中的连接数，以及累计的连接次数和等待/占用耗时（秒）
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            waiting = self._waiting
+        # 非QueuePool（如测试中使用的SQLite连接池）没有大小和溢出的概念
+        size = pool.size() if hasattr(pool, "size") else None
+        attempts = stats["checkouts"] + stats["wait_timeouts"]
+        return {
+            "pool_class": type(pool).__name__,
+            "pool_size": size,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "timeout_seconds": getattr(pool, "_timeout", None),
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            # QueuePool.overflow()在连接数未超过pool_size时为负数
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+            "waiting": waiting,
+            **stats,
+            "wait_seconds_avg": stats["wait_seconds_total"] / attempts if attempts else 0.0,
+            "held_seconds_avg": (stats["held_seconds_total"] / stats["checkins"]
+                                 if stats["checkins"] else 0.0),
+        }
+
+
+# 同步引擎和异步引擎的连接池指标
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
@@ -6,6 +6,7 @@ Authors: hovi.hyw & AI
 Date: 2025-03-12
 """
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.orm import Session
@@ -13,383 +14,272 @@ from datetime import date, timedelta
 
 from backend.models.stock_model import StockData
 from backend.models.index_model import IndexData
+from backend.database.latest_quote import (
+    sync_latest_quote, get_checked_source_date, quotes_to_items, quotes_to_table, QUOTE_SORT_FIELDS,
+)
+from backend.database.pagination import KeysetPaginator
+from backend.database.count_cache import normalize_search, get_cached_count
+from backend.database.search_index import search_symbols
+from backend.database.reference_series import lookup_reference_change
+from backend.database.kline_cache import kline_cache
+from backend.database.kline_store import kline_store
+from backend.database.kline_period_cache import get_period_frame
+from backend.database.indicator_cache import get_indicators
+from backend.utils.kline_serializer import (
+    frame_to_records,
+    frame_to_columns,
+    STOCK_KLINE_SCHEMA,
+    INDEX_KLINE_SCHEMA,
+    ETF_KLINE_SCHEMA,
+    STOCK_KLINE_COLUMNS,
+    INDEX_KLINE_COLUMNS,
+    ETF_KLINE_COLUMNS,
+    STOCK_REAL_CHANGE_SCHEMA,
+)
+from backend.utils.arrow_serializer import frame_to_table
+from backend.utils.kline_sampling import downsample_kline, OHLC, DAILY, PERIODS
+
+
+# 快照列表的键集分页器，排序字段见QUOTE_SORT_FIELDS
+_quote_paginator = KeysetPaginator(
+    "symbol, name, last_close, change_percent, volume",
+    "FROM latest_quote q WHERE q.asset_type = :asset_type",
+    QUOTE_SORT_FIELDS,
+    tiebreaker="symbol",
+)
+
+
+def get_latest_quote_list(db: Session, asset_type: str, page_size: int = 20, cursor: str | None = None,
+                          search: str | None = None, page: int | None = None, search_name: bool = True,
+                          sort_by: str | None = None, sort_order: str = "asc", items_format: str = "records"):
+    """
+    从latest_quote快照表获取股票、指数或ETF列表。
+    快照表以(asset_type, symbol)为主键，游标分页使用键集定位，任意深度的翻页代价与第一页相同。
 
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，取值为stock、index、etf
+        page_size (int): 每页数量，默认为20
+        cursor (str, optional): 分页游标（上一次返回的next_cursor或prev_cursor）
+        search (str, optional): 搜索关键字
+        page (int, optional): 页码，从1开始，与cursor互斥，优先使用page
+        search_name (bool): 搜索时是否同时匹配名称，默认为True
+        sort_by (str, optional): 排序字段，取值见QUOTE_SORT_FIELDS，默认为symbol
+        sort_order (str): 排序顺序，asc或desc，默认为asc
+        items_format (str): 列表项格式，records为字典列表（默认），arrow为按列构建的Arrow表
+
+    Returns:
+        dict: 包含列表项和分页信息的字典，total_exact为False表示total是估算值
 
-def get_stock_list(db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None):
-    # 优化基础查询 - 使用子查询获取最新价格、涨跌幅和成交量，并关联股票名称
-    base_query = """
-    SELECT 
-        s.symbol, 
-        si.name,
-        s.close as latest_price,
-        CASE 
-            WHEN prev.close IS NOT NULL THEN ((s.close - prev.close) / prev.close * 100)
-            ELSE 0 
-        END as change_percent,
-        s.volume
-    FROM (
-        SELECT symbol, MAX(date) as max_date
-        FROM daily_stock
-        GROUP BY symbol
-    ) latest
-    JOIN daily_stock s ON s.symbol = latest.symbol AND s.date = latest.max_date
-    LEFT JOIN stock_info si ON s.symbol = si.symbol
-    LEFT JOIN (
-        -- 获取前一交易日数据用于计算涨跌幅
-        SELECT ds.symbol, ds.close, ds.date
-        FROM daily_stock ds
-        INNER JOIN (
-            SELECT symbol, MAX(date) as prev_date
-            FROM daily_stock
-            WHERE date < (
-                SELECT MAX(date) FROM daily_stock
-            )
-            GROUP BY symbol
-        ) pd ON ds.symbol = pd.symbol AND ds.date = pd.prev_date
-    ) prev ON s.symbol = prev.symbol
-    """
-    count_base_query = "SELECT COUNT(DISTINCT symbol) FROM daily_stock"
-
-    params = {}
-    where_clauses = []
-
-    # 添加搜索条件
-    if search:
-        # 修改搜索条件，同时匹配股票代码和股票名称
-        where_clauses.append("(s.symbol LIKE :search OR si.name LIKE :search)")
+    Raises:
+        ValueError: 如果排序字段不受支持或游标无效
+    """
+    # 日线表出现新交易日时增量刷新快照（进程内按间隔节流）
+    try:
+        sync_latest_quote(db, asset_type)
+    except Exception as e:
+        print(f"最新行情快照刷新错误: {e}")
+
+    params = {"asset_type": asset_type}
+    filters = []
+
+    # 添加搜索条件：优先用进程内搜索索引解析出候选代码，索引未加载时回退到LIKE
+    search = normalize_search(search)
+    symbol_ids = search_symbols(asset_type, search, search_name) if search else None
+    if symbol_ids is not None:
+        filters.append("q.symbol = ANY(:ids)")
+        params['ids'] = symbol_ids
+    elif search:
+        filters.append("(q.symbol LIKE :search OR q.name LIKE :search)" if search_name else "q.symbol LIKE :search")
         params['search'] = f"%{search}%"
-        # 同时更新计数查询的搜索条件 - 需要使用JOIN来匹配名称
-        count_base_query = """
-        SELECT COUNT(DISTINCT ds.symbol) 
-        FROM daily_stock ds
-        LEFT JOIN stock_info si ON ds.symbol = si.symbol
-        WHERE (ds.symbol LIKE :search OR si.name LIKE :search)
-        """
-
-    # 组合WHERE子句
-    if where_clauses:  # 移除了'and not search'条件，确保搜索条件被正确添加到查询中
-        base_query += " WHERE " + " AND ".join(where_clauses)
-        
-    # 执行计数查询 - 使用缓存变量避免重复计算
-    count_query = text(count_base_query)
+
+    # 读取总数（按资产类型和搜索关键字缓存，检查到日线表水位变化时失效）
+    # 候选代码已由搜索索引确定时，按主键计数足够快，不需要估算
     try:
-        total = db.execute(count_query, params).scalar()
+        total, total_exact = get_cached_count(
+            db, asset_type, search, search_name, _quote_paginator.from_clause, filters, params,
+            allow_estimate=symbol_ids is None,
+        )
     except Exception as e:
         print(f"计数查询错误: {e}")
-        total = 0  # 出错时提供默认值
-
-    # 基于页码的分页 - 优化大页码查询性能
+        total, total_exact = 0, False  # 出错时提供默认值
+
+    result = _quote_paginator.paginate(
+        db, params, page_size,
+        cursor=cursor, sort_by=sort_by, sort_order=sort_order, filters=filters, page=page,
+    )
+
+    response = {
+        "items": (quotes_to_table(result["rows"], asset_type) if items_format == "arrow"
+                  else quotes_to_items(result["rows"], asset_type)),
+        "total": total,
+        "total_exact": total_exact,
+        "page_size": page_size,
+        "next_cursor": result["next_cursor"],
+        "prev_cursor": result["prev_cursor"]
+    }
+    # 基于页码的分页同时返回页码信息，保持兼容性
     if page is not None:
-        try:
-            # 计算偏移量
-            offset = (page - 1) * page_size
-            
-            # 优化大页码查询 - 对于大于3的页码，使用子查询方式避免全表扫描
-            if page > 3:
-                # 先获取当前页的第一个symbol
-                symbol_query = f"""
-                SELECT symbol
-                FROM (
-                    SELECT DISTINCT ds.symbol
-                    FROM daily_stock ds
-                    LEFT JOIN stock_info si ON ds.symbol = si.symbol
-                    {' WHERE (ds.symbol LIKE :search OR si.name LIKE :search)' if search else ''}
-                    ORDER BY ds.symbol ASC
-                    LIMIT 1 OFFSET {offset}
-                ) as first_symbol
-                """
-                
-                try:
-                    first_symbol_result = db.execute(text(symbol_query), params).fetchone()
-                    if first_symbol_result:
-                        first_symbol = first_symbol_result[0]
-                        # 使用symbol作为过滤条件，避免使用大的OFFSET
-                        modified_query = f"""
-                        {base_query}
-                        {' WHERE ' if not search else ' AND '} s.symbol >= :first_symbol
-                        ORDER BY s.symbol ASC LIMIT {page_size}
-                        """
-                        params['first_symbol'] = first_symbol
-                        query = text(modified_query)
-                    else:
-                        # 如果找不到第一个symbol，回退到标准查询
-                        query = text(base_query + f" ORDER BY s.symbol ASC LIMIT {page_size} OFFSET {offset}")
-                except Exception as e:
-                    print(f"获取首个symbol错误: {e}")
-                    # 出错时回退到标准查询
-                    query = text(base_query + f" ORDER BY s.symbol ASC LIMIT {page_size} OFFSET {offset}")
-            else:
-                # 对于小页码，使用标准OFFSET方式
-                query = text(base_query + f" ORDER BY s.symbol ASC LIMIT {page_size} OFFSET {offset}")
-                
-            # 执行查询
-            stocks = pd.read_sql(query, db.bind, params=params)
-        except Exception as e:
-            print(f"分页查询错误: {e}")
-            # 出错时返回空结果
-            return {
-                "items": [],
-                "total": total,
-                "page_size": page_size,
-                "current_page": page,
-                "next_page": None,
-                "prev_page": None,
-                "next_cursor": None,
-                "prev_cursor": None,
-                "error": str(e)
-            }
-        
-        # 计算下一页和上一页的页码
-        has_next = offset + page_size < total
-        has_prev = page > 1
-        
-        # 转换字段名以匹配前端期望的格式
-        result_items = []
-        for _, row in stocks.iterrows():
-            item = {
-                "symbol": row["symbol"],
-                "name": row["name"] if pd.notna(row["name"]) else "N/A",
-                "current_price": float(row["latest_price"]) if pd.notna(row["latest_price"]) else None,
-                "change_percent": float(row["change_percent"]) if pd.notna(row["change_percent"]) else 0,
-                "volume": float(row["volume"]) if pd.notna(row["volume"]) else 0
-            }
-            result_items.append(item)
-            
-        return {
-            "items": result_items,
-            "total": total,
-            "page_size": page_size,
+        response.update({
             "current_page": page,
-            "next_page": page + 1 if has_next else None,
-            "prev_page": page - 1 if has_prev else None,
-            "next_cursor": None,  # 保持兼容性
-            "prev_cursor": None   # 保持兼容性
-        }
-    
-    # 基于游标的分页（保留原有功能）- 优化查询
-    else:
-        # 添加游标条件
-        if cursor:
-            try:
-                # 解码游标（格式：symbol值）
-                cursor_symbol = cursor
-                where_clauses.append("s.symbol > :cursor_symbol")
-                params['cursor_symbol'] = cursor_symbol
-                
-                # 不需要重新组合WHERE子句，使用已优化的base_query
-            except Exception as e:
-                print(f"游标解析错误: {e}")
-                # 如果游标解析失败，忽略游标条件
-                pass
-
-        try:
-            # 添加排序和限制
-            if cursor and 'cursor_symbol' in params:
-                if where_clauses:
-                    query = text(base_query + " AND s.symbol > :cursor_symbol" + 
-                                f" ORDER BY s.symbol ASC LIMIT {page_size + 1}")
-                else:
-                    query = text(base_query + " WHERE s.symbol > :cursor_symbol" + 
-                                f" ORDER BY s.symbol ASC LIMIT {page_size + 1}")
-            else:
-                query = text(base_query + f" ORDER BY s.symbol ASC LIMIT {page_size + 1}")
-
-            # 执行查询
-            stocks = pd.read_sql(query, db.bind, params=params)
-        except Exception as e:
-            print(f"游标分页查询错误: {e}")
-            # 出错时返回空结果
-            return {
-                "items": [],
-                "total": total,
-                "page_size": page_size,
-                "next_cursor": None,
-                "prev_cursor": None,
-                "error": str(e)
-            }
-
-        # 处理游标分页
-        next_cursor = None
-        if len(stocks) > page_size:
-            next_cursor = stocks.iloc[page_size-1]['symbol']
-            stocks = stocks.iloc[:page_size]
-
-        # 计算上一页游标（如果有）
-        prev_cursor = None
-        if cursor:
-            # 获取当前页第一条记录之前的记录
-            if not stocks.empty:
-                first_symbol = stocks.iloc[0]['symbol']
-                prev_query = f"""
-                SELECT ds.symbol
-                FROM (SELECT DISTINCT ds.symbol 
-                      FROM daily_stock ds
-                      LEFT JOIN stock_info si ON ds.symbol = si.symbol
-                      WHERE ds.symbol < :first_symbol
-                      {' AND (ds.symbol LIKE :search OR si.name LIKE :search)' if search else ''}
-                      ORDER BY ds.symbol DESC
-                      LIMIT {page_size}) sub
-                ORDER BY sub.symbol ASC
-                LIMIT 1
-                """
-                prev_params = {'first_symbol': first_symbol}
-                if search:
-                    prev_params['search'] = f"%{search}%"
-                prev_result = db.execute(text(prev_query), prev_params).fetchone()
-                if prev_result:
-                    prev_cursor = prev_result[0]
-
-        # 转换字段名以匹配前端期望的格式
-        result_items = []
-        for _, row in stocks.iterrows():
-            item = {
-                "symbol": row["symbol"],
-                "name": row["name"] if "name" in row and pd.notna(row["name"]) else "N/A",
-                "current_price": float(row["latest_price"]) if pd.notna(row["latest_price"]) else None,
-                "change_percent": float(row["change_percent"]) if "change_percent" in row and pd.notna(row["change_percent"]) else 0,
-                "volume": float(row["volume"]) if "volume" in row and pd.notna(row["volume"]) else 0
-            }
-            result_items.append(item)
+            "next_page": page + 1 if result["has_next"] else None,
+            "prev_page": page - 1 if result["has_prev"] else None,
+        })
+    return response
 
-        return {
-            "items": result_items,
-            "total": total,
-            "page_size": page_size,
-            "next_cursor": next_cursor,
-            "prev_cursor": prev_cursor
-        }
 
+def get_stock_list(db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None,
+                   page: int | None = None, sort_by: str | None = None, sort_order: str = "asc",
+                   items_format: str = "records"):
+    """
+    获取股票列表（读取latest_quote快照）。
 
-def get_index_list(db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None):
-    # 基础查询 - 扩展返回字段，包括名称、涨跌幅和成交量
-    base_query = """
-    SELECT DISTINCT di.symbol,
-           COALESCE(ii.name, 'N/A') as name,  -- 从index_info表获取名称
-           first_value(di.close) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as latest_price,
-           first_value(di.change_rate) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as change_rate,
-           first_value(di.volume) OVER (PARTITION BY di.symbol ORDER BY di.date DESC) as volume
-    FROM daily_index di
-    LEFT JOIN index_info ii ON di.symbol = ii.symbol
+    Args:
+        db (Session): 数据库会话
+        page_size (int): 每页数量，默认为20
+        cursor (str, optional): 分页游标
+        search (str, optional): 搜索关键字，匹配股票代码或名称
+        page (int, optional): 页码，从1开始，与cursor互斥，优先使用page
+        sort_by (str, optional): 排序字段，默认为symbol
+        sort_order (str): 排序顺序，默认为asc
+        items_format (str): 列表项格式，records或arrow
+
+    Returns:
+        dict: 包含股票列表和分页信息的字典
     """
-    count_base_query = "SELECT COUNT(DISTINCT di.symbol) FROM daily_index di"
+    return get_latest_quote_list(db, "stock", page_size, cursor, search, page,
+                                 sort_by=sort_by, sort_order=sort_order, items_format=items_format)
 
-    params = {}
-    where_clauses = []
 
-    # 添加搜索条件
-    if search:
-        where_clauses.append("di.symbol LIKE :search")
-        params['search'] = f"%{search}%"
+def get_index_list(db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None,
+                   page: int | None = None, sort_by: str | None = None, sort_order: str = "asc",
+                   items_format: str = "records"):
+    """
+    获取指数列表（读取latest_quote快照）。
 
-    # 组合WHERE子句
-    if where_clauses:
-        base_query += " WHERE " + " AND ".join(where_clauses)
-        count_base_query += " WHERE " + " AND ".join(where_clauses)
+    Args:
+        db (Session): 数据库会话
+        page_size (int): 每页数量，默认为20
+        cursor (str, optional): 分页游标
+        search (str, optional): 搜索关键字，匹配指数代码
+        page (int, optional): 页码，从1开始，与cursor互斥，优先使用page
+        sort_by (str, optional): 排序字段，默认为symbol
+        sort_order (str): 排序顺序，默认为asc
+        items_format (str): 列表项格式，records或arrow
 
-    # 执行计数查询 - 使用缓存变量避免重复计算
-    count_query = text(count_base_query)
-    try:
-        total = db.execute(count_query, params).scalar()
-    except Exception as e:
-        print(f"计数查询错误: {e}")
-        total = 0  # 出错时提供默认值
+    Returns:
+        dict: 包含指数列表和分页信息的字典
+    """
+    return get_latest_quote_list(db, "index", page_size, cursor, search, page, search_name=False,
+                                 sort_by=sort_by, sort_order=sort_order, items_format=items_format)
+
+
+# K线查询的数据表和字段：资产类型 -> (日线表, 查询字段, 是否支持只提供开始或结束日期)
+KLINE_SOURCES = {
+    "stock": ("daily_stock",
+              "symbol, date, open, close, high, low, volume, amount, outstanding_share, turnover",
+              False),
+    "index": ("daily_index",
+              "symbol, date, open, close, high, low, volume, amount, "
+              "amplitude, change_rate, change_amount, turnover_rate",
+              False),
+    "etf": ("daily_etf",
+            "symbol, date, open, close, high, low, volume, amount, "
+            "amplitude, change_rate, change_amount, turnover_rate",
+            True),
+}
+
+
+def build_kline_query(asset_type: str, symbol: str | list, start_date: date = None, end_date: date = None):
+    """
+    构建按日期升序查询K线原始数据的SQL语句，供一次性读取、流式读取和批量读取共用。
 
-    # 基于页码的分页
-    if page is not None:
-        # 计算偏移量
-        offset = (page - 1) * page_size
-        # 添加排序和限制
-        query = text(base_query + f" ORDER BY symbol ASC LIMIT {page_size} OFFSET {offset}")
-        # 执行查询
-        indices = pd.read_sql(query, db.bind, params=params)
-        
-        # 计算下一页和上一页的页码
-        has_next = offset + page_size < total
-        has_prev = page > 1
-        
-        return {
-            "items": [{
-                "symbol": row["symbol"],
-                "name": row["name"],
-                "current_price": float(row["latest_price"]) if pd.notna(row["latest_price"]) else None,
-                "change_rate": float(row["change_rate"]) if pd.notna(row["change_rate"]) else None,
-                "volume": float(row["volume"]) if pd.notna(row["volume"]) else 0
-            } for _, row in indices.iterrows()],
-            "total": total,
-            "page_size": page_size,
-            "current_page": page,
-            "next_page": page + 1 if has_next else None,
-            "prev_page": page - 1 if has_prev else None,
-            "next_cursor": None,  # 保持兼容性
-            "prev_cursor": None   # 保持兼容性
-        }
-    
-    # 基于游标的分页（保留原有功能）
-    else:
-        # 添加游标条件
-        if cursor:
-            try:
-                # 解码游标（格式：symbol值）
-                cursor_symbol = cursor
-                where_clauses.append("symbol > :cursor_symbol")
-                params['cursor_symbol'] = cursor_symbol
-                
-                # 不需要重新组合WHERE子句，使用已优化的base_query
-                # 游标条件已经添加到where_clauses中
-            except Exception:
-                # 如果游标解析失败，忽略游标条件
-                pass
-
-        # 添加排序和限制
-        query = text(base_query + f" ORDER BY symbol ASC LIMIT {page_size + 1}")
-
-        # 执行查询
-        indices = pd.read_sql(query, db.bind, params=params)
-
-        # 处理游标分页
-        next_cursor = None
-        if len(indices) > page_size:
-            next_cursor = indices.iloc[page_size-1]['symbol']
-            indices = indices.iloc[:page_size]
-
-        # 计算上一页游标（如果有）
-        prev_cursor = None
-        if cursor:
-            # 获取当前页第一条记录之前的记录
-            if not indices.empty:
-                first_symbol = indices.iloc[0]['symbol']
-                prev_query = f"""
-                SELECT symbol
-                FROM (SELECT DISTINCT di.symbol FROM daily_index di
-                      WHERE di.symbol < :first_symbol
-                      {' AND di.symbol LIKE :search' if search else ''}
-                      ORDER BY di.symbol DESC
-                      LIMIT {page_size}) sub
-                ORDER BY sub.symbol ASC
-                LIMIT 1
-                """
-                prev_params = {'first_symbol': first_symbol}
-                if search:
-                    prev_params['search'] = f"%{search}%"
-                prev_result = db.execute(text(prev_query), prev_params).fetchone()
-                if prev_result:
-                    prev_cursor = prev_result[0]
+    Args:
+        asset_type (str): 资产类型，stock、index或etf
+        symbol (str | list): 代码；传入列表时用symbol = ANY(...)一次查询多个代码，结果按代码和日期排序
+        start_date (date, optional): 开始日期
+        end_date (date, optional): 结束日期；股票和指数只在同时提供开始和结束日期时按日期过滤
+
+    Returns:
+        tuple: (SQL语句, 参数字典)
+    """
+    table, fields, open_ended = KLINE_SOURCES[asset_type]
+    batch = isinstance(symbol, (list, tuple))
+    query = f"""
+    SELECT {fields}
+    FROM {table}
+    WHERE {"symbol = ANY(:symbols)" if batch else "symbol = :symbol"}
+    """
+
+    # 如果提供了日期范围，添加日期条件
+    params = {"symbols": list(symbol)} if batch else {"symbol": symbol}
+    if start_date and end_date:
+        query += " AND date BETWEEN :start_date AND :end_date"
+        params["start_date"] = start_date
+        params["end_date"] = end_date
+    elif open_ended and start_date:
+        query += " AND date >= :start_date"
+        params["start_date"] = start_date
+    elif open_ended and end_date:
+        query += " AND date <= :end_date"
+        params["end_date"] = end_date
+
+    query += " ORDER BY symbol, date" if batch else " ORDER BY date"
+    return query, params
+
+
+def _load_kline_history(db: Session, asset_type: str, symbol: str):
+    """
+    读取一个代码的完整日线历史（按日期升序），供日线缓存加载。
+    优先使用日线导出文件，只查询导出日期（含，覆盖同一交易日分批导入）之后的数据；没有导出该代码时查询全部历史。
+    """
+    history, through = kline_store.get_history(asset_type, symbol)
+    if history is None:
+        query, params = build_kline_query(asset_type, symbol)
+        return pd.read_sql(text(query), db.bind, params=params)
+
+    query, params = build_kline_query(asset_type, symbol, through, date.max)
+    recent = pd.read_sql(text(query), db.bind, params=params)
+    if recent.empty:
+        return history
+    history = history[history["date"] < through]
+    if history.empty:
+        return recent
+    return pd.concat([history, recent], ignore_index=True)
+
+
+def _get_cached_kline(db: Session, asset_type: str, symbol: str, start_date: date = None, end_date: date = None):
+    """按日期范围读取K线原始数据，日期规则与build_kline_query相同。"""
+    # 日线表出现新交易日时快照刷新会使缓存失效；检查限频且不阻塞
+    sync_latest_quote(db, asset_type)
+    _, _, open_ended = KLINE_SOURCES[asset_type]
+    # 导出文件覆盖到最近检查到的日线最新日期时直接从映射的文件切片，否则使用进程内日线缓存
+    through = get_checked_source_date(asset_type)
+    if through is not None:
+        frame = kline_store.get_frame(asset_type, symbol, start_date, end_date, open_ended, through)
+        if frame is not None:
+            return frame
+    return kline_cache.get_frame(db, asset_type, symbol, _load_kline_history, start_date, end_date, open_ended)
+
+
+def get_stock_kline_frame(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+    """
+    查询股票K线原始数据（读取日线导出文件或进程内日线缓存）。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 股票代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+    Returns:
+        pandas.DataFrame: 按日期升序排列的股票日线数据
+    """
+    return _get_cached_kline(db, "stock", symbol, start_date, end_date)
 
-        return {
-            "items": [{
-                "symbol": row["symbol"],
-                "name": row["name"],
-                "current_price": float(row["latest_price"]) if pd.notna(row["latest_price"]) else None,
-                "change_rate": float(row["change_rate"]) if pd.notna(row["change_rate"]) else None,
-                "volume": float(row["volume"]) if pd.notna(row["volume"]) else 0
-            } for _, row in indices.iterrows()],
-            "total": total,
-            "page_size": page_size,
-            "next_cursor": next_cursor,
-            "prev_cursor": prev_cursor
-        }
 
-def get_stock_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+def get_stock_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                         max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
     """
     获取股票K线数据。
 
@@ -398,146 +288,303 @@ def get_stock_kline_data(db: Session, symbol: str, start_date: date = None, end_
         symbol (str): 股票代码
         start_date (date, optional): 开始日期，默认为None（获取所有数据）
         end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
 
     Returns:
         list: 股票K线数据列表
     """
-    # 构建查询
-    query = """
-    SELECT symbol, date, open, close, high, low, volume, amount, outstanding_share, turnover
-    FROM daily_stock
-    WHERE symbol = :symbol
-    """
-    
-    # 如果提供了日期范围，添加日期条件
-    params = {"symbol": symbol}
-    if start_date and end_date:
-        query += " AND date BETWEEN :start_date AND :end_date"
-        params["start_date"] = start_date
-        params["end_date"] = end_date
-    
-    query += " ORDER BY date"
-
-    # 执行查询
-    kline_data = pd.read_sql(text(query), db.bind, params=params)
-
-    # 转换为适合ECharts的格式
-    result = []
-    for _, row in kline_data.iterrows():
-        result.append({
-            "date": row["date"].strftime("%Y-%m-%d"),
-            "open": float(row["open"]),
-            "close": float(row["close"]),
-            "high": float(row["high"]),
-            "low": float(row["low"]),
-            "volume": float(row["volume"]),
-            "amount": float(row["amount"]) if pd.notna(row["amount"]) else None,
-            "outstanding_share": float(row["outstanding_share"]) if pd.notna(row["outstanding_share"]) else None,
-            "turnover": float(row["turnover"]) if pd.notna(row["turnover"]) else None
-        })
+    kline_data = get_kline_frame(db, "stock", symbol, start_date, end_date, period)
+    kline_data = downsample_kline(kline_data, max_points, sampling)
 
-    return result
+    # 按列转换为适合ECharts的格式
+    return frame_to_records(kline_data, STOCK_KLINE_SCHEMA)
 
 
-def get_index_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+def get_stock_kline_columns(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                            max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
     """
-    获取指数K线数据。
+    获取列式（每个字段一个数组）的股票K线数据。
 
     Args:
         db (Session): 数据库会话
-        symbol (str): 指数代码
+        symbol (str): 股票代码
         start_date (date, optional): 开始日期，默认为None（获取所有数据）
         end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
 
     Returns:
-        list: 指数K线数据列表
+        dict: 字段名到数组的映射，无数据时返回None
     """
-    # 构建查询
-    query = """
-    SELECT symbol, date, open, close, high, low, volume, amount, 
-           amplitude, change_rate, change_amount, turnover_rate
-    FROM daily_index
-    WHERE symbol = :symbol
+    kline_data = get_kline_frame(db, "stock", symbol, start_date, end_date, period)
+    kline_data = downsample_kline(kline_data, max_points, sampling)
+    if kline_data.empty:
+        return None
+    return frame_to_columns(kline_data, STOCK_KLINE_COLUMNS)
+
+
+# stock_info中按年份记录参考指数的列（index_2020 ~ index_2025）
+REFERENCE_INDEX_YEARS = range(2020, 2026)
+
+
+def _symbol_candidates(symbol: str):
+    """按原有的代码格式兼容规则列出候选代码：原代码优先，其次去掉或依次加上sh/sz/bj前缀。"""
+    if symbol.startswith(('sh', 'sz', 'bj')):
+        return [symbol, symbol[2:]]
+    return [symbol] + [f"{prefix}{symbol}" for prefix in ('sh', 'sz', 'bj')]
+
+
+def _resolve_stored_symbol(db: Session, table: str, symbol: str, condition: str = "", params: dict | None = None):
     """
-    
-    # 如果提供了日期范围，添加日期条件
-    params = {"symbol": symbol}
+    在一次查询中找出表中实际存在的代码写法（按候选顺序取第一个）。
+
+    Returns:
+        str: 表中存在的代码，都不存在时返回None
+    """
+    query = f"""
+    SELECT symbol FROM {table}
+    WHERE symbol = ANY(:candidates){condition}
+    ORDER BY array_position(CAST(:candidates AS TEXT[]), CAST(symbol AS TEXT))
+    LIMIT 1
+    """
+    return db.execute(text(query), {**(params or {}), "candidates": _symbol_candidates(symbol)}).scalar()
+
+
+def get_stock_real_change_data(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                               info_symbol: str | None = None):
+    """
+    获取股票真实涨跌数据及相对于当年参考指数的对比涨跌。
+    K线日期、derived_stock、stock_info中当年的参考指数和derived_index在一条查询中按日期关联，
+    查询次数不随日期范围增长。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 股票代码
+        start_date (date, optional): 开始日期，默认为None
+        end_date (date, optional): 结束日期，默认为None
+        info_symbol (str, optional): stock_info中的代码写法（由代码注册表解析），为None时按候选写法查询
+
+    Returns:
+        tuple: (derived_stock中使用的代码, 按日期升序的数据列表)
+
+    Raises:
+        ValueError: 如果derived_stock中没有该股票或日期范围内没有K线数据
+    """
+    range_params = {"start_date": start_date, "end_date": end_date}
+    range_condition = (" AND (:start_date IS NULL OR date >= :start_date)"
+                       " AND (:end_date IS NULL OR date <= :end_date)")
+
+    used_symbol = _resolve_stored_symbol(db, "derived_stock", symbol, range_condition, range_params)
+    if not used_symbol:
+        raise ValueError(f"Stock with symbol {symbol} not found in derived_stock table")
+    if info_symbol is None:
+        info_symbol = _resolve_stored_symbol(db, "stock_info", used_symbol)
+
+    reference_case = " ".join(f"WHEN {year} THEN si.index_{year}" for year in REFERENCE_INDEX_YEARS)
+    kline_condition = ""
     if start_date and end_date:
-        query += " AND date BETWEEN :start_date AND :end_date"
-        params["start_date"] = start_date
-        params["end_date"] = end_date
-    
-    query += " ORDER BY date"
+        # 与K线查询一致：只有同时提供开始和结束日期时才按日期过滤
+        kline_condition = " AND d.date BETWEEN :start_date AND :end_date"
+    query = f"""
+    WITH k AS (
+        SELECT d.date,
+               CASE CAST(EXTRACT(YEAR FROM d.date) AS INTEGER) {reference_case} END AS reference_index
+        FROM daily_stock d
+        LEFT JOIN stock_info si ON si.symbol = :info_symbol
+        WHERE d.symbol = :symbol{kline_condition}
+    )
+    SELECT k.date,
+           k.reference_index,
+           ds.real_change,
+           di.symbol AS index_symbol,
+           di.real_change AS index_real_change,
+           ii.name AS index_name
+    FROM k
+    LEFT JOIN derived_stock ds ON ds.symbol = :used_symbol AND ds.date = k.date
+        AND (:start_date IS NULL OR ds.date >= :start_date)
+        AND (:end_date IS NULL OR ds.date <= :end_date)
+    LEFT JOIN derived_index di ON di.symbol = k.reference_index AND di.date = k.date
+    LEFT JOIN index_info ii ON ii.symbol = di.symbol
+    ORDER BY k.date
+    """
+    frame = pd.read_sql(text(query), db.bind, params={
+        **range_params,
+        "symbol": symbol,
+        "used_symbol": used_symbol,
+        "info_symbol": info_symbol,
+    })
+    if frame.empty:
+        raise ValueError(f"No data found for stock {symbol} in the specified date range")
+
+    # 当天有参考指数数据时才计算对比涨跌，否则为0并标记为无参考
+    found = frame["index_symbol"].notna().to_numpy()
+    real_change = pd.to_numeric(frame["real_change"], errors="coerce").fillna(0.0)
+    index_real_change = pd.to_numeric(frame["index_real_change"], errors="coerce").fillna(0.0)
+    frame = frame.assign(
+        real_change=real_change,
+        comparative_change=np.where(found, real_change - index_real_change, 0.0),
+        reference_index=frame["reference_index"].fillna(""),
+        reference_name=np.where(
+            found,
+            frame["index_name"].fillna("指数" + frame["reference_index"].fillna("")),
+            "无参考",
+        ),
+    )
+    return used_symbol, frame_to_records(frame, STOCK_REAL_CHANGE_SCHEMA)
+
+
+def _attach_reference_change(db: Session, kline_data: pd.DataFrame, reference_index: str):
+    """
+    为指数或ETF的K线数据合并参考指数涨跌幅，并计算相对涨跌幅。
+
+    Args:
+        db (Session): 数据库会话
+        kline_data (pandas.DataFrame): 指数或ETF日线数据
+        reference_index (str): 参考指数代码
+
+    Returns:
+        pandas.DataFrame: 增加了ref_change_rate和relative_change_rate列的数据
+    """
+    # 参考指数序列缓存在进程内，按日期对齐查找，不再逐次查询daily_index并合并
+    merged_data = kline_data.assign(
+        ref_change_rate=lookup_reference_change(db, reference_index, kline_data["date"])
+    )
 
-    # 执行查询
-    kline_data = pd.read_sql(text(query), db.bind, params=params)
+    # 计算相对涨跌幅（任一方缺失时结果为NaN，序列化后为None）
+    merged_data["relative_change_rate"] = (
+        pd.to_numeric(merged_data["change_rate"], errors="coerce")
+        - pd.to_numeric(merged_data["ref_change_rate"], errors="coerce")
+    )
+    return merged_data
 
-    # 确定参考指数（根据指数代码前缀判断市场）
+
+def get_index_reference(symbol: str):
+    """
+    根据指数代码前缀确定参考指数。
+
+    Args:
+        symbol (str): 指数代码
+
+    Returns:
+        tuple: (参考指数代码, 参考指数名称)
+    """
     if symbol.startswith("000"):
         # 以"000"开头的指数代码多为上证系指数
-        reference_index = "000001"
-        reference_name = "上证综指"
-    elif symbol.startswith("399"):
+        return "000001", "上证综指"
+    if symbol.startswith("399"):
         # 以"399"开头的指数代码多为深证系指数
-        reference_index = "399001"
-        reference_name = "深证综指"
-    else:
-        # 其他情况使用沪深300作为参考
-        reference_index = "000300"
-        reference_name = "沪深300"
-
-    # 获取参考指数数据
-    ref_query = """
-    SELECT date, change_rate as ref_change_rate
-    FROM daily_index
-    WHERE symbol = :ref_symbol
+        return "399001", "深证综指"
+    # 其他情况使用沪深300作为参考
+    return "000300", "沪深300"
+
+
+def get_etf_reference(symbol: str):
     """
-    if start_date and end_date:
-        ref_query += " AND date BETWEEN :start_date AND :end_date"
-    ref_query += " ORDER BY date"
-    
-    ref_params = {
-        "ref_symbol": reference_index,
-        "start_date": start_date,
-        "end_date": end_date
-    }
-    ref_data = pd.read_sql(text(ref_query), db.bind, params=ref_params)
-    
-    # 将参考指数数据与原始数据合并
-    merged_data = pd.merge(kline_data, ref_data, on='date', how='left')
-
-    # 转换为适合ECharts的格式
-    result = []
-    for _, row in merged_data.iterrows():
-        # 计算相对涨跌幅
-        relative_change = None
-        if pd.notna(row["change_rate"]) and pd.notna(row["ref_change_rate"]):
-            relative_change = row["change_rate"] - row["ref_change_rate"]
-
-        result.append({
+    根据ETF代码前缀确定参考指数。
+
+    Args:
+        symbol (str): ETF代码
+
+    Returns:
+        tuple: (参考指数代码, 参考指数名称)
+    """
+    if symbol.startswith("159"):
+        # 以"159"开头的ETF代码为深交所ETF
+        return "399001", "深证综指"
+    if symbol.startswith("510") or symbol.startswith("511") or symbol.startswith("512"):
+        # 以"51"开头的ETF代码为上交所ETF
+        return "000001", "上证综指"
+    # 其他情况使用沪深300作为参考
+    return "000300", "沪深300"
+
+
+def get_index_kline_frame(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+    """
+    查询指数K线原始数据（读取日线导出文件或进程内日线缓存），并合并参考指数涨跌幅。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 指数代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+    Returns:
+        pandas.DataFrame: 按日期升序排列的指数日线数据
+    """
+    kline_data = _get_cached_kline(db, "index", symbol, start_date, end_date)
+
+    reference_index, _ = get_index_reference(symbol)
+    return _attach_reference_change(db, kline_data, reference_index)
+
+
+def get_index_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                         max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
+    """
+    获取指数K线数据。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 指数代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+
+    Returns:
+        list: 指数K线数据列表
+    """
+    merged_data = get_kline_frame(db, "index", symbol, start_date, end_date, period)
+    merged_data = downsample_kline(merged_data, max_points, sampling)
+    reference_index, reference_name = get_index_reference(symbol)
+
+    # 按列转换为适合ECharts的格式
+    return frame_to_records(
+        merged_data,
+        INDEX_KLINE_SCHEMA,
+        constants={
             "symbol": symbol,
-            "date": row["date"],
-            "open": float(row["open"]),
-            "close": float(row["close"]),
-            "high": float(row["high"]),
-            "low": float(row["low"]),
-            "volume": int(row["volume"]) if pd.notna(row["volume"]) else 0,
-            "amount": float(row["amount"]) if pd.notna(row["amount"]) else None,
-            "amplitude": float(row["amplitude"]) if pd.notna(row["amplitude"]) else None,
-            "change_rate": float(row["change_rate"]) if pd.notna(row["change_rate"]) else None,
-            "change_amount": float(row["change_amount"]) if pd.notna(row["change_amount"]) else None,
-            "turnover_rate": float(row["turnover_rate"]) if pd.notna(row["turnover_rate"]) else None,
             "reference_index": reference_index,
             "reference_name": reference_name,
-            "reference_change_rate": float(row["ref_change_rate"]) if pd.notna(row["ref_change_rate"]) else None,
-            "relative_change_rate": float(relative_change) if relative_change is not None else None
-        })
+        },
+        columns={"reference_change_rate": "ref_change_rate"},
+    )
 
-    return result
 
-def get_etf_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+def get_index_kline_columns(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                            max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
     """
-    获取ETF K线数据。
+    获取列式（每个字段一个数组）的指数K线数据。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 指数代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+
+    Returns:
+        dict: 字段名到数组的映射，无数据时返回None
+    """
+    merged_data = get_kline_frame(db, "index", symbol, start_date, end_date, period)
+    merged_data = downsample_kline(merged_data, max_points, sampling)
+    if merged_data.empty:
+        return None
+    return frame_to_columns(
+        merged_data,
+        INDEX_KLINE_COLUMNS,
+        columns={"reference_change_rate": "ref_change_rate"},
+    )
+
+
+def get_etf_kline_frame(db: Session, symbol: str, start_date: date = None, end_date: date = None):
+    """
+    查询ETF K线原始数据（读取日线导出文件或进程内日线缓存），并合并参考指数涨跌幅。
 
     Args:
         db (Session): 数据库会话
@@ -546,105 +593,186 @@ def get_etf_kline_data(db: Session, symbol: str, start_date: date = None, end_da
         end_date (date, optional): 结束日期，默认为None（获取所有数据）
 
     Returns:
-        list: ETF K线数据列表
+        pandas.DataFrame: 按日期升序排列的ETF日线数据
     """
-    # 构建查询
-    query = """
-    SELECT symbol, date, open, close, high, low, volume, amount, 
-           amplitude, change_rate, change_amount, turnover_rate
-    FROM daily_etf
-    WHERE symbol = :symbol
+    kline_data = _get_cached_kline(db, "etf", symbol, start_date, end_date)
+
+    reference_index, _ = get_etf_reference(symbol)
+    return _attach_reference_change(db, kline_data, reference_index)
+
+
+def get_etf_kline_data(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                       max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
     """
-    
-    # 如果提供了日期范围，添加日期条件
-    params = {"symbol": symbol}
-    if start_date and end_date:
-        query += " AND date BETWEEN :start_date AND :end_date"
-        params["start_date"] = start_date
-        params["end_date"] = end_date
-    elif start_date:
-        query += " AND date >= :start_date"
-        params["start_date"] = start_date
-    elif end_date:
-        query += " AND date <= :end_date"
-        params["end_date"] = end_date
-    
-    query += " ORDER BY date"
+    获取ETF K线数据。
 
-    # 执行查询
-    kline_data = pd.read_sql(text(query), db.bind, params=params)
+    Args:
+        db (Session): 数据库会话
+        symbol (str): ETF代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
 
-    # 确定参考指数（根据ETF代码前缀判断市场）
-    if symbol.startswith("159"):
-        # 以"159"开头的ETF代码为深交所ETF
-        reference_index = "399001"
-        reference_name = "深证综指"
-    elif symbol.startswith("510") or symbol.startswith("511") or symbol.startswith("512"):
-        # 以"51"开头的ETF代码为上交所ETF
-        reference_index = "000001"
-        reference_name = "上证综指"
-    else:
-        # 其他情况使用沪深300作为参考
-        reference_index = "000300"
-        reference_name = "沪深300"
-
-    # 获取参考指数数据
-    ref_query = """
-    SELECT date, change_rate as ref_change_rate
-    FROM daily_index
-    WHERE symbol = :ref_symbol
+    Returns:
+        list: ETF K线数据列表
     """
-    if start_date and end_date:
-        ref_query += " AND date BETWEEN :start_date AND :end_date"
-    ref_query += " ORDER BY date"
-    
-    ref_params = {
-        "ref_symbol": reference_index,
-        "start_date": start_date,
-        "end_date": end_date
-    }
-    ref_data = pd.read_sql(text(ref_query), db.bind, params=ref_params)
-    
-    # 将参考指数数据与原始数据合并
-    merged_data = pd.merge(kline_data, ref_data, on='date', how='left')
-
-    # 转换为适合ECharts的格式
-    result = []
-    for _, row in merged_data.iterrows():
-        # 计算相对涨跌幅
-        relative_change = None
-        if pd.notna(row["change_rate"]) and pd.notna(row["ref_change_rate"]):
-            relative_change = row["change_rate"] - row["ref_change_rate"]
-
-        result.append({
+    merged_data = get_kline_frame(db, "etf", symbol, start_date, end_date, period)
+    merged_data = downsample_kline(merged_data, max_points, sampling)
+    reference_index, reference_name = get_etf_reference(symbol)
+
+    # 按列转换为适合ECharts的格式
+    return frame_to_records(
+        merged_data,
+        ETF_KLINE_SCHEMA,
+        constants={
             "symbol": symbol,
-            "date": row["date"],
-            "open": float(row["open"]),
-            "close": float(row["close"]),
-            "high": float(row["high"]),
-            "low": float(row["low"]),
-            "volume": int(row["volume"]) if pd.notna(row["volume"]) else 0,
-            "amount": float(row["amount"]) if pd.notna(row["amount"]) else None,
-            "amplitude": float(row["amplitude"]) if pd.notna(row["amplitude"]) else None,
-            "change_rate": float(row["change_rate"]) if pd.notna(row["change_rate"]) else None,
-            "change_amount": float(row["change_amount"]) if pd.notna(row["change_amount"]) else None,
-            "turnover_rate": float(row["turnover_rate"]) if pd.notna(row["turnover_rate"]) else None,
             "reference_index": reference_index,
             "reference_name": reference_name,
-            "reference_change_rate": float(row["ref_change_rate"]) if pd.notna(row["ref_change_rate"]) else None,
-            "relative_change_rate": float(relative_change) if relative_change is not None else None
-        })
+        },
+        columns={"reference_change_rate": "ref_change_rate"},
+    )
+
+
+def get_etf_kline_columns(db: Session, symbol: str, start_date: date = None, end_date: date = None,
+                          max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
+    """
+    获取列式（每个字段一个数组）的ETF K线数据。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): ETF代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+
+    Returns:
+        dict: 字段名到数组的映射，无数据时返回None
+    """
+    merged_data = get_kline_frame(db, "etf", symbol, start_date, end_date, period)
+    merged_data = downsample_kline(merged_data, max_points, sampling)
+    if merged_data.empty:
+        return None
+    return frame_to_columns(
+        merged_data,
+        ETF_KLINE_COLUMNS,
+        columns={"reference_change_rate": "ref_change_rate"},
+    )
+
+
+# 资产类型 -> K线原始数据查询函数
+_KLINE_FRAME_LOADERS = {
+    "stock": get_stock_kline_frame,
+    "index": get_index_kline_frame,
+    "etf": get_etf_kline_frame,
+}
 
-    return result
+
+def get_kline_frame(db: Session, asset_type: str, symbol: str, start_date: date = None, end_date: date = None,
+                    period: str = DAILY):
+    """
+    获取K线原始数据：日线直接查询；周线、月线、季线读取按代码缓存的完整历史合并结果，再按日期范围筛选周期。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，stock、index或etf
+        symbol (str): 代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        period (str): K线周期，D、W、M或Q
+
+    Returns:
+        pandas.DataFrame: 按日期升序排列的K线数据，周期K线的日期为周期最后一个交易日
+
+    Raises:
+        ValueError: 如果周期未知
+    """
+    load = _KLINE_FRAME_LOADERS[asset_type]
+    if period == DAILY:
+        return load(db, symbol, start_date, end_date)
+    if period not in PERIODS:
+        raise ValueError(f"Unknown K-line period: {period}")
+
+    # 检查到日线表水位变化时周期缓存失效；检查限频且不阻塞。
+    # ETF的参考指数涨跌幅依赖指数日线，同时检查指数
+    sync_latest_quote(db, asset_type)
+    if asset_type == "etf":
+        sync_latest_quote(db, "index")
+    _, _, open_ended = KLINE_SOURCES[asset_type]
+    return get_period_frame(db, asset_type, symbol, period, load, start_date, end_date, open_ended)
+
+
+def get_kline_indicators(db: Session, asset_type: str, symbol: str, dates, specs, period: str = DAILY):
+    """
+    获取与K线日期对齐的技术指标。指标在该代码的完整历史上计算并缓存，与返回的日期范围和降采样方式无关。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，stock、index或etf
+        symbol (str): 代码
+        dates (iterable): 返回的K线日期（升序）
+        specs (iterable): IndicatorSpec列表
+        period (str): K线周期，D、W、M或Q
+
+    Returns:
+        dict: 输出列名 -> 与dates等长的float64数组
+    """
+    # 快照刷新后指标缓存从递推状态追加新K线；检查限频且不阻塞
+    sync_latest_quote(db, asset_type)
+
+    def load(db, symbol, start_date=None):
+        # 股票和指数只在同时提供开始和结束日期时按日期过滤，追加新K线时以date.max作为结束日期
+        return get_kline_frame(db, asset_type, symbol, start_date, date.max if start_date else None, period)
+
+    return get_indicators(db, asset_type, symbol, period, specs, dates, load)
+
+
+# 资产类型 -> 列式字段定义
+_KLINE_TABLE_SCHEMAS = {
+    "stock": STOCK_KLINE_COLUMNS,
+    "index": INDEX_KLINE_COLUMNS,
+    "etf": ETF_KLINE_COLUMNS,
+}
+
+
+def get_kline_table(db: Session, asset_type: str, symbol: str, start_date: date = None, end_date: date = None,
+                    max_points: int | None = None, sampling: str = OHLC, period: str = DAILY):
+    """
+    获取Arrow表格式的K线数据（字段与列式格式相同，日期为date32，缺失值为null），
+    供format=arrow和format=parquet直接序列化。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，stock、index或etf
+        symbol (str): 代码
+        start_date (date, optional): 开始日期，默认为None（获取所有数据）
+        end_date (date, optional): 结束日期，默认为None（获取所有数据）
+        max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+        sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+        period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+
+    Returns:
+        pyarrow.Table: K线数据表，无数据时返回None
+    """
+    kline_data = get_kline_frame(db, asset_type, symbol, start_date, end_date, period)
+    kline_data = downsample_kline(kline_data, max_points, sampling)
+    if kline_data.empty:
+        return None
+    return frame_to_table(kline_data, _KLINE_TABLE_SCHEMAS[asset_type],
+                          columns={"reference_change_rate": "ref_change_rate"})
 
 
-def get_etf_info(db: Session, symbol: str):
+def get_etf_info(db: Session, symbol: str, info_symbol: str | None = None):
     """
     获取ETF基本信息。
 
     Args:
         db (Session): 数据库会话
         symbol (str): ETF代码
+        info_symbol (str, optional): etf_info中的代码写法（由代码注册表解析），默认与symbol相同
 
     Returns:
         dict: ETF基本信息
@@ -653,7 +781,7 @@ def get_etf_info(db: Session, symbol: str):
     name_query = """
     SELECT name FROM etf_info WHERE symbol = :symbol
     """
-    name_result = db.execute(text(name_query), {"symbol": symbol}).fetchone()
+    name_result = db.execute(text(name_query), {"symbol": info_symbol or symbol}).fetchone()
     
     if not name_result:
         return None
@@ -690,13 +818,14 @@ def get_etf_info(db: Session, symbol: str):
     }
 
 
-def get_stock_info(db: Session, symbol: str):
+def get_stock_info(db: Session, symbol: str, info_symbol: str | None = None):
     """
     获取股票基本信息。
 
     Args:
         db (Session): 数据库会话
         symbol (str): 股票代码
+        info_symbol (str, optional): stock_info中的代码写法（由代码注册表解析），默认与symbol相同
 
     Returns:
         dict: 股票基本信息
@@ -713,7 +842,7 @@ def get_stock_info(db: Session, symbol: str):
     WHERE symbol = :symbol
     LIMIT 1
     """
-    name_result = pd.read_sql(text(name_query), db.bind, params={"symbol": symbol})
+    name_result = pd.read_sql(text(name_query), db.bind, params={"symbol": info_symbol or symbol})
     stock_name = name_result.iloc[0]['name'] if not name_result.empty else None
 
     # 从daily_stock表获取最新数据
@@ -742,13 +871,14 @@ def get_stock_info(db: Session, symbol: str):
     stock_info['name'] = stock_name
     return stock_info
 
-def get_index_info(db: Session, symbol: str):
+def get_index_info(db: Session, symbol: str, info_symbol: str | None = None):
     """
     获取指数基本信息。
 
     Args:
         db (Session): 数据库会话
         symbol (str): 指数代码
+        info_symbol (str, optional): index_info中的代码写法（由代码注册表解析），默认与symbol相同
 
     Returns:
         dict: 指数基本信息
@@ -760,7 +890,7 @@ def get_index_info(db: Session, symbol: str):
     WHERE symbol = :symbol
     LIMIT 1
     """
-    name_result = pd.read_sql(text(name_query), db.bind, params={"symbol": symbol})
+    name_result = pd.read_sql(text(name_query), db.bind, params={"symbol": info_symbol or symbol})
     index_name = name_result.iloc[0]['name'] if not name_result.empty else None
 
     # 从daily_index表获取最新数据
@@ -0,0 +1,125 @@
+# backend/database/reference_series.py
+"""
+此模块在进程内缓存参考指数（000001、399001、000300）的日涨跌幅序列。
+指数和ETF的K线接口需要逐日对比参考指数涨跌幅，原实现每次请求都重新查询daily_index再pd.merge；
+参考指数只有三条，且每个交易日才变化一次，因此按日期升序保存为NumPy数组，
+请求时用二分查找按日期对齐，不再访问数据库。
+各进程检查到daily_index水位变化（无论快照由哪个进程刷新）时整体失效；
+请求的K线日期晚于缓存的最后日期时也会重新加载一次，以覆盖快照尚未检查到的新数据。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import logging
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 参考指数代码 -> ReferenceSeries；加载时整体替换单个条目，读取无需加锁。
+# 加载也不加锁：并发的首次请求可能各加载一次，但序列只有三条，而持锁等待数据库会阻塞异步会话所在的事件循环
+_series = {}
+
+
+class ReferenceSeries(NamedTuple):
+    """
+    参考指数的日涨跌幅序列。
+
+    Attributes:
+        dates (numpy.ndarray): 按升序排列的交易日（datetime64[D]）
+        change_rate (numpy.ndarray): 对应的涨跌幅（float64，缺失为NaN）
+        checked_through (numpy.datetime64): 已确认数据库中不晚于该日期的数据都已加载
+    """
+    dates: np.ndarray
+    change_rate: np.ndarray
+    checked_through: np.datetime64
+
+
+def _to_days(values):
+    """将日期序列转换为datetime64[D]数组。"""
+    return pd.to_datetime(pd.Series(values)).to_numpy().astype("datetime64[D]")
+
+
+def load_reference_series(db: Session, symbol: str, checked_through=None):
+    """
+    从daily_index加载某个参考指数的完整日涨跌幅序列并放入缓存。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 参考指数代码
+        checked_through (numpy.datetime64, optional): 触发加载的请求日期，序列最后日期更早时以此为准，
+            避免参考指数当天确实缺数据时每次请求都重新加载
+
+    Returns:
+        ReferenceSeries: 加载的序列
+    """
+    query = """
+    SELECT date, change_rate
+    FROM daily_index
+    WHERE symbol = :symbol
+    ORDER BY date
+    """
+    frame = pd.read_sql(text(query), db.bind, params={"symbol": symbol})
+    dates = _to_days(frame["date"])
+    change_rate = pd.to_numeric(frame["change_rate"], errors="coerce").to_numpy(dtype=np.float64)
+    last_date = dates[-1] if len(dates) else np.datetime64("NaT", "D")
+    if checked_through is not None and (np.isnat(last_date) or checked_through > last_date):
+        last_date = checked_through
+    series = ReferenceSeries(dates, change_rate, last_date)
+    _series[symbol] = series
+    logger.info("参考指数序列加载完成: symbol=%s, days=%s", symbol, len(dates))
+    return series
+
+
+def get_reference_series(db: Session, symbol: str, through=None):
+    """
+    获取参考指数序列，未缓存或请求日期晚于已加载范围时从数据库加载。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 参考指数代码
+        through (numpy.datetime64, optional): 本次请求需要的最后日期
+
+    Returns:
+        ReferenceSeries: 参考指数序列
+    """
+    series = _series.get(symbol)
+    if series is not None and (through is None or not through > series.checked_through):
+        return series
+    return load_reference_series(db, symbol, through)
+
+
+def lookup_reference_change(db: Session, symbol: str, dates):
+    """
+    按日期对齐查找参考指数涨跌幅。
+
+    Args:
+        db (Session): 数据库会话
+        symbol (str): 参考指数代码
+        dates (iterable): 需要对齐的日期序列
+
+    Returns:
+        numpy.ndarray: 与dates等长的涨跌幅数组，参考指数当天无数据时为NaN
+    """
+    days = _to_days(dates)
+    if not len(days):
+        return np.empty(0, dtype=np.float64)
+    series = get_reference_series(db, symbol, days.max())
+
+    result = np.full(len(days), np.nan)
+    if not len(series.dates):
+        return result
+    positions = np.searchsorted(series.dates, days)
+    clipped = np.minimum(positions, len(series.dates) - 1)
+    matched = series.dates[clipped] == days
+    result[matched] = series.change_rate[clipped[matched]]
+    return result
+
+
+def invalidate_reference_series():
+    """清空参考指数序列缓存，下次请求时重新加载。"""
+    _series.clear()
@@ -0,0 +1,306 @@
+# backend/database/search_index.py
+"""
+此模块为股票、指数和ETF列表的搜索提供进程内n-gram索引。
+LIKE '%关键字%'无法使用B-tree索引，每次搜索都要顺序扫描；这里在进程内为代码和名称建立1~3-gram倒排表，
+把搜索关键字解析为候选代码列表，列表查询再以symbol = ANY(:ids)过滤。
+另为搜索框联想建立前缀树（代码、名称及名称拼音首字母），每个节点预存按最新成交量排序的前若干项。
+索引在应用启动时加载，各进程检查到日线表水位变化（即有新数据导入，无论快照由哪个进程刷新）时按资产类型重建；未加载时调用方回退到LIKE。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import heapq
+import logging
+import re
+from collections import defaultdict
+
+from pypinyin import lazy_pinyin, Style
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 各资产类型的信息表
+SEARCH_SOURCES = {
+    "stock": "stock_info",
+    "index": "index_info",
+    "etf": "etf_info",
+}
+
+# 联想接口最多返回的条数，也是前缀树每个节点预存的条数
+SUGGEST_MAX_LIMIT = 20
+
+# 资产类型 -> {"symbol": NGramIndex, "name": NGramIndex, "suggest": PrefixTrie}；重建时整体替换，读取无需加锁
+_indexes = {}
+
+# 带交易所前缀的代码，如sh600000
+_EXCHANGE_PREFIX = re.compile(r"^[a-z]+(?=\d)")
+
+
+class NGramIndex:
+    """
+    子串搜索用的n-gram倒排索引。
+    为每个文本的所有1~n-gram建立到键的倒排表：长度不超过n的关键字直接查表，
+    更长的关键字对其各个n-gram的倒排表求交集，再逐个校验是否真正包含关键字。
+    匹配区分大小写，与PostgreSQL的LIKE一致。
+
+    Attributes:
+        n (int): 最大gram长度
+
+    Examples:
+        >>> index = NGramIndex()
+        >>> index.build({"sh600519": "贵州茅台", "sz000858": "五粮液"})
+        >>> sorted(index.search("茅台"))
+        ['sh600519']
+    """
+
+    def __init__(self, n: int = 3):
+        self.n = n
+        self._postings = {}
+        self._texts = {}
+
+    def build(self, texts: dict):
+        """
+        根据键到文本的映射重建索引。
+
+        Args:
+            texts (dict): 键（代码）到待搜索文本的映射，文本为空时跳过
+        """
+        postings = defaultdict(set)
+        for key, value in texts.items():
+            if not value:
+                continue
+            for size in range(1, self.n + 1):
+                for start in range(len(value) - size + 1):
+                    postings[value[start:start + size]].add(key)
+        self._postings = {gram: frozenset(keys) for gram, keys in postings.items()}
+        self._texts = {key: value for key, value in texts.items() if value}
+
+    def search(self, term: str):
+        """
+        查找文本中包含term的所有键。
+
+        Args:
+            term (str): 搜索关键字
+
+        Returns:
+            frozenset: 匹配的键集合
+        """
+        if len(term) <= self.n:
+            return self._postings.get(term, frozenset())
+
+        grams = {term[start:start + self.n] for start in range(len(term) - self.n + 1)}
+        postings = sorted((self._postings.get(gram, frozenset()) for gram in grams), key=len)
+        # 从最短的倒排表开始求交集，候选集为空时提前结束
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        return frozenset(key for key in candidates if term in self._texts[key])
+
+    def __len__(self):
+        return len(self._texts)
+
+
+class _TrieNode:
+    """前缀树节点。构建期间items收集经过该节点的全部条目，构建完成后只保留top。"""
+    __slots__ = ("children", "items", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.items = set()
+        self.top = ()
+
+
+class PrefixTrie:
+    """
+    联想用的前缀树。
+    每个节点预存匹配该前缀、按分值从高到低排序的前top_k个条目，查询只需沿前缀走到节点后截取，
+    耗时与条目总数无关。
+
+    Attributes:
+        top_k (int): 每个节点预存的条目数
+
+    Examples:
+        >>> trie = PrefixTrie(top_k=5)
+        >>> trie.build([(("600519", "gzmt"), "sh600519", 3.0), (("600000", "pfyh"), "sh600000", 5.0)])
+        >>> trie.search("600")
+        ('sh600000', 'sh600519')
+    """
+
+    def __init__(self, top_k: int = SUGGEST_MAX_LIMIT):
+        self.top_k = top_k
+        self._root = _TrieNode()
+
+    def build(self, entries):
+        """
+        重建前缀树。
+
+        Args:
+            entries (iterable): (keys, item, score)三元组，keys为该条目可被匹配的全部键，
+                item为返回的条目（需可哈希、可比较），score为排序分值
+        """
+        root = _TrieNode()
+        scores = {}
+        for keys, item, score in entries:
+            scores[item] = score
+            for key in set(keys):
+                node = root
+                for char in key:
+                    node = node.children.setdefault(char, _TrieNode())
+                    node.items.add(item)
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            # 分值相同时按条目本身排序，保证不同进程的结果一致
+            node.top = tuple(sorted(node.items, key=lambda item: (-scores[item], item))[:self.top_k])
+            node.items = None
+            stack.extend(node.children.values())
+        self._root = root
+
+    def search(self, prefix: str, limit: int | None = None):
+        """
+        查找以prefix开头的条目。
+
+        Args:
+            prefix (str): 前缀
+            limit (int, optional): 最多返回的条数，默认为top_k
+
+        Returns:
+            tuple: 按分值从高到低排序的条目
+        """
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return ()
+        return node.top[:limit or self.top_k]
+
+
+def pinyin_initials(name: str):
+    """
+    获取名称的拼音首字母，非汉字部分原样保留，如“贵州茅台”为gzmt、“沪深300ETF”为hs300etf。
+
+    Args:
+        name (str): 名称
+
+    Returns:
+        str: 小写的拼音首字母
+    """
+    return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+
+
+def _suggest_keys(symbol: str, name: str | None):
+    """生成条目可被联想匹配的键：代码、去掉交易所前缀的代码、名称、名称拼音首字母。"""
+    symbol = symbol.lower()
+    keys = [symbol, _EXCHANGE_PREFIX.sub("", symbol)]
+    if name:
+        keys.extend((name.lower(), pinyin_initials(name)))
+    return keys
+
+
+def refresh_search_index(db: Session, asset_type: str):
+    """
+    从信息表和latest_quote快照重建某类资产的搜索索引和联想前缀树。
+    快照中的代码也纳入索引，保证没有信息表记录的代码仍能按代码搜索到；联想结果按快照中的最新成交量排序。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，取值为stock、index、etf
+
+    Returns:
+        int: 索引中的代码数量
+    """
+    query = f"""
+    SELECT symbol, name FROM {SEARCH_SOURCES[asset_type]}
+    UNION
+    SELECT symbol, name FROM latest_quote WHERE asset_type = :asset_type
+    """
+    names = {}
+    for symbol, name in db.execute(text(query), {"asset_type": asset_type}):
+        if symbol is not None and (name or symbol not in names):
+            names[symbol] = name
+
+    volumes = dict(db.execute(
+        text("SELECT symbol, volume FROM latest_quote WHERE asset_type = :asset_type"),
+        {"asset_type": asset_type},
+    ).all())
+
+    symbol_index = NGramIndex()
+    symbol_index.build({symbol: symbol for symbol in names})
+    name_index = NGramIndex()
+    name_index.build(names)
+    suggest_trie = PrefixTrie()
+    suggest_trie.build(
+        (
+            _suggest_keys(symbol, name),
+            (asset_type, symbol, name or symbol, float(volumes.get(symbol) or 0)),
+            float(volumes.get(symbol) or 0),
+        )
+        for symbol, name in names.items()
+    )
+    _indexes[asset_type] = {"symbol": symbol_index, "name": name_index, "suggest": suggest_trie}
+    logger.info("搜索索引加载完成: asset_type=%s, symbols=%s", asset_type, len(names))
+    return len(names)
+
+
+def load_search_indexes(db: Session):
+    """
+    加载所有资产类型的搜索索引，单个类型加载失败不影响其他类型（该类型继续使用LIKE搜索）。
+
+    Args:
+        db (Session): 数据库会话
+    """
+    for asset_type in SEARCH_SOURCES:
+        try:
+            refresh_search_index(db, asset_type)
+        except Exception as e:
+            db.rollback()
+            logger.error("搜索索引加载失败: asset_type=%s, error=%s", asset_type, e)
+
+
+def search_symbols(asset_type: str, term: str, search_name: bool = True):
+    """
+    将搜索关键字解析为候选代码列表。
+
+    Args:
+        asset_type (str): 资产类型
+        term (str): 规范化后的搜索关键字
+        search_name (bool): 是否同时匹配名称，默认为True
+
+    Returns:
+        list: 按代码排序的匹配代码列表；该类型索引未加载时返回None
+    """
+    indexes = _indexes.get(asset_type)
+    if indexes is None:
+        return None
+    matched = indexes["symbol"].search(term)
+    if search_name:
+        matched = matched | indexes["name"].search(term)
+    return sorted(matched)
+
+
+def suggest(term: str, limit: int = 10, asset_type: str | None = None):
+    """
+    按前缀联想代码、名称或拼音首字母，返回最新成交量最大的若干项。
+
+    Args:
+        term (str): 输入的前缀，不区分大小写
+        limit (int): 返回条数，默认为10，最大为SUGGEST_MAX_LIMIT
+        asset_type (str, optional): 资产类型，为None时在全部类型中联想
+
+    Returns:
+        list: 联想结果，每项为(资产类型, 代码, 名称, 成交量)元组，按成交量从高到低排列
+    """
+    prefix = term.strip().lower()
+    if not prefix:
+        return []
+    limit = min(limit, SUGGEST_MAX_LIMIT)
+    candidates = []
+    for current_type in ([asset_type] if asset_type else SEARCH_SOURCES):
+        indexes = _indexes.get(current_type)
+        if indexes is not None:
+            candidates.extend(indexes["suggest"].search(prefix, limit))
+    return heapq.nlargest(limit, candidates, key=lambda item: item[3])
@@ -0,0 +1,148 @@
+# backend/database/symbol_registry.py
+"""
+此模块维护代码规范化注册表。
+接口收到的代码可能写成600000、sh600000、SH600000或600000.SH，信息表和日线表中的写法也不一定相同；
+注册表在应用启动时从信息表和latest_quote快照（与日线表写法一致）加载，以6位数字代码为规范键，
+记录该代码在信息表和日线表中的实际写法。服务层据此一次解析，不再逐个前缀重试查询，
+未知代码直接拒绝而不访问数据库。各进程检查到日线表水位变化（即有新数据导入，无论快照由哪个进程刷新）时按资产类型重建。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import logging
+import re
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.database.search_index import SEARCH_SOURCES
+
+logger = logging.getLogger(__name__)
+
+# 资产类型 -> {"info": {规范键: 信息表写法}, "daily": {规范键: 日线表写法}}；重建时整体替换，读取无需加锁
+_registry = {}
+
+# 可选的交易所前缀或后缀 + 6位数字代码，如600000、sh600000、600000.sh
+_SYMBOL_PATTERN = re.compile(r"^(?:sh|sz|bj)?(\d{6})(?:\.(?:sh|sz|bj))?$")
+
+
+class ResolvedSymbol(NamedTuple):
+    """
+    代码解析结果。
+
+    Attributes:
+        asset_type (str): 资产类型
+        key (str): 规范键（6位数字代码，其他格式为小写原代码）
+        info_symbol (str): 信息表中的写法，信息表中不存在时为None
+        daily_symbol (str): 日线表中的写法，日线表中不存在时为None
+    """
+    asset_type: str
+    key: str
+    info_symbol: str | None
+    daily_symbol: str | None
+
+
+def symbol_key(symbol: str):
+    """
+    计算代码的规范键：去掉交易所前缀/后缀后的6位数字代码，不符合该格式的代码取小写原值。
+
+    Args:
+        symbol (str): 任意写法的代码
+
+    Returns:
+        str: 规范键
+
+    Examples:
+        >>> symbol_key("600000.SH"), symbol_key("sh600000"), symbol_key("600000")
+        ('600000', '600000', '600000')
+    """
+    lowered = symbol.strip().lower()
+    match = _SYMBOL_PATTERN.match(lowered)
+    return match.group(1) if match else lowered
+
+
+def refresh_symbol_registry(db: Session, asset_type: str):
+    """
+    从信息表和latest_quote快照重建某类资产的代码注册表。
+
+    Args:
+        db (Session): 数据库会话
+        asset_type (str): 资产类型，取值为stock、index、etf
+
+    Returns:
+        int: 规范键数量
+    """
+    info_symbols = db.execute(text(f"SELECT symbol FROM {SEARCH_SOURCES[asset_type]}")).scalars().all()
+    daily_symbols = db.execute(
+        text("SELECT symbol FROM latest_quote WHERE asset_type = :asset_type"),
+        {"asset_type": asset_type},
+    ).scalars().all()
+
+    entry = {
+        "info": {symbol_key(symbol): symbol for symbol in info_symbols if symbol},
+        "daily": {symbol_key(symbol): symbol for symbol in daily_symbols if symbol},
+    }
+    _registry[asset_type] = entry
+    count = len(entry["info"].keys() | entry["daily"].keys())
+    logger.info("代码注册表加载完成: asset_type=%s, symbols=%s", asset_type, count)
+    return count
+
+
+def load_symbol_registry(db: Session):
+    """
+    加载所有资产类型的代码注册表，单个类型加载失败时该类型不做解析（按原代码查询）。
+
+    Args:
+        db (Session): 数据库会话
+    """
+    for asset_type in SEARCH_SOURCES:
+        try:
+            refresh_symbol_registry(db, asset_type)
+        except Exception as e:
+            db.rollback()
+            logger.error("代码注册表加载失败: asset_type=%s, error=%s", asset_type, e)
+
+
+def resolve_symbol(symbol: str, asset_type: str):
+    """
+    将任意可接受的写法解析为规范键及其在各表中的实际写法。
+
+    Args:
+        symbol (str): 接口收到的代码
+        asset_type (str): 资产类型
+
+    Returns:
+        ResolvedSymbol: 解析结果；该类型注册表未加载时各表写法均为原代码
+
+    Raises:
+        ValueError: 如果注册表已加载且代码不存在
+    """
+    entry = _registry.get(asset_type)
+    if entry is None:
+        return ResolvedSymbol(asset_type, symbol, symbol, symbol)
+    key = symbol_key(symbol)
+    info_symbol = entry["info"].get(key)
+    daily_symbol = entry["daily"].get(key)
+    if info_symbol is None and daily_symbol is None:
+        raise ValueError(f"Unknown {asset_type} symbol: {symbol}")
+    return ResolvedSymbol(asset_type, key, info_symbol, daily_symbol)
+
+
+def lookup_symbol(symbol: str):
+    """
+    在所有资产类型中查找代码。
+
+    Args:
+        symbol (str): 接口收到的代码
+
+    Returns:
+        list: ResolvedSymbol列表，同一写法可能同时对应股票和指数（如000001）
+    """
+    matches = []
+    for asset_type in _registry:
+        try:
+            matches.append(resolve_symbol(symbol, asset_type))
+        except ValueError:
+            continue
+    return matches
@@ -12,7 +12,12 @@ import logging
 
 from backend.api.router import api_router
 from backend.config.settings import settings
-from backend.database.connection import engine, Base
+from backend.database.connection import engine, async_engine, Base, SessionLocal
+from backend.database.latest_quote import ensure_latest_quote_table, sync_all_latest_quotes
+from backend.database.search_index import load_search_indexes
+from backend.database.symbol_registry import load_symbol_registry
+from backend.utils.market_refresher import market_refresher
+from backend.utils.upstream_executor import upstream_executor
 
 # 配置日志
 logging.basicConfig(
@@ -45,13 +50,33 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def startup_event():
     """
     应用启动时执行的事件。
-    创建数据库表（如果不存在）。
+    创建数据库表（如果不存在），同步最新行情快照并加载搜索索引，启动行情数据后台刷新。
     """
     logger.info("Starting up the application...")
     # 创建数据库表（如果不存在）
     # 注意：在生产环境中，应该使用数据库迁移工具
     # Base.metadata.create_all(bind=engine)
 
+    # 创建并同步最新行情快照表，列表接口直接读取该表
+    try:
+        ensure_latest_quote_table(engine)
+        db = SessionLocal()
+        try:
+            refreshed = sync_all_latest_quotes(db, force=True)
+            logger.info(f"latest_quote snapshot synced: {refreshed}")
+            # 加载列表搜索使用的进程内n-gram索引
+            load_search_indexes(db)
+            # 加载代码规范化注册表
+            load_symbol_registry(db)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Failed to prepare latest_quote snapshot: {e}")
+
+    # 启动首页行情数据的后台刷新，接口直接读取刷新好的快照
+    if settings.MARKET_REFRESH_ENABLED:
+        market_refresher.start()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -59,6 +84,10 @@ async def shutdown_event():
     应用关闭时执行的事件。
     """
     logger.info("Shutting down the application...")
+    # 停止后台刷新，关闭异步引擎的连接池和上游调用线程池
+    await market_refresher.stop()
+    await async_engine.dispose()
+    upstream_executor.shutdown()
 
 
 @app.get("/")
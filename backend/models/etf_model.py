@@ -9,7 +9,7 @@ Date: 2025-03-25
 from sqlalchemy import Column, String, Float, Date, BigInteger, PrimaryKeyConstraint
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 from backend.database.connection import Base
 
@@ -167,6 +167,7 @@ class ETFList(BaseModel):
     Attributes:
         items (List[ETFInfo]): ETF列表
         total (int): 总数
+        total_exact (bool): total是否为精确值（宽泛搜索时为估算值）
         page (int): 当前页码
         page_size (int): 每页数量
         next_cursor (Optional[str]): 下一页游标
@@ -174,6 +175,7 @@ class ETFList(BaseModel):
     """
     items: List[ETFInfo]
     total: int
+    total_exact: bool = True
     page: int
     page_size: int
     next_cursor: Optional[str] = None
@@ -191,9 +193,11 @@ class ETFKlineData(BaseModel):
         data (List[ETFData]): K线数据列表
         reference_index (Optional[str]): 参考指数代码
         reference_name (Optional[str]): 参考指数名称
+        indicators (Optional[Dict[str, List[Optional[float]]]]): 技术指标，输出列名 -> 与data对齐的数组
     """
     symbol: str
     name: str
     data: List[ETFData]
     reference_index: Optional[str] = None
-    reference_name: Optional[str] = None
\ No newline at end of file
+    reference_name: Optional[str] = None
+    indicators: Optional[Dict[str, List[Optional[float]]]] = None
\ No newline at end of file
@@ -0,0 +1,46 @@
+# backend/models/kline_model.py
+"""
+此模块定义了批量K线查询的模型类。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
+
+from backend.config.settings import settings
+
+
+class KlineBatchItem(BaseModel):
+    """
+    批量K线请求中的代码项。
+
+    Attributes:
+        symbol (str): 代码
+        asset_type (str): 资产类型，取值为stock、index、etf
+    """
+    symbol: str
+    asset_type: Literal["stock", "index", "etf"]
+
+
+class KlineBatchRequest(BaseModel):
+    """
+    批量K线请求API模型。
+
+    Attributes:
+        symbols (List[Union[str, KlineBatchItem]]): 代码列表，元素为代码字符串（资产类型取asset_type）
+            或带资产类型的代码项，可混合不同资产类型
+        asset_type (str): 代码字符串的默认资产类型，默认为stock
+        start_date (Optional[str]): 开始日期 (YYYY-MM-DD)
+        end_date (Optional[str]): 结束日期 (YYYY-MM-DD)
+        format (str): 返回格式：records(逐日对象列表)、columnar(每个字段一个数组)、ndjson(流式输出，每个代码一行)
+        max_points (Optional[int]): 每个代码的最大数据点数，超过时在服务端降采样
+        sampling (str): 降采样方式：ohlc(按区间合并为K线)、lttb(按收盘价选取原始数据点)
+    """
+    symbols: List[Union[str, KlineBatchItem]] = Field(..., min_length=1, max_length=settings.KLINE_BATCH_MAX_SYMBOLS)
+    asset_type: Literal["stock", "index", "etf"] = "stock"
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    format: Literal["records", "columnar", "ndjson"] = "records"
+    max_points: Optional[int] = Field(None, ge=3)
+    sampling: Literal["ohlc", "lttb"] = "ohlc"
@@ -0,0 +1,66 @@
+# backend/models/latest_quote_model.py
+"""
+此模块定义了最新行情快照的模型类。
+latest_quote表为股票、指数和ETF各保存一行最新行情，供列表接口直接按索引读取。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from sqlalchemy import Column, String, Float, Date, DateTime, PrimaryKeyConstraint, Index, func
+
+from backend.database.connection import Base
+
+
+class LatestQuote(Base):
+    """
+    最新行情快照数据库模型。
+    对应数据库中的latest_quote表，由daily_stock、daily_index、daily_etf增量维护。
+
+    Attributes:
+        asset_type (str): 资产类型，取值为stock、index、etf
+        symbol (str): 代码
+        name (str): 名称
+        last_close (float): 最新收盘价
+        prev_close (float): 前一交易日收盘价
+        change_percent (float): 涨跌幅（%）
+        volume (float): 最新成交量
+        last_date (date): 最新数据日期
+        updated_at (datetime): 快照更新时间
+    """
+    __tablename__ = "latest_quote"
+
+    asset_type = Column(String(10), nullable=False)
+    symbol = Column(String(20), nullable=False)
+    name = Column(String(100))
+    last_close = Column(Float)
+    prev_close = Column(Float)
+    change_percent = Column(Float)
+    volume = Column(Float)
+    last_date = Column(Date)
+    updated_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint('asset_type', 'symbol'),
+        Index('idx_latest_quote_last_date', 'asset_type', 'last_date'),
+    )
+
+    def __repr__(self):
+        return f"<LatestQuote(asset_type={self.asset_type}, symbol={self.symbol}, last_date={self.last_date})>"
+
+
+class LatestQuoteState(Base):
+    """
+    最新行情快照的全量重建记录。
+    全量重建（修正历史数据后）可能由任一进程执行，其他进程通过rebuilt_at的变化得知需要在完整历史上重新计算缓存。
+
+    Attributes:
+        asset_type (str): 资产类型，取值为stock、index、etf
+        rebuilt_at (datetime): 最近一次全量重建的时间
+    """
+    __tablename__ = "latest_quote_state"
+
+    asset_type = Column(String(10), primary_key=True)
+    rebuilt_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<LatestQuoteState(asset_type={self.asset_type}, rebuilt_at={self.rebuilt_at})>"
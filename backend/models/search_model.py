@@ -0,0 +1,39 @@
+# backend/models/search_model.py
+"""
+此模块定义了搜索联想的模型类。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from pydantic import BaseModel
+from typing import List
+
+
+class SuggestItem(BaseModel):
+    """
+    联想结果项API模型。
+    用于API响应的Pydantic模型。
+
+    Attributes:
+        asset_type (str): 资产类型，取值为stock、index、etf
+        symbol (str): 代码
+        name (str): 名称
+        volume (float): 最新成交量
+    """
+    asset_type: str
+    symbol: str
+    name: str
+    volume: float
+
+
+class SuggestResult(BaseModel):
+    """
+    联想结果API模型。
+    用于API响应的Pydantic模型。
+
+    Attributes:
+        query (str): 输入的前缀
+        items (List[SuggestItem]): 按最新成交量从高到低排列的联想结果
+    """
+    query: str
+    items: List[SuggestItem]
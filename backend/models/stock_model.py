@@ -9,7 +9,7 @@ Date: 2025-03-12
 from sqlalchemy import Column, String, Float, Date, PrimaryKeyConstraint
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 from backend.database.connection import Base
 
@@ -125,12 +125,14 @@ class StockList(BaseModel):
     Attributes:
         items (List[dict]): 股票列表项
         total (int): 总数
+        total_exact (bool): total是否为精确值（宽泛搜索时为估算值）
         page_size (int): 每页数量
         next_cursor (Optional[str]): 下一页游标
         prev_cursor (Optional[str]): 上一页游标
     """
     items: List[dict]
     total: int
+    total_exact: bool = True
     page_size: int
     next_cursor: Optional[str] = None
     prev_cursor: Optional[str] = None
@@ -144,6 +146,8 @@ class StockKlineData(BaseModel):
     Attributes:
         symbol (str): 股票代码
         data (List[dict]): K线数据列表
+        indicators (Optional[Dict[str, List[Optional[float]]]]): 技术指标，输出列名 -> 与data对齐的数组
     """
     symbol: str
-    data: List[dict]
\ No newline at end of file
+    data: List[dict]
+    indicators: Optional[Dict[str, List[Optional[float]]]] = None
\ No newline at end of file
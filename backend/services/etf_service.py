@@ -7,11 +7,28 @@ Date: 2025-03-25
 """
 
 from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import pandas as pd
 
-from backend.database.queries import get_etf_kline_data, get_etf_info
+from backend.database import async_queries
+from backend.database.kline_stream import open_kline_stream
+from backend.database.queries import (
+    get_latest_quote_list,
+    get_etf_kline_data,
+    get_etf_kline_columns,
+    get_kline_indicators,
+    get_etf_info,
+    get_etf_reference,
+)
+from backend.database.latest_quote import sync_latest_quote
+from backend.database.count_cache import normalize_search
+from backend.database.search_index import search_symbols
+from backend.database.symbol_registry import resolve_symbol
+from backend.utils.arrow_serializer import append_columns, with_metadata
+from backend.utils.indicators import indicators_to_json
+from backend.utils.kline_sampling import OHLC, DAILY
 
 
 class ETFService:
@@ -23,130 +40,37 @@ class ETFService:
         get_etf_list: 获取ETF列表
         get_etf_info: 获取ETF详情
         get_etf_kline: 获取ETF K线数据
+        get_etf_kline_columns: 获取列式ETF K线数据
+        get_etf_list_async: 获取ETF列表（异步会话）
+        get_etf_kline_async: 获取ETF K线数据（异步会话）
+        get_etf_kline_columns_async: 获取列式ETF K线数据（异步会话）
+        get_etf_kline_table_async: 获取Arrow表格式的ETF K线数据（异步会话）
+        stream_etf_kline: 流式获取ETF K线数据（NDJSON）
     """    
     
-    def get_etf_list(self, db: Session, page: int = 1, page_size: int = 20, search: str | None = None):
+    def get_etf_list(self, db: Session, page: int | None = 1, page_size: int = 20, search: str | None = None,
+                     cursor: str | None = None, sort_by: str | None = None, sort_order: str = "asc"):
         """
-        获取ETF列表。
+        获取ETF列表（读取latest_quote快照）。
 
         Args:
             db (Session): 数据库会话
-            page (int, optional): 页码，默认为1
+            page (int, optional): 页码，默认为1；为None时按cursor分页
             page_size (int, optional): 每页数量，默认为20
             search (str, optional): 搜索关键词，默认为None
+            cursor (str, optional): 分页游标，page为None时使用
+            sort_by (str, optional): 排序字段，取值为symbol、name、price、change、volume，默认为symbol
+            sort_order (str): 排序顺序，asc或desc，默认为asc
 
         Returns:
             dict: 包含ETF列表、总数和分页信息的字典
 
         Raises:
+            ValueError: 如果排序字段不受支持或游标无效
             Exception: 如果查询失败
         """
-        # 构建基础查询 - 获取最新价格、涨跌幅和成交量，并关联ETF名称
-        base_query = """
-        SELECT 
-            e.symbol, 
-            ei.name,
-            e.close as latest_price,
-            CASE 
-                WHEN prev.close IS NOT NULL THEN ((e.close - prev.close) / prev.close * 100)
-                ELSE 0 
-            END as change_percent,
-            e.volume
-        FROM (
-            SELECT symbol, MAX(date) as max_date
-            FROM daily_etf
-            GROUP BY symbol
-        ) latest
-        JOIN daily_etf e ON e.symbol = latest.symbol AND e.date = latest.max_date
-        LEFT JOIN etf_info ei ON e.symbol = ei.symbol
-        LEFT JOIN (
-            -- 获取前一交易日数据用于计算涨跌幅
-            SELECT de.symbol, de.close, de.date
-            FROM daily_etf de
-            INNER JOIN (
-                SELECT symbol, MAX(date) as prev_date
-                FROM daily_etf
-                WHERE date < (
-                    SELECT MAX(date) FROM daily_etf
-                )
-                GROUP BY symbol
-            ) pd ON de.symbol = pd.symbol AND de.date = pd.prev_date
-        ) prev ON e.symbol = prev.symbol
-        """
-        count_base_query = "SELECT COUNT(DISTINCT symbol) FROM daily_etf"
-
-        params = {}
-        where_clauses = []
-
-        # 添加搜索条件
-        if search:
-            where_clauses.append("(e.symbol LIKE :search OR ei.name LIKE :search)")
-            params['search'] = f"%{search}%"
-            # 更新计数查询的搜索条件
-            count_base_query = """
-            SELECT COUNT(DISTINCT de.symbol) 
-            FROM daily_etf de
-            LEFT JOIN etf_info ei ON de.symbol = ei.symbol
-            WHERE (de.symbol LIKE :search OR ei.name LIKE :search)
-            """
-
-        # 组合WHERE子句
-        if where_clauses:
-            base_query += " WHERE " + " AND ".join(where_clauses)
-            
-        # 执行计数查询
-        count_query = text(count_base_query)
-        try:
-            total = db.execute(count_query, params).scalar()
-        except Exception as e:
-            print(f"计数查询错误: {e}")
-            total = 0  # 出错时提供默认值
-
-        # 计算偏移量
-        offset = (page - 1) * page_size
-        
-        try:
-            # 添加排序和限制
-            query = text(base_query + f" ORDER BY e.symbol ASC LIMIT {page_size} OFFSET {offset}")
-            
-            # 执行查询
-            etfs = pd.read_sql(query, db.bind, params=params)
-        except Exception as e:
-            print(f"分页查询错误: {e}")
-            # 出错时返回空结果
-            return {
-                "items": [],
-                "total": total,
-                "page_size": page_size,
-                "current_page": page,
-                "next_page": None,
-                "prev_page": None
-            }
-        
-        # 计算下一页和上一页的页码
-        has_next = offset + page_size < total
-        has_prev = page > 1
-        
-        # 转换字段名以匹配前端期望的格式
-        result_items = []
-        for _, row in etfs.iterrows():
-            item = {
-                "symbol": row["symbol"],
-                "name": row["name"] if pd.notna(row["name"]) else "N/A",
-                "latest_price": float(row["latest_price"]) if pd.notna(row["latest_price"]) else None,
-                "change_rate": float(row["change_percent"]) if pd.notna(row["change_percent"]) else 0,
-                "volume": float(row["volume"]) if pd.notna(row["volume"]) else 0
-            }
-            result_items.append(item)
-            
-        return {
-            "items": result_items,
-            "total": total,
-            "page_size": page_size,
-            "current_page": page,
-            "next_page": page + 1 if has_next else None,
-            "prev_page": page - 1 if has_prev else None
-        }
+        return get_latest_quote_list(db, "etf", page_size, cursor, search, page,
+                                     sort_by=sort_by, sort_order=sort_order)
 
     def get_etf_info(self, db: Session, symbol: str):
         """
@@ -162,12 +86,15 @@ class ETFService:
         Raises:
             ValueError: 如果ETF不存在
         """
-        etf_info = get_etf_info(db, symbol)
+        resolved = resolve_symbol(symbol, "etf")
+        etf_info = get_etf_info(db, resolved.daily_symbol or symbol, resolved.info_symbol)
         if not etf_info:
             raise ValueError(f"ETF with symbol {symbol} not found")
         return etf_info
 
-    def get_etf_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None):
+    def get_etf_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                      max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                      indicators: tuple = ()):
         """
         获取ETF K线数据。
 
@@ -176,6 +103,10 @@ class ETFService:
             symbol (str): ETF代码
             start_date (date, optional): 开始日期，默认为None（获取所有数据）
             end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
 
         Returns:
             dict: 包含ETF代码、名称和K线数据的字典
@@ -183,24 +114,78 @@ class ETFService:
         Raises:
             ValueError: 如果未找到数据
         """
+        resolved = resolve_symbol(symbol, "etf")
+        symbol = resolved.daily_symbol or symbol
         # 调用queries.py中的函数获取K线数据
-        kline_data = get_etf_kline_data(db, symbol, start_date, end_date)
+        kline_data = get_etf_kline_data(db, symbol, start_date, end_date, max_points, sampling, period)
 
         if not kline_data:
             raise ValueError(f"No data found for ETF {symbol} in the specified date range")
 
         # 获取ETF名称
-        etf_info = get_etf_info(db, symbol)
+        etf_info = get_etf_info(db, symbol, resolved.info_symbol)
         if not etf_info:
             raise ValueError(f"ETF with symbol {symbol} not found")
 
         # 构建返回结果
-        return {
+        result = {
             "symbol": symbol,
             "name": etf_info.get("name", "N/A"), # 使用 .get() 避免 KeyError
             "data": kline_data
         }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = get_kline_indicators(db, "etf", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
         
+    def get_etf_kline_columns(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                              max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                              indicators: tuple = ()):
+        """
+        获取列式ETF K线数据（每个字段一个数组，不逐行构建字典）。
+
+        Args:
+            db (Session): 数据库会话
+            symbol (str): ETF代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            dict: 包含ETF代码、名称、参考指数和列式K线数据的字典
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        resolved = resolve_symbol(symbol, "etf")
+        symbol = resolved.daily_symbol or symbol
+        columns = get_etf_kline_columns(db, symbol, start_date, end_date, max_points, sampling, period)
+        if not columns:
+            raise ValueError(f"No data found for ETF {symbol} in the specified date range")
+
+        etf_info = get_etf_info(db, symbol, resolved.info_symbol)
+        if not etf_info:
+            raise ValueError(f"ETF with symbol {symbol} not found")
+
+        reference_index, reference_name = get_etf_reference(symbol)
+
+        result = {
+            "symbol": symbol,
+            "name": etf_info.get("name", "N/A"),
+            "format": "columnar",
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+            "data": columns,
+        }
+        if indicators:
+            values = get_kline_indicators(db, "etf", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
     def get_high_volume_etf_list(self, db: Session, page: int = 1, page_size: int = 20, search: str | None = None):
         """
         获取高成交额高振幅ETF列表。
@@ -251,31 +236,16 @@ class ETFService:
                 AND AVG(rd.amplitude) > 0.5
         )
         SELECT 
-            e.symbol, 
-            ei.name,
-            e.close as latest_price,
-            CASE 
-                WHEN prev.close IS NOT NULL THEN ((e.close - prev.close) / prev.close * 100)
-                ELSE 0 
-            END as change_percent,
-            e.volume,
+            q.symbol, 
+            q.name,
+            q.last_close as latest_price,
+            q.change_percent,
+            q.volume,
             s.avg_amount,
             s.avg_amplitude
         FROM etf_stats s
-        JOIN (SELECT symbol, MAX(date) as max_date FROM daily_etf GROUP BY symbol) latest ON s.symbol = latest.symbol
-        JOIN daily_etf e ON e.symbol = latest.symbol AND e.date = latest.max_date
-        LEFT JOIN etf_info ei ON e.symbol = ei.symbol
-        LEFT JOIN (
-            -- 获取前一交易日数据用于计算涨跌幅
-            SELECT de.symbol, de.close, de.date
-            FROM daily_etf de
-            INNER JOIN (
-                SELECT symbol, MAX(date) as prev_date
-                FROM daily_etf
-                WHERE date < (SELECT MAX(date) FROM daily_etf)
-                GROUP BY symbol
-            ) pd ON de.symbol = pd.symbol AND de.date = pd.prev_date
-        ) prev ON e.symbol = prev.symbol
+        -- 最新价格和涨跌幅直接读取latest_quote快照
+        JOIN latest_quote q ON q.asset_type = 'etf' AND q.symbol = s.symbol
         """
         
         count_query = """
@@ -315,11 +285,18 @@ class ETFService:
         params = {}
         where_clauses = []
 
-        # 添加搜索条件
-        if search:
-            where_clauses.append("(e.symbol LIKE :search OR ei.name LIKE :search)")
+        # 添加搜索条件：优先用进程内搜索索引解析出候选代码，索引未加载时回退到LIKE
+        search = normalize_search(search)
+        symbol_ids = search_symbols("etf", search) if search else None
+        if symbol_ids is not None:
+            where_clauses.append("q.symbol = ANY(:ids)")
+            params['ids'] = symbol_ids
+        elif search:
+            where_clauses.append("(q.symbol LIKE :search OR q.name LIKE :search)")
             params['search'] = f"%{search}%"
-            # 更新计数查询的搜索条件
+
+        # 计数查询使用与列表相同的搜索条件（搜索索引的候选代码或LIKE）
+        if search:
             count_query = """
             WITH etf_stats AS (
                 SELECT 
@@ -344,8 +321,15 @@ class ETFService:
             SELECT COUNT(DISTINCT s.symbol) 
             FROM etf_stats s
             LEFT JOIN etf_info ei ON s.symbol = ei.symbol
-            WHERE (s.symbol LIKE :search OR ei.name LIKE :search)
-            """
+            WHERE {search_clause}
+            """.format(search_clause="s.symbol = ANY(:ids)" if symbol_ids is not None
+                       else "(s.symbol LIKE :search OR ei.name LIKE :search)")
+
+        # 日线表出现新交易日时增量刷新快照
+        try:
+            sync_latest_quote(db, "etf")
+        except Exception as e:
+            print(f"最新行情快照刷新错误: {e}")
 
         # 组合WHERE子句
         if where_clauses:
@@ -405,4 +389,143 @@ class ETFService:
             "current_page": page,
             "next_page": page + 1 if has_next else None,
             "prev_page": page - 1 if has_prev else None
-        }
\ No newline at end of file
+        }
+
+    async def get_etf_list_async(self, db: AsyncSession, page: int | None = 1, page_size: int = 20,
+                                 search: str | None = None, cursor: str | None = None,
+                                 sort_by: str | None = None, sort_order: str = "asc", items_format: str = "records"):
+        """
+        获取ETF列表（异步会话，参数和返回值同get_etf_list）。
+        items_format为arrow时列表项为Arrow表。
+        """
+        return await async_queries.get_latest_quote_list(db, "etf", page_size, cursor, search, page,
+                                                         sort_by=sort_by, sort_order=sort_order,
+                                                         items_format=items_format)
+
+    async def get_etf_kline_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                  end_date: date | None = None,
+                                  max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                  indicators: tuple = ()):
+        """
+        获取ETF K线数据（异步会话，参数和返回值同get_etf_kline）。
+        """
+        resolved = resolve_symbol(symbol, "etf")
+        symbol = resolved.daily_symbol or symbol
+        kline_data = await async_queries.get_etf_kline_data(db, symbol, start_date, end_date, max_points, sampling,
+                                                            period)
+        if not kline_data:
+            raise ValueError(f"No data found for ETF {symbol} in the specified date range")
+
+        etf_info = await async_queries.get_etf_info(db, symbol, resolved.info_symbol)
+        if not etf_info:
+            raise ValueError(f"ETF with symbol {symbol} not found")
+
+        result = {
+            "symbol": symbol,
+            "name": etf_info.get("name", "N/A"),
+            "data": kline_data
+        }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = await async_queries.get_kline_indicators(db, "etf", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_etf_kline_columns_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                          end_date: date | None = None,
+                                          max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                          indicators: tuple = ()):
+        """
+        获取列式ETF K线数据（异步会话，参数和返回值同get_etf_kline_columns）。
+        """
+        resolved = resolve_symbol(symbol, "etf")
+        symbol = resolved.daily_symbol or symbol
+        columns = await async_queries.get_etf_kline_columns(db, symbol, start_date, end_date, max_points, sampling,
+                                                            period)
+        if not columns:
+            raise ValueError(f"No data found for ETF {symbol} in the specified date range")
+
+        etf_info = await async_queries.get_etf_info(db, symbol, resolved.info_symbol)
+        if not etf_info:
+            raise ValueError(f"ETF with symbol {symbol} not found")
+
+        reference_index, reference_name = get_etf_reference(symbol)
+
+        result = {
+            "symbol": symbol,
+            "name": etf_info.get("name", "N/A"),
+            "format": "columnar",
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+            "data": columns,
+        }
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "etf", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_etf_kline_table_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                        end_date: date | None = None,
+                                        max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                        indicators: tuple = ()):
+        """
+        获取Arrow表格式的ETF K线数据（异步会话），供format=arrow和format=parquet使用。
+        字段与列式格式相同，ETF代码、名称和参考指数写入表的schema元数据。
+
+        Args:
+            db (AsyncSession): 异步数据库会话
+            symbol (str): ETF代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            pyarrow.Table: K线数据表
+
+        Raises:
+            ValueError: 如果未找到数据或ETF不存在
+        """
+        resolved = resolve_symbol(symbol, "etf")
+        symbol = resolved.daily_symbol or symbol
+        table = await async_queries.get_kline_table(db, "etf", symbol, start_date, end_date, max_points, sampling,
+                                                    period)
+        if table is None:
+            raise ValueError(f"No data found for ETF {symbol} in the specified date range")
+
+        etf_info = await async_queries.get_etf_info(db, symbol, resolved.info_symbol)
+        if not etf_info:
+            raise ValueError(f"ETF with symbol {symbol} not found")
+
+        reference_index, reference_name = get_etf_reference(symbol)
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "etf", symbol, table.column("date").to_numpy(),
+                                                              indicators, period)
+            table = append_columns(table, values)
+        return with_metadata(table, {
+            "symbol": symbol,
+            "name": etf_info.get("name", "N/A"),
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+        })
+
+    async def stream_etf_kline(self, symbol: str, start_date: date | None = None, end_date: date | None = None):
+        """
+        流式获取ETF K线数据：通过服务端游标分块读取，每行输出一个与records格式相同的K线对象（NDJSON）。
+        使用独立的异步会话，不依赖请求的会话。
+
+        Args:
+            symbol (str): ETF代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+        Returns:
+            AsyncIterator[bytes]: NDJSON数据块
+
+        Raises:
+            ValueError: 如果ETF代码未知或未找到数据
+        """
+        symbol = resolve_symbol(symbol, "etf").daily_symbol or symbol
+        return await open_kline_stream("etf", symbol, start_date, end_date)
@@ -7,9 +7,23 @@ Date: 2025-03-12
 """
 
 from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.database.queries import get_index_list, get_index_kline_data, get_index_info
+from backend.database import async_queries
+from backend.database.kline_stream import open_kline_stream
+from backend.database.queries import (
+    get_index_list,
+    get_index_kline_data,
+    get_index_kline_columns,
+    get_kline_indicators,
+    get_index_info,
+    get_index_reference,
+)
+from backend.database.symbol_registry import resolve_symbol
+from backend.utils.arrow_serializer import append_columns, with_metadata
+from backend.utils.indicators import indicators_to_json
+from backend.utils.kline_sampling import OHLC, DAILY
 
 
 class IndexService:
@@ -21,6 +35,12 @@ class IndexService:
         get_index_list: 获取指数列表
         get_index_info: 获取指数详情
         get_index_kline: 获取指数K线数据
+        get_index_kline_columns: 获取列式指数K线数据
+        get_index_list_async: 获取指数列表（异步会话）
+        get_index_kline_async: 获取指数K线数据（异步会话）
+        get_index_kline_columns_async: 获取列式指数K线数据（异步会话）
+        get_index_kline_table_async: 获取Arrow表格式的指数K线数据（异步会话）
+        stream_index_kline: 流式获取指数K线数据（NDJSON）
 
     Examples:
         >>> from sqlalchemy.orm import Session
@@ -28,7 +48,8 @@ class IndexService:
         >>> indices = service.get_index_list(db, page=1, page_size=10)
     """
 
-    def get_index_list(self, db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None):
+    def get_index_list(self, db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None,
+                       sort_by: str | None = None, sort_order: str = "asc"):
         """
         获取指数列表。
 
@@ -38,6 +59,8 @@ class IndexService:
             cursor (str, optional): 分页游标，用于获取下一页数据
             search (str, optional): 搜索关键字
             page (int, optional): 页码，从1开始，与cursor互斥，优先使用page
+            sort_by (str, optional): 排序字段，取值为symbol、name、price、change、volume，默认为symbol
+            sort_order (str): 排序顺序，asc或desc，默认为asc
 
         Returns:
             dict: 包含指数列表和分页信息的字典
@@ -55,7 +78,7 @@ class IndexService:
                 # 如果转换失败，使用空字符串
                 search_str = ""
         
-        return get_index_list(db, page_size, cursor, search_str, page)
+        return get_index_list(db, page_size, cursor, search_str, page, sort_by, sort_order)
 
     def get_index_info(self, db: Session, symbol: str):
         """
@@ -71,12 +94,15 @@ class IndexService:
         Raises:
             ValueError: 如果指数不存在
         """
-        index_info = get_index_info(db, symbol)
+        resolved = resolve_symbol(symbol, "index")
+        index_info = get_index_info(db, resolved.daily_symbol or symbol, resolved.info_symbol)
         if not index_info:
             raise ValueError(f"Index with symbol {symbol} not found")
         return index_info
 
-    def get_index_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None):
+    def get_index_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                        max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                        indicators: tuple = ()):
         """
         获取指数K线数据。
 
@@ -85,6 +111,10 @@ class IndexService:
             symbol (str): 指数代码
             start_date (date, optional): 开始日期，默认为None（获取所有数据）
             end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
 
         Returns:
             dict: 包含指数代码、名称和K线数据的字典
@@ -92,18 +122,199 @@ class IndexService:
         Raises:
             ValueError: 如果未找到数据
         """
+        resolved = resolve_symbol(symbol, "index")
+        symbol = resolved.daily_symbol or symbol
         # 调用queries.py中的函数获取K线数据
-        kline_data = get_index_kline_data(db, symbol, start_date, end_date)
+        kline_data = get_index_kline_data(db, symbol, start_date, end_date, max_points, sampling, period)
 
         if not kline_data:
             raise ValueError(f"No data found for index {symbol} in the specified date range")
 
         # 获取指数名称
-        index_info = get_index_info(db, symbol)
+        index_info = get_index_info(db, symbol, resolved.info_symbol)
         name = index_info.get('name') if index_info else None
 
-        return {
+        result = {
             "symbol": symbol,
             "name": name,
             "data": kline_data,
-        }
\ No newline at end of file
+        }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = get_kline_indicators(db, "index", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    def get_index_kline_columns(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                                max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                indicators: tuple = ()):
+        """
+        获取列式指数K线数据（每个字段一个数组，不逐行构建字典）。
+
+        Args:
+            db (Session): 数据库会话
+            symbol (str): 指数代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            dict: 包含指数代码、名称、参考指数和列式K线数据的字典
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        resolved = resolve_symbol(symbol, "index")
+        symbol = resolved.daily_symbol or symbol
+        columns = get_index_kline_columns(db, symbol, start_date, end_date, max_points, sampling, period)
+        if not columns:
+            raise ValueError(f"No data found for index {symbol} in the specified date range")
+
+        index_info = get_index_info(db, symbol, resolved.info_symbol)
+        reference_index, reference_name = get_index_reference(symbol)
+
+        result = {
+            "symbol": symbol,
+            "name": index_info.get('name') if index_info else None,
+            "format": "columnar",
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+            "data": columns,
+        }
+        if indicators:
+            values = get_kline_indicators(db, "index", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_index_list_async(self, db: AsyncSession, page_size: int = 20, cursor: str | None = None,
+                                   search: str | None = None, page: int | None = None,
+                                   sort_by: str | None = None, sort_order: str = "asc", items_format: str = "records"):
+        """
+        获取指数列表（异步会话，参数和返回值同get_index_list）。
+        items_format为arrow时列表项为Arrow表。
+        """
+        search_str = str(search) if search is not None and str(search).strip() else ""
+        return await async_queries.get_index_list(db, page_size, cursor, search_str, page, sort_by, sort_order,
+                                                  items_format=items_format)
+
+    async def get_index_kline_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                    end_date: date | None = None,
+                                    max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                    indicators: tuple = ()):
+        """
+        获取指数K线数据（异步会话，参数和返回值同get_index_kline）。
+        """
+        resolved = resolve_symbol(symbol, "index")
+        symbol = resolved.daily_symbol or symbol
+        kline_data = await async_queries.get_index_kline_data(db, symbol, start_date, end_date, max_points, sampling,
+                                                              period)
+        if not kline_data:
+            raise ValueError(f"No data found for index {symbol} in the specified date range")
+
+        index_info = await async_queries.get_index_info(db, symbol, resolved.info_symbol)
+        result = {
+            "symbol": symbol,
+            "name": index_info.get('name') if index_info else None,
+            "data": kline_data,
+        }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = await async_queries.get_kline_indicators(db, "index", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_index_kline_columns_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                            end_date: date | None = None,
+                                            max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                            indicators: tuple = ()):
+        """
+        获取列式指数K线数据（异步会话，参数和返回值同get_index_kline_columns）。
+        """
+        resolved = resolve_symbol(symbol, "index")
+        symbol = resolved.daily_symbol or symbol
+        columns = await async_queries.get_index_kline_columns(db, symbol, start_date, end_date, max_points, sampling,
+                                                              period)
+        if not columns:
+            raise ValueError(f"No data found for index {symbol} in the specified date range")
+
+        index_info = await async_queries.get_index_info(db, symbol, resolved.info_symbol)
+        reference_index, reference_name = get_index_reference(symbol)
+
+        result = {
+            "symbol": symbol,
+            "name": index_info.get('name') if index_info else None,
+            "format": "columnar",
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+            "data": columns,
+        }
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "index", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_index_kline_table_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                          end_date: date | None = None,
+                                          max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                          indicators: tuple = ()):
+        """
+        获取Arrow表格式的指数K线数据（异步会话），供format=arrow和format=parquet使用。
+        字段与列式格式相同，指数代码、名称和参考指数写入表的schema元数据。
+
+        Args:
+            db (AsyncSession): 异步数据库会话
+            symbol (str): 指数代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            pyarrow.Table: K线数据表
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        resolved = resolve_symbol(symbol, "index")
+        symbol = resolved.daily_symbol or symbol
+        table = await async_queries.get_kline_table(db, "index", symbol, start_date, end_date, max_points, sampling,
+                                                    period)
+        if table is None:
+            raise ValueError(f"No data found for index {symbol} in the specified date range")
+
+        index_info = await async_queries.get_index_info(db, symbol, resolved.info_symbol)
+        reference_index, reference_name = get_index_reference(symbol)
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "index", symbol, table.column("date").to_numpy(),
+                                                              indicators, period)
+            table = append_columns(table, values)
+        return with_metadata(table, {
+            "symbol": symbol,
+            "name": index_info.get('name') if index_info else None,
+            "reference_index": reference_index,
+            "reference_name": reference_name,
+        })
+
+    async def stream_index_kline(self, symbol: str, start_date: date | None = None, end_date: date | None = None):
+        """
+        流式获取指数K线数据：通过服务端游标分块读取，每行输出一个与records格式相同的K线对象（NDJSON）。
+        使用独立的异步会话，不依赖请求的会话。
+
+        Args:
+            symbol (str): 指数代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+        Returns:
+            AsyncIterator[bytes]: NDJSON数据块
+
+        Raises:
+            ValueError: 如果指数代码未知或未找到数据
+        """
+        symbol = resolve_symbol(symbol, "index").daily_symbol or symbol
+        return await open_kline_stream("index", symbol, start_date, end_date)
@@ -0,0 +1,122 @@
+# backend/services/kline_service.py
+"""
+此模块提供批量K线数据相关的服务功能。
+一次请求获取多个代码（可混合股票、指数和ETF）的K线数据，每张日线表只查询一次。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import async_queries
+from backend.database.kline_batch import BatchTarget, group_targets, kline_payload
+from backend.database.kline_stream import open_kline_batch_stream
+from backend.database.symbol_registry import resolve_symbol
+from backend.utils.kline_sampling import OHLC
+
+
+class KlineService:
+    """
+    批量K线数据服务类。
+
+    Methods:
+        resolve_targets: 解析批量请求中的代码
+        get_kline_batch_async: 批量获取K线数据（异步会话）
+        stream_kline_batch: 流式批量获取K线数据（NDJSON）
+
+    Examples:
+        >>> service = KlineService()
+        >>> result = await service.get_kline_batch_async(db, [("510300", "etf"), ("159915", "etf")])
+    """
+
+    def resolve_targets(self, symbols: list):
+        """
+        通过代码注册表解析批量请求中的代码。
+
+        Args:
+            symbols (list): (代码, 资产类型)列表
+
+        Returns:
+            tuple: (BatchTarget列表, 无法解析的(代码, 资产类型)列表)
+
+        Raises:
+            ValueError: 如果同一代码写法重复出现（结果以代码写法为键）
+        """
+        targets, missing, seen = [], [], set()
+        for symbol, asset_type in symbols:
+            if symbol in seen:
+                raise ValueError(f"Duplicate symbol in batch request: {symbol}")
+            seen.add(symbol)
+            try:
+                resolved = resolve_symbol(symbol, asset_type)
+            except ValueError:
+                missing.append((symbol, asset_type))
+                continue
+            if not resolved.daily_symbol:
+                missing.append((symbol, asset_type))
+                continue
+            targets.append(BatchTarget(symbol, asset_type, resolved.daily_symbol, resolved.info_symbol))
+        return targets, missing
+
+    async def get_kline_batch_async(self, db: AsyncSession, symbols: list, start_date: date | None = None,
+                                    end_date: date | None = None, response_format: str = "records",
+                                    max_points: int | None = None, sampling: str = OHLC):
+        """
+        批量获取K线数据（异步会话）。每种资产类型执行一次日线查询和一次名称查询，参考指数序列共享进程内缓存。
+
+        Args:
+            db (AsyncSession): 异步数据库会话
+            symbols (list): (代码, 资产类型)列表
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            response_format (str): records或columnar
+            max_points (int, optional): 每个代码的最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc或lttb
+
+        Returns:
+            dict: results为按请求顺序、以请求中的代码写法为键的结果项，missing为未知或没有数据的代码
+
+        Raises:
+            ValueError: 如果同一代码写法重复出现
+        """
+        targets, _ = self.resolve_targets(symbols)
+        payloads = {}
+        for asset_type, by_symbol in group_targets(targets).items():
+            frames = await async_queries.get_kline_batch_frames(db, asset_type, list(by_symbol), start_date, end_date,
+                                                                 max_points, sampling)
+            names = await async_queries.get_info_names(
+                db, asset_type, [target.info_symbol for targets in by_symbol.values() for target in targets]
+            )
+            for symbol, frame in frames.items():
+                for target in by_symbol[symbol]:
+                    payloads[target.key] = kline_payload(target, frame, names.get(target.info_symbol), response_format)
+
+        return {
+            "format": response_format,
+            "results": {symbol: payloads[symbol] for symbol, _ in symbols if symbol in payloads},
+            "missing": [symbol for symbol, _ in symbols if symbol not in payloads],
+        }
+
+    async def stream_kline_batch(self, symbols: list, start_date: date | None = None, end_date: date | None = None,
+                                 max_points: int | None = None, sampling: str = OHLC):
+        """
+        流式批量获取K线数据：每个代码输出一行，未知或没有数据的代码在最后各输出一行missing标记。
+        使用独立的异步会话，不依赖请求的会话。
+
+        Args:
+            symbols (list): (代码, 资产类型)列表
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 每个代码的最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc或lttb
+
+        Returns:
+            AsyncIterator[bytes]: NDJSON数据块
+
+        Raises:
+            ValueError: 如果同一代码写法重复出现
+        """
+        targets, missing = self.resolve_targets(symbols)
+        return await open_kline_batch_stream(group_targets(targets), missing, start_date, end_date,
+                                             max_points, sampling)
@@ -0,0 +1,43 @@
+# backend/services/search_service.py
+"""
+此模块提供搜索联想相关的服务功能。
+联想结果直接读取进程内的前缀树，不访问数据库。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from backend.database.search_index import suggest
+
+
+class SearchService:
+    """
+    搜索服务类。
+    提供代码、名称和拼音首字母联想的服务方法。
+
+    Methods:
+        suggest: 按前缀联想股票、指数和ETF
+
+    Examples:
+        >>> service = SearchService()
+        >>> result = service.suggest("gzmt", limit=5)
+    """
+
+    def suggest(self, query: str, limit: int = 10, asset_type: str | None = None):
+        """
+        按前缀联想股票、指数和ETF。
+
+        Args:
+            query (str): 输入的前缀，可以是代码、名称或名称拼音首字母
+            limit (int): 返回条数，默认为10
+            asset_type (str, optional): 资产类型，为None时在全部类型中联想
+
+        Returns:
+            dict: 包含输入前缀和联想结果的字典
+        """
+        return {
+            "query": query,
+            "items": [
+                {"asset_type": item_type, "symbol": symbol, "name": name, "volume": volume}
+                for item_type, symbol, name, volume in suggest(query, limit, asset_type)
+            ],
+        }
@@ -7,9 +7,23 @@ Date: 2025-03-12
 """
 
 from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.database.queries import get_stock_list, get_stock_kline_data, get_stock_info
+from backend.database import async_queries
+from backend.database.kline_stream import open_kline_stream
+from backend.database.queries import (
+    get_stock_list,
+    get_stock_kline_data,
+    get_stock_kline_columns,
+    get_kline_indicators,
+    get_stock_info,
+    get_stock_real_change_data,
+)
+from backend.database.symbol_registry import resolve_symbol
+from backend.utils.arrow_serializer import append_columns, with_metadata
+from backend.utils.indicators import indicators_to_json
+from backend.utils.kline_sampling import OHLC, DAILY
 
 
 class StockService:
@@ -21,6 +35,13 @@ class StockService:
         get_stock_list: 获取股票列表
         get_stock_info: 获取股票详情
         get_stock_kline: 获取股票K线数据
+        get_stock_kline_columns: 获取列式股票K线数据
+        get_stock_real_change: 获取股票真实涨跌和对比涨跌数据
+        get_stock_list_async: 获取股票列表（异步会话）
+        get_stock_kline_async: 获取股票K线数据（异步会话）
+        get_stock_kline_columns_async: 获取列式股票K线数据（异步会话）
+        get_stock_kline_table_async: 获取Arrow表格式的股票K线数据（异步会话）
+        stream_stock_kline: 流式获取股票K线数据（NDJSON）
 
     Examples:
         >>> from sqlalchemy.orm import Session
@@ -28,7 +49,8 @@ class StockService:
         >>> stocks = service.get_stock_list(db, page=1, page_size=10)
     """
 
-    def get_stock_list(self, db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None):
+    def get_stock_list(self, db: Session, page_size: int = 20, cursor: str | None = None, search: str | None = None, page: int | None = None,
+                       sort_by: str | None = None, sort_order: str = "asc"):
         """
         获取股票列表。
 
@@ -38,6 +60,8 @@ class StockService:
             cursor (str, optional): 分页游标，用于获取下一页数据
             search (str, optional): 搜索关键字
             page (int, optional): 页码，从1开始，与cursor互斥，优先使用page
+            sort_by (str, optional): 排序字段，取值为symbol、name、price、change、volume，默认为symbol
+            sort_order (str): 排序顺序，asc或desc，默认为asc
 
         Returns:
             dict: 包含股票列表和分页信息的字典
@@ -55,7 +79,7 @@ class StockService:
                 # 如果转换失败，使用空字符串
                 search_str = ""
         
-        return get_stock_list(db, page_size, cursor, search_str, page)
+        return get_stock_list(db, page_size, cursor, search_str, page, sort_by, sort_order)
 
     def get_stock_info(self, db: Session, symbol: str):
         """
@@ -69,31 +93,21 @@ class StockService:
             dict: 股票详情信息
 
         Raises:
-            ValueError: 如果股票不存在
+            ValueError: 如果股票不存在（包括代码注册表中没有该代码）
         """
-        # 尝试直接查询
-        stock_info = get_stock_info(db, symbol)
-        
-        # 如果没有找到数据，尝试转换股票代码格式
-        if not stock_info:
-            # 尝试不同的股票代码格式
-            if symbol.startswith('sh') or symbol.startswith('sz') or symbol.startswith('bj'):
-                # 尝试去掉前缀
-                alt_symbol = symbol[2:]
-                stock_info = get_stock_info(db, alt_symbol)
-            else:
-                # 尝试添加前缀
-                for prefix in ['sh', 'sz', 'bj']:
-                    alt_symbol = f"{prefix}{symbol}"
-                    stock_info = get_stock_info(db, alt_symbol)
-                    if stock_info:
-                        break
-        
+        # 通过代码注册表一次解析出各表中的写法，未知代码直接拒绝
+        resolved = resolve_symbol(symbol, "stock")
+        stock_info = None
+        if resolved.daily_symbol:
+            stock_info = get_stock_info(db, resolved.daily_symbol, resolved.info_symbol)
+
         if not stock_info:
             raise ValueError(f"Stock with symbol {symbol} not found")
         return stock_info
 
-    def get_stock_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None):
+    def get_stock_kline(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                        max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                        indicators: tuple = ()):
         """
         获取股票K线数据。
 
@@ -102,6 +116,10 @@ class StockService:
             symbol (str): 股票代码
             start_date (date, optional): 开始日期，默认为None（获取所有数据）
             end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
 
         Returns:
             dict: 包含股票代码和K线数据的字典
@@ -109,11 +127,189 @@ class StockService:
         Raises:
             ValueError: 如果未找到数据
         """
-        kline_data = get_stock_kline_data(db, symbol, start_date, end_date)
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        kline_data = get_stock_kline_data(db, symbol, start_date, end_date, max_points, sampling, period)
         if not kline_data:
             raise ValueError(f"No data found for stock {symbol} in the specified date range")
 
+        result = {
+            "symbol": symbol,
+            "data": kline_data
+        }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = get_kline_indicators(db, "stock", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    def get_stock_kline_columns(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None,
+                                max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                indicators: tuple = ()):
+        """
+        获取列式股票K线数据（每个字段一个数组，不逐行构建字典）。
+
+        Args:
+            db (Session): 数据库会话
+            symbol (str): 股票代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            dict: 包含股票代码和列式K线数据的字典
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        columns = get_stock_kline_columns(db, symbol, start_date, end_date, max_points, sampling, period)
+        if not columns:
+            raise ValueError(f"No data found for stock {symbol} in the specified date range")
+
+        result = {
+            "symbol": symbol,
+            "format": "columnar",
+            "data": columns
+        }
+        if indicators:
+            values = get_kline_indicators(db, "stock", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    def get_stock_real_change(self, db: Session, symbol: str, start_date: date | None = None, end_date: date | None = None):
+        """
+        获取股票真实涨跌数据，以及相对于当年参考指数（stock_info.index_2020 ~ index_2025）的对比涨跌。
+
+        Args:
+            db (Session): 数据库会话
+            symbol (str): 股票代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+        Returns:
+            dict: 包含股票代码和逐日真实涨跌数据的字典
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        resolved = resolve_symbol(symbol, "stock")
+        used_symbol, data = get_stock_real_change_data(db, resolved.daily_symbol or symbol, start_date, end_date,
+                                                       info_symbol=resolved.info_symbol)
         return {
+            "symbol": used_symbol,
+            "data": data
+        }
+
+    async def get_stock_list_async(self, db: AsyncSession, page_size: int = 20, cursor: str | None = None,
+                                   search: str | None = None, page: int | None = None,
+                                   sort_by: str | None = None, sort_order: str = "asc", items_format: str = "records"):
+        """
+        获取股票列表（异步会话，参数和返回值同get_stock_list）。
+        items_format为arrow时列表项为Arrow表。
+        """
+        search_str = str(search) if search is not None and str(search).strip() else ""
+        return await async_queries.get_stock_list(db, page_size, cursor, search_str, page, sort_by, sort_order,
+                                                  items_format=items_format)
+
+    async def get_stock_kline_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                    end_date: date | None = None,
+                                    max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                    indicators: tuple = ()):
+        """
+        获取股票K线数据（异步会话，参数和返回值同get_stock_kline）。
+        """
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        kline_data = await async_queries.get_stock_kline_data(db, symbol, start_date, end_date, max_points, sampling,
+                                                              period)
+        if not kline_data:
+            raise ValueError(f"No data found for stock {symbol} in the specified date range")
+
+        result = {
             "symbol": symbol,
             "data": kline_data
-        }
\ No newline at end of file
+        }
+        if indicators:
+            dates = [row["date"] for row in kline_data]
+            values = await async_queries.get_kline_indicators(db, "stock", symbol, dates, indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_stock_kline_columns_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                            end_date: date | None = None,
+                                            max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                            indicators: tuple = ()):
+        """
+        获取列式股票K线数据（异步会话，参数和返回值同get_stock_kline_columns）。
+        """
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        columns = await async_queries.get_stock_kline_columns(db, symbol, start_date, end_date, max_points, sampling,
+                                                              period)
+        if not columns:
+            raise ValueError(f"No data found for stock {symbol} in the specified date range")
+
+        result = {
+            "symbol": symbol,
+            "format": "columnar",
+            "data": columns
+        }
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "stock", symbol, columns["date"], indicators, period)
+            result["indicators"] = indicators_to_json(values)
+        return result
+
+    async def get_stock_kline_table_async(self, db: AsyncSession, symbol: str, start_date: date | None = None,
+                                          end_date: date | None = None,
+                                          max_points: int | None = None, sampling: str = OHLC, period: str = DAILY,
+                                          indicators: tuple = ()):
+        """
+        获取Arrow表格式的股票K线数据（异步会话），供format=arrow和format=parquet使用。
+        字段与列式格式相同，股票代码写入表的schema元数据。
+
+        Args:
+            db (AsyncSession): 异步数据库会话
+            symbol (str): 股票代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+            max_points (int, optional): 最大数据点数，超过时降采样，默认为None（不降采样）
+            sampling (str): 降采样方式，ohlc（区间合并为K线）或lttb（选取原始数据点）
+            period (str): K线周期，D（日线，默认）、W（周线）、M（月线）或Q（季线）
+            indicators (tuple): 技术指标（parse_indicators的结果），默认为空（不计算指标）
+
+        Returns:
+            pyarrow.Table: K线数据表
+
+        Raises:
+            ValueError: 如果未找到数据
+        """
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        table = await async_queries.get_kline_table(db, "stock", symbol, start_date, end_date, max_points, sampling,
+                                                    period)
+        if table is None:
+            raise ValueError(f"No data found for stock {symbol} in the specified date range")
+        if indicators:
+            values = await async_queries.get_kline_indicators(db, "stock", symbol, table.column("date").to_numpy(),
+                                                              indicators, period)
+            table = append_columns(table, values)
+        return with_metadata(table, {"symbol": symbol})
+
+    async def stream_stock_kline(self, symbol: str, start_date: date | None = None, end_date: date | None = None):
+        """
+        流式获取股票K线数据：通过服务端游标分块读取，每行输出一个与records格式相同的K线对象（NDJSON）。
+        使用独立的异步会话，不依赖请求的会话。
+
+        Args:
+            symbol (str): 股票代码
+            start_date (date, optional): 开始日期，默认为None（获取所有数据）
+            end_date (date, optional): 结束日期，默认为None（获取所有数据）
+
+        Returns:
+            AsyncIterator[bytes]: NDJSON数据块
+
+        Raises:
+            ValueError: 如果股票代码未知或未找到数据
+        """
+        symbol = resolve_symbol(symbol, "stock").daily_symbol or symbol
+        return await open_kline_stream("stock", symbol, start_date, end_date)
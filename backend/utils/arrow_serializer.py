@@ -0,0 +1,182 @@
+# backend/utils/arrow_serializer.py
+"""
+此模块提供K线和列表数据的Apache Arrow IPC与Parquet序列化功能。
+量化分析拉取多年、多标的数据时，JSON需要逐个值编码和解析，日期、缺失值等类型信息也会丢失；
+这里直接从查询得到的DataFrame按列构建带类型的Arrow表（日期为date32，价格为float64，缺失值为null），
+客户端用pyarrow.ipc.open_stream或pandas.read_parquet即可零解析地还原为DataFrame。
+字段定义沿用kline_serializer中的列式定义，接口的外层字段（代码、名称、分页信息等）写入表的schema元数据。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.responses import Response
+
+from backend.utils.kline_serializer import (
+    _to_float_array,
+    FLOAT,
+    NULLABLE_FLOAT,
+    FLOAT_OR_ZERO,
+    INT_OR_ZERO,
+    DATE_STR,
+    RAW,
+)
+
+# 输出格式 -> 响应类型
+TABULAR_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# 输出格式 -> 下载文件扩展名
+_EXTENSIONS = {
+    "arrow": "arrows",
+    "parquet": "parquet",
+}
+
+
+def convert_arrow_column(series, kind):
+    """
+    按转换类型将一列数据整体转换为Arrow数组，缺失值转换规则与convert_column一致，
+    但FLOAT和NULLABLE_FLOAT的缺失值统一为null。
+
+    Args:
+        series (pandas.Series): 原始列
+        kind (str): 转换类型，取值见kline_serializer的模块常量（不支持CONST）
+
+    Returns:
+        pyarrow.Array: 转换后的数组
+
+    Raises:
+        ValueError: 如果转换类型未知
+    """
+    if kind in (FLOAT, NULLABLE_FLOAT):
+        return pa.array(_to_float_array(series), type=pa.float64(), from_pandas=True)
+
+    if kind == FLOAT_OR_ZERO:
+        return pa.array(np.nan_to_num(_to_float_array(series), nan=0.0), type=pa.float64())
+
+    if kind == INT_OR_ZERO:
+        values = np.nan_to_num(_to_float_array(series), nan=0.0).astype("int64")
+        return pa.array(values, type=pa.int64())
+
+    if kind == DATE_STR:
+        days = pd.to_datetime(series).to_numpy().astype("datetime64[D]")
+        return pa.array(days, type=pa.date32())
+
+    if kind == RAW:
+        return pa.array(series, from_pandas=True)
+
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def frame_to_table(df, schema, columns=None, metadata=None):
+    """
+    将DataFrame按字段定义转换为Arrow表。
+
+    Args:
+        df (pandas.DataFrame): 查询结果
+        schema (tuple): 字段定义，元素为(输出字段名, 转换类型)，不支持CONST类型
+        columns (dict, optional): 输出字段名到DataFrame列名的映射，默认同名
+        metadata (dict, optional): 写入schema元数据的外层字段，值按JSON编码
+
+    Returns:
+        pyarrow.Table: 字段顺序与schema一致的表
+
+    Examples:
+        >>> table = frame_to_table(df, STOCK_KLINE_COLUMNS, metadata={"symbol": "sh600000"})
+        >>> table.schema.field("date").type
+        DataType(date32[day])
+    """
+    columns = columns or {}
+    if df is None:
+        df = pd.DataFrame(columns=[columns.get(key, key) for key, _ in schema])
+
+    arrays = [convert_arrow_column(df[columns.get(key, key)], kind) for key, kind in schema]
+    table = pa.Table.from_arrays(arrays, names=[key for key, _ in schema])
+    return with_metadata(table, metadata)
+
+
+def append_columns(table, values):
+    """
+    将附加的数值列（如技术指标）追加到Arrow表末尾，NaN转换为null。
+
+    Args:
+        table (pyarrow.Table): Arrow表
+        values (dict): 列名 -> 与表等长的float64数组
+
+    Returns:
+        pyarrow.Table: 追加列后的表
+    """
+    for name, array in values.items():
+        table = table.append_column(name, pa.array(array, type=pa.float64(), from_pandas=True))
+    return table
+
+
+def with_metadata(table, metadata):
+    """
+    将外层字段写入表的schema元数据（键为字段名，值为JSON字符串）。
+
+    Args:
+        table (pyarrow.Table): Arrow表
+        metadata (dict, optional): 外层字段
+
+    Returns:
+        pyarrow.Table: 带元数据的表
+    """
+    if not metadata:
+        return table
+    encoded = {key: json.dumps(value, ensure_ascii=False, default=str) for key, value in metadata.items()}
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **encoded})
+
+
+def serialize_table(table, response_format):
+    """
+    将Arrow表序列化为Arrow IPC流或Parquet文件。
+
+    Args:
+        table (pyarrow.Table): Arrow表
+        response_format (str): arrow或parquet
+
+    Returns:
+        bytes: 序列化结果
+
+    Raises:
+        ValueError: 如果格式不受支持
+    """
+    sink = pa.BufferOutputStream()
+    if response_format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif response_format == "parquet":
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported tabular format: {response_format}")
+    return sink.getvalue().to_pybytes()
+
+
+def tabular_response(table, response_format, filename):
+    """
+    构建Arrow IPC或Parquet格式的HTTP响应。
+
+    Args:
+        table (pyarrow.Table): Arrow表
+        response_format (str): arrow或parquet
+        filename (str): 下载文件名（不含扩展名）
+
+    Returns:
+        Response: 二进制响应
+
+    Examples:
+        >>> return tabular_response(table, "parquet", "sh600000_kline")
+    """
+    return Response(
+        content=serialize_table(table, response_format),
+        media_type=TABULAR_MEDIA_TYPES[response_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{_EXTENSIONS[response_format]}"'},
+    )
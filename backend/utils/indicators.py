@@ -0,0 +1,512 @@
+# backend/utils/indicators.py
+"""
+此模块提供K线技术指标的计算功能（MA、EMA、MACD、RSI、KDJ、BOLL、ATR）。
+前端在低端设备上对全部历史逐点计算指标很慢，因此由服务端计算后随K线一起返回：
+滑动窗口类指标（MA、BOLL、KDJ的最高/最低价、ATR）用累加和与sliding_window_view按数组整体计算；
+递推类指标（EMA、MACD、RSI、KDJ的K/D）只依赖上一个值，在Python浮点数上逐点递推，耗时与序列长度线性相关。
+计算口径与通达信等国内行情软件一致：EMA以首个有效值为初值，RSI和KDJ使用SMA(X, N, 1)平滑，
+MACD柱为2×(DIF－DEA)，BOLL使用总体标准差，ATR为真实波幅的简单移动平均。
+批量计算同时返回递推状态（递推值和滑动窗口缓冲区），出现新K线时用advance_indicator从状态逐根推进，
+不必在完整历史上重新计算。
+
+指标参数的写法为"名称[:参数1[:参数2...]]"，多个指标以逗号分隔，例如：
+    ma:5:10:20,ema:12,macd:12:26:9,rsi:6:12:24,kdj:9:3:3,boll:20:2,atr:14
+省略参数时使用默认值。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import copy
+import math
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 指标名称 -> (默认参数, 参数个数是否可变)；可变参数的指标每个参数输出一列（如ma5、ma10）
+INDICATOR_DEFAULTS = {
+    "ma": ((5, 10, 20), True),
+    "ema": ((12, 26), True),
+    "macd": ((12, 26, 9), False),
+    "rsi": ((6, 12, 24), True),
+    "kdj": ((9, 3, 3), False),
+    "boll": ((20, 2), False),
+    "atr": ((14,), False),
+}
+
+# 单个指标参数的上限，避免过大的窗口
+MAX_INDICATOR_WINDOW = 500
+
+# 指标计算使用的K线字段
+INPUT_FIELDS = ("close", "high", "low")
+
+_NAN = float("nan")
+
+
+class IndicatorSpec(NamedTuple):
+    """
+    一个指标及其参数。
+
+    Attributes:
+        name (str): 指标名称
+        params (tuple): 参数（窗口长度等）
+    """
+    name: str
+    params: tuple
+
+
+def parse_indicators(text: str | None):
+    """
+    解析indicators参数。
+
+    Args:
+        text (str, optional): 指标参数，如"ma:5:10,macd,boll:20:2"
+
+    Returns:
+        tuple: IndicatorSpec元组（去重，保持顺序），未指定时为空元组
+
+    Raises:
+        ValueError: 如果指标名称未知或参数无效
+
+    Examples:
+        >>> parse_indicators("ma:5:10,macd")
+        (IndicatorSpec(name='ma', params=(5, 10)), IndicatorSpec(name='macd', params=(12, 26, 9)))
+    """
+    specs = []
+    for item in (text or "").split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        name, *values = item.split(":")
+        if name not in INDICATOR_DEFAULTS:
+            raise ValueError(f"Unknown indicator: {name}")
+        defaults, variadic = INDICATOR_DEFAULTS[name]
+        if not values:
+            params = defaults
+        elif not variadic and len(values) != len(defaults):
+            raise ValueError(f"Indicator {name} takes {len(defaults)} parameters")
+        else:
+            try:
+                params = tuple(float(value) if name == "boll" and i == 1 else int(value)
+                               for i, value in enumerate(values))
+            except ValueError:
+                raise ValueError(f"Invalid parameters for indicator {name}: {item}") from None
+            if any(not 0 < value <= MAX_INDICATOR_WINDOW for value in params):
+                raise ValueError(f"Indicator parameters must be between 1 and {MAX_INDICATOR_WINDOW}: {item}")
+        spec = IndicatorSpec(name, params)
+        if spec not in specs:
+            specs.append(spec)
+    return tuple(specs)
+
+
+def indicator_columns(spec: IndicatorSpec):
+    """
+    指标的输出列名。
+
+    Args:
+        spec (IndicatorSpec): 指标及参数
+
+    Returns:
+        list: 输出列名，如["ma5", "ma10"]、["macd_dif", "macd_dea", "macd_hist"]
+    """
+    if spec.name in ("ma", "ema", "rsi", "atr"):
+        return [f"{spec.name}{window}" for window in spec.params]
+    suffixes = {"macd": ("dif", "dea", "hist"), "kdj": ("k", "d", "j"), "boll": ("mid", "upper", "lower")}
+    return [f"{spec.name}_{suffix}" for suffix in suffixes[spec.name]]
+
+
+def _float_values(df, column):
+    """将一列转换为float64数组（无法转换的值为NaN）。"""
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+
+
+def indicator_inputs(df: pd.DataFrame):
+    """
+    提取指标计算使用的字段。
+
+    Args:
+        df (pandas.DataFrame): 按日期升序排列的K线数据
+
+    Returns:
+        dict: 字段名（close、high、low）-> float64数组
+    """
+    return {column: _float_values(df, column) for column in INPUT_FIELDS}
+
+
+def rolling_mean(values, window: int):
+    """
+    简单移动平均（MA），窗口内有缺失值或数据不足window个时为NaN。
+
+    Args:
+        values (numpy.ndarray): float64序列
+        window (int): 窗口长度
+
+    Returns:
+        numpy.ndarray: 与values等长的序列
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+    missing = np.isnan(values)
+    sums = np.cumsum(np.where(missing, 0.0, values))
+    counts = np.cumsum(missing)
+    window_sums = sums[window - 1:] - np.r_[0.0, sums[:-window]]
+    window_missing = counts[window - 1:] - np.r_[0, counts[:-window]]
+    result[window - 1:] = np.where(window_missing > 0, np.nan, window_sums / window)
+    return result
+
+
+def rolling_std(values, window: int):
+    """
+    滚动总体标准差（ddof=0），窗口内有缺失值或数据不足window个时为NaN。
+
+    Args:
+        values (numpy.ndarray): float64序列
+        window (int): 窗口长度
+
+    Returns:
+        numpy.ndarray: 与values等长的序列
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+    result[window - 1:] = sliding_window_view(values, window).std(axis=1)
+    return result
+
+
+def _rolling_extreme(values, window: int, reducer):
+    """滚动最高/最低值；前window-1个位置使用已有的数据（与行情软件的HHV/LLV一致）。"""
+    if not len(values):
+        return values.copy()
+    # 用首个值填充，不足window个时窗口内的极值就是已有数据的极值
+    padded = np.r_[np.full(window - 1, values[0]), values]
+    return reducer(sliding_window_view(padded, window), axis=1)
+
+
+def recursive_mean(values, alpha: float, seed: float | None = None):
+    """
+    递推平均：y[i] = alpha * x[i] + (1 - alpha) * y[i - 1]。
+    EMA(N)的alpha为2/(N+1)，SMA(X, N, 1)的alpha为1/N。
+    初值为seed，未指定时为首个有效值；缺失值处沿用上一个结果。
+
+    Args:
+        values (numpy.ndarray): float64序列
+        alpha (float): 平滑系数
+        seed (float, optional): 初值
+
+    Returns:
+        numpy.ndarray: 与values等长的序列，首个有效值之前为NaN
+    """
+    result = [_NAN] * len(values)
+    previous = seed
+    keep = 1 - alpha
+    for i, value in enumerate(values.tolist()):
+        if value != value:
+            # NaN：沿用上一个结果
+            if previous is not None:
+                result[i] = previous
+            continue
+        previous = value if previous is None else alpha * value + keep * previous
+        result[i] = previous
+    return np.array(result, dtype="float64")
+
+
+def _recursive_step(previous, value, alpha):
+    """递推平均的一步（与recursive_mean相同）；previous为None表示尚无有效值，value为NaN时沿用previous。"""
+    if value != value:
+        return previous
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+def ema(values, window: int):
+    """指数移动平均EMA(N)。"""
+    return recursive_mean(values, 2 / (window + 1))
+
+
+# 批量计算：每个计算函数返回(输出列, 递推状态)，状态为处理完倒数第二根K线后的状态（见advance_indicator）
+
+def _last(values, position):
+    """取递推结果在position处的值，尚无有效值（NaN或position < 0）时为None。"""
+    if position < 0 or np.isnan(values[position]):
+        return None
+    return float(values[position])
+
+
+def _tail(values, position, count):
+    """取position及之前的最多count个值（滑动窗口的缓冲区）。"""
+    return values[max(position + 1 - count, 0):position + 1].tolist()
+
+
+def _ma(inputs, params, position):
+    close = inputs["close"]
+    values = {f"ma{window}": rolling_mean(close, window) for window in params}
+    return values, {"closes": _tail(close, position, max(params))}
+
+
+def _ema(inputs, params, position):
+    close = inputs["close"]
+    values = {f"ema{window}": ema(close, window) for window in params}
+    return values, {"ema": [_last(values[f"ema{window}"], position) for window in params]}
+
+
+def _macd(inputs, params, position):
+    fast, slow, signal = params
+    close = inputs["close"]
+    fast_ema, slow_ema = ema(close, fast), ema(close, slow)
+    dif = fast_ema - slow_ema
+    dea = ema(dif, signal)
+    values = {"macd_dif": dif, "macd_dea": dea, "macd_hist": 2 * (dif - dea)}
+    return values, {"fast": _last(fast_ema, position), "slow": _last(slow_ema, position),
+                    "dea": _last(dea, position)}
+
+
+def _rsi(inputs, params, position):
+    close = inputs["close"]
+    change = np.r_[np.nan, np.diff(close)]
+    # maximum保留首日的NaN，涨幅和波动的递推从同一天开始
+    gain, move = np.maximum(change, 0.0), np.abs(change)
+    values, state = {}, {"close": float(close[position]) if position >= 0 else _NAN, "gain": [], "move": []}
+    for window in params:
+        average_gain = recursive_mean(gain, 1 / window)
+        average_move = recursive_mean(move, 1 / window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values[f"rsi{window}"] = np.where(average_move > 0, average_gain / average_move * 100, np.nan)
+        state["gain"].append(_last(average_gain, position))
+        state["move"].append(_last(average_move, position))
+    return values, state
+
+
+def _kdj(inputs, params, position):
+    window, k_window, d_window = params
+    close, low, high = inputs["close"], inputs["low"], inputs["high"]
+    lowest = _rolling_extreme(low, window, np.min)
+    highest = _rolling_extreme(high, window, np.max)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(highest > lowest, (close - lowest) / (highest - lowest) * 100, 50.0)
+    rsv[np.isnan(close)] = np.nan
+    k = recursive_mean(rsv, 1 / k_window, seed=50.0)
+    d = recursive_mean(k, 1 / d_window, seed=50.0)
+    values = {"kdj_k": k, "kdj_d": d, "kdj_j": 3 * k - 2 * d}
+    return values, {"lows": _tail(low, position, window), "highs": _tail(high, position, window),
+                    "k": 50.0 if position < 0 else float(k[position]),
+                    "d": 50.0 if position < 0 else float(d[position])}
+
+
+def _boll(inputs, params, position):
+    window, width = params
+    close = inputs["close"]
+    middle = rolling_mean(close, int(window))
+    deviation = rolling_std(close, int(window))
+    values = {"boll_mid": middle, "boll_upper": middle + width * deviation, "boll_lower": middle - width * deviation}
+    return values, {"closes": _tail(close, position, int(window))}
+
+
+def _true_range(high, low, previous_close):
+    # 真实波幅：当日振幅、与前收盘价的最大差距三者取最大；首日没有前收盘价，取当日振幅
+    return np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+
+def _atr(inputs, params, position):
+    (window,) = params
+    high, low, close = inputs["high"], inputs["low"], inputs["close"]
+    true_range = _true_range(high, low, np.r_[np.nan, close[:-1]])
+    values = {f"atr{window}": rolling_mean(true_range, window)}
+    return values, {"close": float(close[position]) if position >= 0 else _NAN,
+                    "ranges": _tail(true_range, position, window)}
+
+
+_CALCULATORS = {
+    "ma": _ma,
+    "ema": _ema,
+    "macd": _macd,
+    "rsi": _rsi,
+    "kdj": _kdj,
+    "boll": _boll,
+    "atr": _atr,
+}
+
+
+# 逐根递推：每个函数用一根K线推进状态（原地修改）并返回该K线的输出，与批量计算的口径一致
+
+def _window_mean(buffer, window):
+    """缓冲区最后window个值的平均值，数据不足或有缺失值时为NaN。"""
+    if len(buffer) < window:
+        return _NAN
+    values = buffer[-window:]
+    return _NAN if any(value != value for value in values) else sum(values) / window
+
+
+def _extreme(buffer, reducer):
+    """缓冲区的最高/最低值，有缺失值时为NaN（与np.max/np.min一致）。"""
+    return _NAN if any(value != value for value in buffer) else reducer(buffer)
+
+
+def _push(buffer, value, size):
+    """向滑动窗口缓冲区追加一个值，只保留最后size个。"""
+    buffer.append(value)
+    del buffer[:-size]
+
+
+def _fmax(a, b):
+    """与np.fmax相同：忽略NaN取较大值。"""
+    return b if a != a else a if b != b else max(a, b)
+
+
+def _or_nan(value):
+    return _NAN if value is None else value
+
+
+def _ma_step(params, state, close, high, low):
+    _push(state["closes"], close, max(params))
+    return {f"ma{window}": _window_mean(state["closes"], window) for window in params}
+
+
+def _ema_step(params, state, close, high, low):
+    state["ema"] = [_recursive_step(previous, close, 2 / (window + 1))
+                    for previous, window in zip(state["ema"], params)]
+    return {f"ema{window}": _or_nan(value) for window, value in zip(params, state["ema"])}
+
+
+def _macd_step(params, state, close, high, low):
+    fast, slow, signal = params
+    state["fast"] = _recursive_step(state["fast"], close, 2 / (fast + 1))
+    state["slow"] = _recursive_step(state["slow"], close, 2 / (slow + 1))
+    dif = _or_nan(state["fast"]) - _or_nan(state["slow"])
+    state["dea"] = _recursive_step(state["dea"], dif, 2 / (signal + 1))
+    dea = _or_nan(state["dea"])
+    return {"macd_dif": dif, "macd_dea": dea, "macd_hist": 2 * (dif - dea)}
+
+
+def _rsi_step(params, state, close, high, low):
+    change = close - state["close"]
+    state["close"] = close
+    gain = change if change != change else max(change, 0.0)
+    result = {}
+    for i, window in enumerate(params):
+        state["gain"][i] = _recursive_step(state["gain"][i], gain, 1 / window)
+        state["move"][i] = _recursive_step(state["move"][i], abs(change), 1 / window)
+        average_gain, average_move = state["gain"][i], state["move"][i]
+        result[f"rsi{window}"] = (average_gain / average_move * 100
+                                  if average_move is not None and average_move > 0 else _NAN)
+    return result
+
+
+def _kdj_step(params, state, close, high, low):
+    window, k_window, d_window = params
+    _push(state["lows"], low, window)
+    _push(state["highs"], high, window)
+    lowest, highest = _extreme(state["lows"], min), _extreme(state["highs"], max)
+    rsv = (close - lowest) / (highest - lowest) * 100 if highest > lowest else 50.0
+    if close != close:
+        rsv = _NAN
+    state["k"] = _recursive_step(state["k"], rsv, 1 / k_window)
+    state["d"] = _recursive_step(state["d"], state["k"], 1 / d_window)
+    return {"kdj_k": state["k"], "kdj_d": state["d"], "kdj_j": 3 * state["k"] - 2 * state["d"]}
+
+
+def _boll_step(params, state, close, high, low):
+    window, width = int(params[0]), params[1]
+    _push(state["closes"], close, window)
+    middle = _window_mean(state["closes"], window)
+    if middle != middle:
+        return {"boll_mid": _NAN, "boll_upper": _NAN, "boll_lower": _NAN}
+    deviation = math.sqrt(sum((value - middle) ** 2 for value in state["closes"]) / window)
+    return {"boll_mid": middle, "boll_upper": middle + width * deviation, "boll_lower": middle - width * deviation}
+
+
+def _atr_step(params, state, close, high, low):
+    (window,) = params
+    previous_close, state["close"] = state["close"], close
+    true_range = _fmax(high - low, _fmax(abs(high - previous_close), abs(low - previous_close)))
+    _push(state["ranges"], true_range, window)
+    return {f"atr{window}": _window_mean(state["ranges"], window)}
+
+
+_STEPS = {
+    "ma": _ma_step,
+    "ema": _ema_step,
+    "macd": _macd_step,
+    "rsi": _rsi_step,
+    "kdj": _kdj_step,
+    "boll": _boll_step,
+    "atr": _atr_step,
+}
+
+
+def compute_indicator(df: pd.DataFrame, spec: IndicatorSpec):
+    """
+    计算一个指标。
+
+    Args:
+        df (pandas.DataFrame): 按日期升序排列的K线数据（需包含close、high、low）
+        spec (IndicatorSpec): 指标及参数
+
+    Returns:
+        dict: 输出列名 -> 与df等长的float64数组，如{"ma5": ..., "ma10": ...}
+
+    Examples:
+        >>> compute_indicator(frame, IndicatorSpec("macd", (12, 26, 9)))
+        {'macd_dif': array([...]), 'macd_dea': array([...]), 'macd_hist': array([...])}
+    """
+    return compute_indicator_state(indicator_inputs(df), spec)[0]
+
+
+def compute_indicator_state(inputs: dict, spec: IndicatorSpec):
+    """
+    在完整序列上批量计算一个指标，同时返回处理完倒数第二根K线后的递推状态，
+    之后的K线可以用advance_indicator从该状态继续计算。
+
+    Args:
+        inputs (dict): indicator_inputs的结果
+        spec (IndicatorSpec): 指标及参数
+
+    Returns:
+        tuple: (输出列名 -> float64数组, 递推状态)
+    """
+    return _CALCULATORS[spec.name](inputs, spec.params, len(inputs["close"]) - 2)
+
+
+def advance_indicator(spec: IndicatorSpec, state: dict, inputs: dict):
+    """
+    从递推状态开始逐根计算新K线的指标值，每根K线的计算量只与指标参数有关，与历史长度无关。
+    状态只包含递推所需的最后一个值（EMA、MACD、RSI、KDJ的K/D）和滑动窗口缓冲区（MA、BOLL、KDJ、ATR），
+    结果与在完整序列上批量计算一致（滑动窗口的求和顺序不同，误差在浮点舍入范围内）。
+
+    Args:
+        spec (IndicatorSpec): 指标及参数
+        state (dict): compute_indicator_state或上一次advance_indicator返回的状态（不会被修改）
+        inputs (dict): 新K线的indicator_inputs
+
+    Returns:
+        tuple: (处理完全部新K线后的状态, 输出列名 -> 新K线的float64数组)
+
+    Examples:
+        >>> values, state = compute_indicator_state(indicator_inputs(history[:-1]), spec)
+        >>> state, latest = advance_indicator(spec, state, indicator_inputs(history[-1:]))
+    """
+    state = copy.deepcopy(state)
+    step = _STEPS[spec.name]
+    rows = []
+    for close, high, low in zip(*(inputs[column].tolist() for column in INPUT_FIELDS)):
+        rows.append(step(spec.params, state, close, high, low))
+    values = {name: np.array([row[name] for row in rows], dtype="float64") for name in indicator_columns(spec)}
+    return state, values
+
+
+def indicators_to_json(values: dict):
+    """
+    将指标数组转换为可直接编码为JSON的列表（NaN转换为None）。
+
+    Args:
+        values (dict): 输出列名 -> float64数组
+
+    Returns:
+        dict: 输出列名 -> 列表
+    """
+    result = {}
+    for name, array in values.items():
+        converted = array.astype(object)
+        converted[np.isnan(array)] = None
+        result[name] = converted.tolist()
+    return result
@@ -0,0 +1,233 @@
+# backend/utils/kline_sampling.py
+"""
+此模块提供K线数据的服务端降采样功能。
+前端图表的横向像素有限（约1500个），而"全部"区间的K线有6000多根，多出的数据点只会增加传输、
+JSON编码和浏览器渲染的耗时。指定max_points后，在序列化之前把查询得到的DataFrame压缩到不超过max_points行：
+- ohlc（默认）：按行数等分为max_points个区间，每个区间合并为一根K线（开盘取首日，收盘取末日，最高/最低取极值，
+  成交量、成交额和换手率求和，涨跌额、涨跌幅和振幅按区间前收盘价重新计算，参考指数涨跌幅按复利累计），
+  与周线、月线的合并规则相同，K线形态不失真；
+- lttb：Largest-Triangle-Three-Buckets，按收盘价在每个区间中选出视觉上最重要的一天，输出的都是原始的日线数据，
+  适合折线图。
+period为W/M/Q时按自然周（周一至周日）、自然月、自然季度分组，用同样的规则合并为周线、月线和季线。
+两种方式的耗时都只与序列长度线性相关（6000根日线降到1500个点为毫秒级）。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import numpy as np
+import pandas as pd
+
+# 降采样方式
+OHLC = "ohlc"
+LTTB = "lttb"
+SAMPLING_METHODS = (OHLC, LTTB)
+
+# K线周期：日线、周线、月线、季线
+DAILY = "D"
+WEEKLY = "W"
+MONTHLY = "M"
+QUARTERLY = "Q"
+PERIODS = (DAILY, WEEKLY, MONTHLY, QUARTERLY)
+
+# 区间合并规则：字段 -> 合并方式；未列出的字段取区间末日的值
+_FIRST_FIELDS = ("open",)
+_MAX_FIELDS = ("high",)
+_MIN_FIELDS = ("low",)
+_SUM_FIELDS = ("volume", "amount", "turnover", "turnover_rate")
+# 按复利累计的涨跌幅字段（单位为%）
+_COMPOUND_FIELDS = ("ref_change_rate",)
+
+
+def _float_values(df, column):
+    """将一列转换为float64数组（无法转换的值为NaN）。"""
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+
+
+def bucket_starts(row_count: int, bucket_count: int):
+    """
+    将row_count行按行数尽量均匀地分为bucket_count个区间。
+
+    Args:
+        row_count (int): 总行数
+        bucket_count (int): 区间数，不大于row_count
+
+    Returns:
+        numpy.ndarray: 各区间第一行的位置（升序，int64）
+    """
+    return (np.arange(bucket_count, dtype="int64") * row_count) // bucket_count
+
+
+def period_starts(dates, period: str):
+    """
+    按自然周、自然月或自然季度将按日期升序排列的交易日分组。
+
+    Args:
+        dates (iterable): 交易日序列（升序）
+        period (str): W、M或Q
+
+    Returns:
+        numpy.ndarray: 各周期第一个交易日的位置（升序，int64）
+
+    Raises:
+        ValueError: 如果周期未知
+    """
+    days = pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+    if period == WEEKLY:
+        # 1970-01-01是星期四，加3天后按7天取整，每组从周一开始
+        keys = (days.astype("int64") + 3) // 7
+    elif period == MONTHLY:
+        keys = days.astype("datetime64[M]").astype("int64")
+    elif period == QUARTERLY:
+        keys = days.astype("datetime64[M]").astype("int64") // 3
+    else:
+        raise ValueError(f"Unknown K-line period: {period}")
+    if not len(keys):
+        return np.empty(0, dtype="int64")
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def aggregate_buckets(df: pd.DataFrame, starts):
+    """
+    将按日期升序排列的K线数据按区间合并，每个区间输出一行。
+
+    Args:
+        df (pandas.DataFrame): 日线数据（股票、指数或ETF，指数和ETF可包含参考指数涨跌幅）
+        starts (numpy.ndarray): 各区间第一行的位置，升序且第一个为0
+
+    Returns:
+        pandas.DataFrame: 合并后的数据，列与df相同，日期为区间末日
+    """
+    starts = np.asarray(starts, dtype="int64")
+    ends = np.append(starts[1:], len(df))
+    lasts = ends - 1
+
+    merged = {}
+    for column in df.columns:
+        if column in _FIRST_FIELDS:
+            merged[column] = _float_values(df, column)[starts]
+        elif column in _MAX_FIELDS:
+            # fmax/fmin忽略NaN，区间内全部缺失时结果才为NaN
+            merged[column] = np.fmax.reduceat(_float_values(df, column), starts)
+        elif column in _MIN_FIELDS:
+            merged[column] = np.fmin.reduceat(_float_values(df, column), starts)
+        elif column in _SUM_FIELDS:
+            values = _float_values(df, column)
+            valid = ~np.isnan(values)
+            sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            merged[column] = np.where(np.add.reduceat(valid, starts) > 0, sums, np.nan)
+        elif column in _COMPOUND_FIELDS:
+            growth = np.multiply.reduceat(1 + np.nan_to_num(_float_values(df, column)) / 100, starts)
+            valid = np.add.reduceat(~np.isnan(_float_values(df, column)), starts) > 0
+            merged[column] = np.where(valid, (growth - 1) * 100, np.nan)
+        else:
+            merged[column] = df[column].to_numpy()[lasts]
+    result = pd.DataFrame(merged, columns=df.columns)
+
+    # 涨跌额、涨跌幅和振幅以区间第一天的前收盘价为基准重新计算
+    if "change_amount" in df.columns:
+        close = _float_values(df, "close")
+        previous_close = close[starts] - _float_values(df, "change_amount")[starts]
+        result["change_amount"] = result["close"].to_numpy(dtype="float64") - previous_close
+        if "change_rate" in df.columns:
+            result["change_rate"] = result["change_amount"] / previous_close * 100
+        if "amplitude" in df.columns:
+            result["amplitude"] = (result["high"] - result["low"]) / previous_close * 100
+        if "relative_change_rate" in df.columns and "ref_change_rate" in df.columns:
+            result["relative_change_rate"] = result["change_rate"] - result["ref_change_rate"]
+    return result
+
+
+def lttb_indices(y, bucket_count: int):
+    """
+    用Largest-Triangle-Three-Buckets算法选出bucket_count个数据点（x轴为行号，即交易日序号）。
+    首尾两点固定保留，中间按行数分为bucket_count - 2个区间，每个区间选出与前一个选中点、
+    下一区间平均点构成的三角形面积最大的点。
+    各区间的平均点用NumPy整体计算；选点依赖前一个区间的结果，只能逐个区间进行，
+    而区间通常只有几个点，逐点比较Python浮点数比每个区间调用一次NumPy快得多，总耗时与序列长度线性相关。
+
+    Args:
+        y (numpy.ndarray): 数值序列（float64，NaN视为0）
+        bucket_count (int): 输出点数，至少为3且小于序列长度
+
+    Returns:
+        numpy.ndarray: 选中点的行号（升序，int64）
+    """
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+    row_count = len(y)
+    # 中间区间的边界：[1, row_count - 1)等分为bucket_count - 2份
+    edges = 1 + (np.arange(bucket_count - 1, dtype="int64") * (row_count - 2)) // (bucket_count - 2)
+    # 每个区间的平均点，供前一个区间计算面积；最后一个区间之后是末点
+    sums = np.add.reduceat(y[1:row_count - 1], edges[:-1] - 1)
+    means_y = np.append(sums / np.diff(edges), y[-1]).tolist()
+    means_x = np.append((edges[:-1] + edges[1:] - 1) / 2, row_count - 1).tolist()
+    values, bounds = y.tolist(), edges.tolist()
+
+    selected = [0]
+    previous_x, previous_y = 0, values[0]
+    for bucket in range(bucket_count - 2):
+        dx = previous_x - means_x[bucket + 1]
+        dy = means_y[bucket + 1] - previous_y
+        best, best_area = bounds[bucket], -1.0
+        for row in range(bounds[bucket], bounds[bucket + 1]):
+            # 三角形面积的两倍（省略常数因子不影响比较）
+            area = abs(dx * (values[row] - previous_y) - (previous_x - row) * dy)
+            if area > best_area:
+                best, best_area = row, area
+        previous_x, previous_y = best, values[best]
+        selected.append(best)
+    selected.append(row_count - 1)
+    return np.array(selected, dtype="int64")
+
+
+def downsample_kline(df: pd.DataFrame, max_points: int | None, method: str = OHLC):
+    """
+    将K线数据降采样到不超过max_points行；行数未超过时原样返回。
+
+    Args:
+        df (pandas.DataFrame): 按日期升序排列的日线数据
+        max_points (int, optional): 最大行数，None表示不降采样
+        method (str): ohlc（区间合并为K线）或lttb（按收盘价选取原始数据点）
+
+    Returns:
+        pandas.DataFrame: 降采样后的数据，列与df相同
+
+    Raises:
+        ValueError: 如果降采样方式未知
+
+    Examples:
+        >>> downsample_kline(frame, 1500)         # 6000根日线合并为1500根K线
+        >>> downsample_kline(frame, 1500, "lttb")  # 选取1500个原始数据点
+    """
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method: {method}")
+    if not max_points or df is None or len(df) <= max_points:
+        return df
+
+    if method == LTTB and max_points >= 3:
+        rows = lttb_indices(_float_values(df, "close"), max_points)
+        return df.iloc[rows].reset_index(drop=True)
+    return aggregate_buckets(df, bucket_starts(len(df), max_points))
+
+
+def resample_kline(df: pd.DataFrame, period: str = DAILY):
+    """
+    将日线数据合并为周线、月线或季线；日线原样返回。
+
+    Args:
+        df (pandas.DataFrame): 按日期升序排列的日线数据
+        period (str): D、W、M或Q
+
+    Returns:
+        pandas.DataFrame: 每个周期一行，日期为该周期最后一个交易日
+
+    Raises:
+        ValueError: 如果周期未知
+
+    Examples:
+        >>> resample_kline(frame, "W")  # 周线
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown K-line period: {period}")
+    if period == DAILY or df is None or df.empty:
+        return df
+    return aggregate_buckets(df, period_starts(df["date"], period))
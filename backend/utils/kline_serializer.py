@@ -0,0 +1,228 @@
+# backend/utils/kline_serializer.py
+"""
+此模块提供K线数据的列式序列化功能。
+将查询得到的DataFrame按列整体转换为API响应所需的行字典列表，
+避免逐行调用iterrows()和float()/pd.notna()带来的开销。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+# 字段转换类型
+FLOAT = "float"                    # 转换为float，缺失值保留为NaN
+NULLABLE_FLOAT = "nullable_float"  # 转换为float，缺失值转换为None
+FLOAT_OR_ZERO = "float_or_zero"    # 转换为float，缺失值转换为0
+INT_OR_ZERO = "int_or_zero"        # 转换为int，缺失值转换为0
+DATE_STR = "date_str"              # 格式化为YYYY-MM-DD字符串
+RAW = "raw"                        # 原样输出
+CONST = "const"                    # 使用constants中提供的常量值
+
+# 股票K线字段定义：(输出字段名, 转换类型)
+STOCK_KLINE_SCHEMA = (
+    ("date", DATE_STR),
+    ("open", FLOAT),
+    ("close", FLOAT),
+    ("high", FLOAT),
+    ("low", FLOAT),
+    ("volume", FLOAT),
+    ("amount", NULLABLE_FLOAT),
+    ("outstanding_share", NULLABLE_FLOAT),
+    ("turnover", NULLABLE_FLOAT),
+)
+
+# 指数与ETF K线字段定义（两者结构相同，均包含参考指数信息）
+REFERENCED_KLINE_SCHEMA = (
+    ("symbol", CONST),
+    ("date", RAW),
+    ("open", FLOAT),
+    ("close", FLOAT),
+    ("high", FLOAT),
+    ("low", FLOAT),
+    ("volume", INT_OR_ZERO),
+    ("amount", NULLABLE_FLOAT),
+    ("amplitude", NULLABLE_FLOAT),
+    ("change_rate", NULLABLE_FLOAT),
+    ("change_amount", NULLABLE_FLOAT),
+    ("turnover_rate", NULLABLE_FLOAT),
+    ("reference_index", CONST),
+    ("reference_name", CONST),
+    ("reference_change_rate", NULLABLE_FLOAT),
+    ("relative_change_rate", NULLABLE_FLOAT),
+)
+
+INDEX_KLINE_SCHEMA = REFERENCED_KLINE_SCHEMA
+ETF_KLINE_SCHEMA = REFERENCED_KLINE_SCHEMA
+
+# 列式输出字段定义：每个字段输出一个数组，日期统一为字符串，所有缺失值统一为None，
+# 逐行重复的常量字段（symbol、reference_index等）由调用方放在外层
+STOCK_KLINE_COLUMNS = (
+    ("date", DATE_STR),
+    ("open", NULLABLE_FLOAT),
+    ("close", NULLABLE_FLOAT),
+    ("high", NULLABLE_FLOAT),
+    ("low", NULLABLE_FLOAT),
+    ("volume", NULLABLE_FLOAT),
+    ("amount", NULLABLE_FLOAT),
+    ("outstanding_share", NULLABLE_FLOAT),
+    ("turnover", NULLABLE_FLOAT),
+)
+
+REFERENCED_KLINE_COLUMNS = (
+    ("date", DATE_STR),
+    ("open", NULLABLE_FLOAT),
+    ("close", NULLABLE_FLOAT),
+    ("high", NULLABLE_FLOAT),
+    ("low", NULLABLE_FLOAT),
+    ("volume", INT_OR_ZERO),
+    ("amount", NULLABLE_FLOAT),
+    ("amplitude", NULLABLE_FLOAT),
+    ("change_rate", NULLABLE_FLOAT),
+    ("change_amount", NULLABLE_FLOAT),
+    ("turnover_rate", NULLABLE_FLOAT),
+    ("reference_change_rate", NULLABLE_FLOAT),
+    ("relative_change_rate", NULLABLE_FLOAT),
+)
+
+INDEX_KLINE_COLUMNS = REFERENCED_KLINE_COLUMNS
+ETF_KLINE_COLUMNS = REFERENCED_KLINE_COLUMNS
+
+# 股票真实涨跌字段定义
+STOCK_REAL_CHANGE_SCHEMA = (
+    ("date", DATE_STR),
+    ("real_change", FLOAT),
+    ("comparative_change", FLOAT),
+    ("reference_index", RAW),
+    ("reference_name", RAW),
+)
+
+
+def nullable_schema(schema):
+    """
+    将字段定义中的FLOAT替换为NULLABLE_FLOAT，用于直接编码为JSON的输出（JSON中没有NaN，缺失值输出为null）。
+
+    Args:
+        schema (tuple): 字段定义
+
+    Returns:
+        tuple: 替换后的字段定义
+    """
+    return tuple((key, NULLABLE_FLOAT if kind == FLOAT else kind) for key, kind in schema)
+
+
+def _to_float_array(series):
+    """
+    将一列数据转换为float64数组，无法转换的值（None、Decimal中的NaN等）变为NaN。
+
+    Args:
+        series (pandas.Series): 原始列
+
+    Returns:
+        numpy.ndarray: float64数组
+    """
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64")
+
+
+def convert_column(series, kind):
+    """
+    按转换类型将一列数据整体转换为Python对象列表。
+
+    Args:
+        series (pandas.Series): 原始列
+        kind (str): 转换类型，取值见模块常量
+
+    Returns:
+        list: 转换后的值列表
+
+    Raises:
+        ValueError: 如果转换类型未知
+    """
+    if kind == FLOAT:
+        return _to_float_array(series).tolist()
+
+    if kind == NULLABLE_FLOAT:
+        values = _to_float_array(series)
+        result = values.astype(object)
+        result[np.isnan(values)] = None
+        return result.tolist()
+
+    if kind == FLOAT_OR_ZERO:
+        return np.nan_to_num(_to_float_array(series), nan=0.0).tolist()
+
+    if kind == INT_OR_ZERO:
+        values = _to_float_array(series)
+        return np.nan_to_num(values, nan=0.0).astype("int64").tolist()
+
+    if kind == DATE_STR:
+        return pd.to_datetime(series).dt.strftime("%Y-%m-%d").tolist()
+
+    if kind == RAW:
+        return series.tolist()
+
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def frame_to_records(df, schema, constants=None, columns=None):
+    """
+    将DataFrame按字段定义列式转换为字典列表。
+
+    Args:
+        df (pandas.DataFrame): 查询结果
+        schema (tuple): 字段定义，元素为(输出字段名, 转换类型)
+        constants (dict, optional): CONST类型字段的常量值
+        columns (dict, optional): 输出字段名到DataFrame列名的映射，默认同名
+
+    Returns:
+        list: 字典列表，字段顺序与schema一致
+
+    Examples:
+        >>> frame_to_records(df, STOCK_KLINE_SCHEMA)
+        [{'date': '2024-01-02', 'open': 8.12, ...}]
+    """
+    if df is None or df.empty:
+        return []
+
+    constants = constants or {}
+    columns = columns or {}
+    row_count = len(df)
+
+    keys = []
+    values = []
+    for key, kind in schema:
+        keys.append(key)
+        if kind == CONST:
+            values.append(repeat(constants.get(key), row_count))
+        else:
+            values.append(convert_column(df[columns.get(key, key)], kind))
+
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def frame_to_columns(df, schema, columns=None):
+    """
+    将DataFrame按字段定义转换为列式结构（每个字段一个数组）。
+    不构建逐行字典，适合图表直接消费。
+
+    Args:
+        df (pandas.DataFrame): 查询结果
+        schema (tuple): 字段定义，元素为(输出字段名, 转换类型)，不支持CONST类型
+        columns (dict, optional): 输出字段名到DataFrame列名的映射，默认同名
+
+    Returns:
+        dict: 字段名到值列表的映射，字段顺序与schema一致
+
+    Examples:
+        >>> frame_to_columns(df, STOCK_KLINE_COLUMNS)
+        {'date': ['2024-01-02', ...], 'open': [8.12, ...], ...}
+    """
+    columns = columns or {}
+    if df is None or df.empty:
+        return {key: [] for key, _ in schema}
+
+    return {
+        key: convert_column(df[columns.get(key, key)], kind)
+        for key, kind in schema
+    }
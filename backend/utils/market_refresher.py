@@ -0,0 +1,183 @@
+# backend/utils/market_refresher.py
+"""
+此模块提供首页实时行情数据的后台刷新任务。
+首页的市场概览、热门行业、概念板块、市场资讯和资金流向排行都来自akshare，
+原先在请求时才下载，页面延迟受上游接口拖累。这里在应用启动后为每个数据集运行一个刷新循环，
+按交易时段调整间隔（交易时段MARKET_REFRESH_TRADING_INTERVAL秒，其他时间MARKET_REFRESH_IDLE_INTERVAL秒），
+刷新结果写入upstream_cache快照缓存，并将快照有效期设为不短于下次刷新的时间，
+接口处理函数只读取已准备好的快照；刷新任务停止或连续失败导致快照过期时，接口退回按需下载。
+交易时段按北京时间周一至周五9:15~11:30、13:00~15:00计算，不考虑法定节假日。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import asyncio
+import logging
+from datetime import datetime, time as dt_time, timedelta
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+import akshare as ak
+
+from backend.config.settings import settings
+from backend.utils.upstream_cache import upstream_cache
+
+logger = logging.getLogger(__name__)
+
+MARKET_TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+# 交易时段（含集合竞价），北京时间
+TRADING_SESSIONS = (
+    (dt_time(9, 15), dt_time(11, 30)),
+    (dt_time(13, 0), dt_time(15, 0)),
+)
+
+
+class RefreshJob(NamedTuple):
+    """
+    刷新任务：名称及akshare接口和参数，参数须与接口处理函数中的调用一致才能命中同一快照。
+    """
+    name: str
+    func: object
+    kwargs: dict
+
+
+# 首页使用的数据集
+REFRESH_JOBS = (
+    RefreshJob("indices", ak.stock_zh_index_spot_sina, {}),
+    RefreshJob("industries", ak.stock_board_industry_name_em, {}),
+    RefreshJob("concepts", ak.stock_board_concept_name_em, {}),
+    RefreshJob("news", ak.stock_news_em, {}),
+    RefreshJob("fund_flow_rank", ak.stock_individual_fund_flow_rank, {"indicator": "今日"}),
+)
+
+
+def is_trading_time(now: datetime):
+    """
+    判断是否处于交易时段。
+
+    Args:
+        now (datetime): 带时区的当前时间
+
+    Returns:
+        bool: 是否处于交易时段
+    """
+    now = now.astimezone(MARKET_TIMEZONE)
+    if now.weekday() >= 5:
+        return False
+    return any(start <= now.time() < end for start, end in TRADING_SESSIONS)
+
+
+def next_session_change(now: datetime):
+    """
+    计算距下一个交易时段开始或结束的秒数，用于在开盘时及时切换到交易时段的刷新间隔。
+
+    Args:
+        now (datetime): 带时区的当前时间
+
+    Returns:
+        float: 秒数
+    """
+    now = now.astimezone(MARKET_TIMEZONE)
+    for days in range(8):
+        day = (now + timedelta(days=days)).date()
+        if day.weekday() >= 5:
+            continue
+        for start, end in TRADING_SESSIONS:
+            for boundary in (start, end):
+                moment = datetime.combine(day, boundary, tzinfo=MARKET_TIMEZONE)
+                if moment > now:
+                    return (moment - now).total_seconds()
+    return float(settings.MARKET_REFRESH_IDLE_INTERVAL)
+
+
+def refresh_interval(now: datetime):
+    """
+    计算下一次刷新前的等待时间：交易时段使用短间隔，其他时间使用长间隔，但不跨过交易时段的边界。
+
+    Args:
+        now (datetime): 带时区的当前时间
+
+    Returns:
+        float: 秒数
+    """
+    if is_trading_time(now):
+        interval = settings.MARKET_REFRESH_TRADING_INTERVAL
+    else:
+        interval = settings.MARKET_REFRESH_IDLE_INTERVAL
+    return max(1.0, min(float(interval), next_session_change(now)))
+
+
+class MarketRefresher:
+    """
+    首页行情数据后台刷新器。
+
+    Attributes:
+        jobs (tuple): 刷新任务列表
+
+    Examples:
+        >>> refresher = MarketRefresher()
+        >>> refresher.start()
+        >>> await refresher.stop()
+    """
+
+    def __init__(self, jobs=REFRESH_JOBS):
+        self.jobs = jobs
+        self._tasks = []
+        self._last_refreshed = {}
+        self._last_error = {}
+
+    async def _run(self, job: RefreshJob):
+        """单个数据集的刷新循环，失败时记录日志，按正常间隔重试。"""
+        while True:
+            interval = refresh_interval(datetime.now(MARKET_TIMEZONE))
+            try:
+                # 快照有效期覆盖到下次刷新完成，请求不会在两次刷新之间触发下载
+                await upstream_cache.refresh(job.func, ttl=interval + settings.UPSTREAM_TIMEOUT, **job.kwargs)
+                self._last_refreshed[job.name] = datetime.now(MARKET_TIMEZONE)
+                self._last_error.pop(job.name, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error[job.name] = str(e)
+                logger.warning("行情数据刷新失败: job=%s, error=%s", job.name, e)
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """在当前事件循环中启动全部刷新循环（已启动时不重复启动）。"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._run(job), name=f"market-refresh-{job.name}") for job in self.jobs]
+        logger.info("行情数据后台刷新已启动: jobs=%s", [job.name for job in self.jobs])
+
+    async def stop(self):
+        """停止全部刷新循环。"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self):
+        """
+        获取各刷新任务的状态。
+
+        Returns:
+            dict: 是否运行、是否交易时段，以及各任务最近一次成功刷新的时间和最近的错误
+        """
+        now = datetime.now(MARKET_TIMEZONE)
+        return {
+            "running": bool(self._tasks),
+            "trading_time": is_trading_time(now),
+            "interval_seconds": refresh_interval(now),
+            "jobs": {
+                job.name: {
+                    "last_refreshed": self._last_refreshed.get(job.name),
+                    "last_error": self._last_error.get(job.name),
+                }
+                for job in self.jobs
+            },
+        }
+
+
+# 全局后台刷新器
+market_refresher = MarketRefresher()
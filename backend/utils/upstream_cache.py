@@ -0,0 +1,218 @@
+# backend/utils/upstream_cache.py
+"""
+此模块为akshare数据集提供进程内快照缓存。
+全市场行情等数据集每次下载数千行，且被多个接口共用（如热门个股和市场分布都使用A股实时行情），
+这里按(接口名, 参数)缓存下载结果，各接口从同一份快照派生自己的视图：
+- 每个数据集有各自的有效期（UPSTREAM_DATASET_TTLS，未列出的使用UPSTREAM_CACHE_TTL）；
+- 过期后的UPSTREAM_CACHE_MAX_STALE秒内继续返回旧快照，同时在后台刷新（stale-while-revalidate）；
+- 同一数据集同时只有一个下载（single-flight），并发请求共享同一次下载的结果；
+- 下载失败不缓存，后台刷新失败时保留旧快照；缓存条目数超过UPSTREAM_CACHE_MAX_ENTRIES时淘汰最久未使用的。
+快照在请求之间共享，调用方只能派生新的DataFrame（排序、筛选、复制），不能原地修改。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from backend.config.settings import settings
+from backend.utils.upstream_executor import upstream_executor, UpstreamExecutor
+
+logger = logging.getLogger(__name__)
+
+# 各数据集的缓存有效期（秒），按akshare接口名配置
+UPSTREAM_DATASET_TTLS = {
+    # 实时行情：盘中变化快
+    "stock_zh_index_spot_sina": 15,
+    "stock_zh_a_spot_em": 30,
+    "stock_cy_a_spot_em": 30,
+    "stock_kc_a_spot_em": 30,
+    "stock_bj_a_spot_em": 30,
+    "fund_etf_spot_em": 30,
+    # 板块、资金流向排行
+    "stock_board_industry_name_em": 60,
+    "stock_board_concept_name_em": 60,
+    "stock_board_industry_cons_em": 60,
+    "stock_board_concept_cons_em": 60,
+    "stock_individual_fund_flow_rank": 60,
+    # 资讯、个股历史资金流、市盈率：变化慢
+    "stock_news_em": 120,
+    "stock_individual_fund_flow": 300,
+    "stock_market_pe_lg": 3600,
+}
+
+
+class _Snapshot(NamedTuple):
+    """缓存的快照、下载完成时间（time.monotonic）及后台刷新任务为其指定的有效期（None表示按数据集配置）。"""
+    value: Any
+    fetched_at: float
+    ttl: float | None = None
+
+
+class SnapshotCache:
+    """
+    akshare数据集快照缓存。
+
+    Attributes:
+        executor (UpstreamExecutor): 执行下载的上游调用线程池
+        max_entries (int): 最多缓存的快照数
+
+    Examples:
+        >>> cache = SnapshotCache(upstream_executor)
+        >>> spot = await cache.get(ak.stock_zh_a_spot_em)
+    """
+
+    def __init__(self, executor: UpstreamExecutor, max_entries: int = 256):
+        self.executor = executor
+        self.max_entries = max_entries
+        self._snapshots = OrderedDict()
+        self._inflight = {}
+        # 下载完成回调可能在持锁时同步触发（future已完成），因此使用可重入锁
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "downloads": 0, "errors": 0}
+
+    @staticmethod
+    def _key(func, args, kwargs):
+        return (getattr(func, "__name__", repr(func)), args, tuple(sorted(kwargs.items())))
+
+    def _store(self, key, future):
+        """下载完成回调（在工作线程中执行）：成功时写入快照，失败时保留旧快照。"""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self._stats["errors"] += 1
+                logger.warning("上游数据集下载失败: dataset=%s, error=%s", key[0], error)
+                return
+            self._snapshots[key] = _Snapshot(future.result(), time.monotonic())
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+
+    def _download(self, key, func, args, kwargs):
+        """发起下载；同一数据集已有下载在进行时返回该下载（single-flight）。"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = self.executor.submit(func, *args, **kwargs)
+            self._inflight[key] = future
+            self._stats["downloads"] += 1
+            future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    async def get(self, func, *args, ttl: float | None = None, timeout: float | None = None, **kwargs):
+        """
+        获取数据集快照：未过期时直接返回，过期不久时返回旧快照并在后台刷新，否则等待下载。
+
+        Args:
+            func (callable): akshare接口函数
+            *args: 位置参数
+            ttl (float, optional): 有效期（秒），默认按UPSTREAM_DATASET_TTLS配置
+            timeout (float, optional): 等待下载的超时时间（秒），默认为UPSTREAM_TIMEOUT
+            **kwargs: 关键字参数
+
+        Returns:
+            数据集快照（共享对象，不能原地修改）
+
+        Raises:
+            UpstreamTimeoutError: 如果需要等待下载且在超时时间内没有完成
+            Exception: 下载抛出的异常
+        """
+        key = self._key(func, args, kwargs)
+        if ttl is None:
+            ttl = UPSTREAM_DATASET_TTLS.get(key[0], settings.UPSTREAM_CACHE_TTL)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            age = time.monotonic() - snapshot.fetched_at if snapshot else None
+            if snapshot is not None and snapshot.ttl is not None:
+                # 由后台刷新任务维护的快照，以刷新任务指定的有效期为准
+                ttl = max(ttl, snapshot.ttl)
+            if snapshot is not None and age < ttl + settings.UPSTREAM_CACHE_MAX_STALE:
+                self._snapshots.move_to_end(key)
+                if age < ttl:
+                    self._stats["hits"] += 1
+                else:
+                    self._stats["stale_hits"] += 1
+                    self._download(key, func, args, kwargs)
+                return snapshot.value
+            self._stats["misses"] += 1
+            future = self._download(key, func, args, kwargs)
+        return await self.executor.wait(future, timeout, key[0], cancel=False)
+
+    async def refresh(self, func, *args, ttl: float | None = None, timeout: float | None = None, **kwargs):
+        """
+        立即下载数据集并更新快照（已有下载在进行时等待该下载），供后台刷新任务调用。
+
+        Args:
+            func (callable): akshare接口函数
+            *args: 位置参数
+            ttl (float, optional): 为新快照指定的有效期（秒），应不短于下次刷新的间隔，
+                保证请求在两次刷新之间都能直接命中；默认按UPSTREAM_DATASET_TTLS配置
+            timeout (float, optional): 等待下载的超时时间（秒）
+            **kwargs: 关键字参数
+
+        Returns:
+            新的数据集快照
+
+        Raises:
+            UpstreamTimeoutError: 如果在超时时间内没有完成
+            Exception: 下载抛出的异常
+        """
+        key = self._key(func, args, kwargs)
+        with self._lock:
+            future = self._download(key, func, args, kwargs)
+        value = await self.executor.wait(future, timeout, key[0], cancel=False)
+        if ttl is not None:
+            with self._lock:
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None and snapshot.value is value:
+                    self._snapshots[key] = snapshot._replace(ttl=ttl)
+        return value
+
+    def metrics(self):
+        """
+        获取缓存的运行指标。
+
+        Returns:
+            dict: 快照数、进行中的下载数，以及累计的命中、旧快照命中、未命中、下载和下载失败次数
+        """
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "inflight": len(self._inflight),
+                **self._stats,
+            }
+
+    def clear(self):
+        """清空全部快照（进行中的下载完成后仍会写入）。"""
+        with self._lock:
+            self._snapshots.clear()
+
+
+# 全局akshare数据集快照缓存
+upstream_cache = SnapshotCache(upstream_executor, settings.UPSTREAM_CACHE_MAX_ENTRIES)
+
+
+async def fetch_cached(func, *args, ttl: float | None = None, timeout: float | None = None, **kwargs):
+    """
+    通过全局快照缓存获取akshare数据集，API模块中的akshare调用都应经过此函数。
+
+    Args:
+        func (callable): akshare接口函数
+        *args: 位置参数
+        ttl (float, optional): 有效期（秒），默认按UPSTREAM_DATASET_TTLS配置
+        timeout (float, optional): 等待下载的超时时间（秒）
+        **kwargs: 关键字参数
+
+    Returns:
+        数据集快照（共享对象，不能原地修改）
+
+    Examples:
+        >>> spot = await fetch_cached(ak.stock_zh_a_spot_em)
+        >>> hot = spot.sort_values(by='成交量', ascending=False).head(10)
+    """
+    return await upstream_cache.get(func, *args, ttl=ttl, timeout=timeout, **kwargs)
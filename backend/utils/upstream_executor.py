@@ -0,0 +1,201 @@
+# backend/utils/upstream_executor.py
+"""
+此模块提供调用上游数据源（akshare）的专用线程池。
+akshare的接口都是同步的网络请求，在async路由中直接调用会阻塞事件循环，一个缓慢的上游请求会卡住该进程的所有请求。
+这里把所有上游调用提交到大小固定的线程池执行，事件循环只等待结果：
+- 线程池大小由UPSTREAM_MAX_WORKERS配置，超出的调用排队等待，不会无限制地创建线程；
+- 每次调用有超时（默认UPSTREAM_TIMEOUT秒），超时后立即向调用方抛出UpstreamTimeoutError，
+  尚未开始执行的调用会从队列中撤销（已开始的网络请求无法中断，只能在后台执行完毕）；
+- 记录排队深度、排队等待时间、执行时间及超时/失败次数，供/api/metrics/upstream查看。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamTimeoutError(TimeoutError):
+    """上游调用超时。"""
+
+
+class UpstreamExecutor:
+    """
+    上游调用线程池。
+
+    Attributes:
+        max_workers (int): 线程数
+        timeout (float): 默认超时时间（秒）
+
+    Examples:
+        >>> executor = UpstreamExecutor(max_workers=4, timeout=10)
+        >>> data = await executor.call(ak.stock_zh_index_spot_sina)
+    """
+
+    def __init__(self, max_workers: int, timeout: float):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+            "run_seconds_max": 0.0,
+        }
+
+    def _run(self, func, submitted_at: float, args, kwargs):
+        """在工作线程中执行调用并记录排队和执行耗时。"""
+        started_at = time.monotonic()
+        wait = started_at - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._stats["wait_seconds_total"] += wait
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started_at
+            with self._lock:
+                self._running -= 1
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["run_seconds_total"] += elapsed
+                self._stats["run_seconds_max"] = max(self._stats["run_seconds_max"], elapsed)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        将同步调用提交到线程池，不等待结果。
+
+        Args:
+            func (callable): 同步函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            concurrent.futures.Future: 调用结果，可由多个等待方通过wait共享
+        """
+        with self._lock:
+            self._queued += 1
+            self._stats["submitted"] += 1
+        return self._executor.submit(self._run, func, time.monotonic(), args, kwargs)
+
+    async def wait(self, future, timeout: float | None = None, name: str = "upstream", cancel: bool = True):
+        """
+        在事件循环中等待submit返回的结果。
+
+        Args:
+            future (concurrent.futures.Future): submit返回的future
+            timeout (float, optional): 超时时间（秒），默认为self.timeout
+            name (str): 调用名称，用于日志和异常信息
+            cancel (bool): 超时后是否撤销仍在排队的调用；多个等待方共享同一future时应为False
+
+        Returns:
+            调用的返回值
+
+        Raises:
+            UpstreamTimeoutError: 如果在超时时间内没有完成（包括排队时间）
+            Exception: 调用抛出的异常
+        """
+        timeout = self.timeout if timeout is None else timeout
+        waiter = asyncio.wrap_future(future)
+        try:
+            # 共享的future不能因某个等待方超时而被撤销
+            return await asyncio.wait_for(waiter if cancel else asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats["timed_out"] += 1
+                # 仍在排队的调用直接撤销，不再占用线程
+                if cancel and future.cancel():
+                    self._queued -= 1
+                    self._stats["cancelled"] += 1
+            logger.warning("上游调用超时: func=%s, timeout=%ss", name, timeout)
+            raise UpstreamTimeoutError(f"Upstream call {name} timed out after {timeout}s") from None
+
+    async def call(self, func, *args, timeout: float | None = None, **kwargs):
+        """
+        在线程池中执行同步调用并等待结果。
+
+        Args:
+            func (callable): 同步函数，如ak.stock_zh_a_spot_em
+            *args: 位置参数
+            timeout (float, optional): 超时时间（秒），默认为self.timeout
+            **kwargs: 关键字参数
+
+        Returns:
+            func的返回值
+
+        Raises:
+            UpstreamTimeoutError: 如果在超时时间内没有完成（包括排队时间）
+            Exception: func抛出的异常
+        """
+        future = self.submit(func, *args, **kwargs)
+        return await self.wait(future, timeout, getattr(func, "__name__", repr(func)))
+
+    def metrics(self):
+        """
+        获取线程池的运行指标。
+
+        Returns:
+            dict: 线程数、当前排队数和执行数，以及累计的调用次数和排队/执行耗时
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            queued, running = self._queued, self._running
+        started = stats["completed"] + stats["failed"] + running
+        return {
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout,
+            "queue_depth": queued,
+            "running": running,
+            **stats,
+            "wait_seconds_avg": stats["wait_seconds_total"] / started if started else 0.0,
+            "run_seconds_avg": (stats["run_seconds_total"] / (started - running)
+                                if started - running else 0.0),
+        }
+
+    def shutdown(self):
+        """关闭线程池，撤销尚未开始的调用。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局上游调用线程池
+upstream_executor = UpstreamExecutor(settings.UPSTREAM_MAX_WORKERS, settings.UPSTREAM_TIMEOUT)
+
+
+async def fetch_upstream(func, *args, timeout: float | None = None, **kwargs):
+    """
+    通过全局线程池调用上游接口（不缓存）。API模块中的akshare调用应通过upstream_cache.fetch_cached，
+    由其在缓存未命中时经此线程池调用。
+
+    Args:
+        func (callable): akshare接口函数
+        *args: 位置参数
+        timeout (float, optional): 超时时间（秒），默认为UPSTREAM_TIMEOUT
+        **kwargs: 关键字参数
+
+    Returns:
+        上游接口的返回值
+
+    Examples:
+        >>> indices_data = await fetch_upstream(ak.stock_zh_index_spot_sina)
+    """
+    return await upstream_executor.call(func, *args, timeout=timeout, **kwargs)
@@ -0,0 +1,102 @@
+# tests/conftest.py
+"""
+测试公用的夹具：内存SQLite数据库（日线表、信息表和latest_quote快照）。
+只覆盖不依赖PostgreSQL专有语法的逻辑；快照增量刷新等PostgreSQL语句在测试中替换为记录调用，
+搜索索引使用的"= ANY(:ids)"改写为SQLite的json_each。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import json
+import re
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from backend.models.latest_quote_model import LatestQuote, LatestQuoteState
+
+# 测试数据的起始日期和交易日数
+START_DATE = date(2024, 1, 1)
+DAYS = 5
+ETF_SYMBOLS = {"510300": "沪深300ETF", "159915": "创业板ETF"}
+
+_ETF_COLUMNS = ("symbol, date, open, close, high, low, volume, amount, "
+                "amplitude, change_rate, change_amount, turnover_rate")
+
+
+# PostgreSQL的"= ANY(?)"（参数为列表）
+_ANY_PARAMETER = re.compile(r"=\s*ANY\(\?\)")
+
+
+def _rewrite_any(conn, cursor, statement, parameters, context, executemany):
+    """将"= ANY(?)"改写为"IN (SELECT value FROM json_each(?))"，列表参数编码为JSON。"""
+    if executemany or not _ANY_PARAMETER.search(statement):
+        return statement, parameters
+    parameters = tuple(json.dumps(value) if isinstance(value, (list, tuple)) else value for value in parameters)
+    return _ANY_PARAMETER.sub("IN (SELECT value FROM json_each(?))", statement), parameters
+
+
+def insert_etf_day(conn, symbol: str, day: date, close: float):
+    """写入一行ETF日线。"""
+    conn.exec_driver_sql(
+        f"INSERT INTO daily_etf ({_ETF_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (symbol, day, close, close, close + 0.1, close - 0.1, 1000, 1e6, 1.0, 0.5, 0.01, 0.2),
+    )
+
+
+def mark_rebuilt(conn, asset_type: str, rebuilt_at):
+    """记录一次快照全量重建（模拟其他进程执行了--full）。"""
+    conn.exec_driver_sql("DELETE FROM latest_quote_state WHERE asset_type = ?", (asset_type,))
+    conn.exec_driver_sql("INSERT INTO latest_quote_state VALUES (?, ?)", (asset_type, rebuilt_at))
+
+
+def insert_snapshot(conn, asset_type: str, symbol: str, name: str, day: date, volume: float = 1000):
+    """写入一行快照（模拟其他进程完成了快照刷新）。"""
+    conn.exec_driver_sql(
+        "INSERT INTO latest_quote (asset_type, symbol, name, last_close, volume, last_date) VALUES (?, ?, ?, 1.0, ?, ?)",
+        (asset_type, symbol, name, volume, day),
+    )
+
+
+def set_snapshot_date(conn, asset_type: str, day: date):
+    """将快照的最新日期设为day（模拟其他进程完成了快照刷新）。"""
+    conn.exec_driver_sql("UPDATE latest_quote SET last_date = ? WHERE asset_type = ?", (day, asset_type))
+
+
+@pytest.fixture
+def engine():
+    """包含daily_etf、etf_info、latest_quote和latest_quote_state的内存数据库，每个ETF有DAYS个交易日。"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES},
+        poolclass=StaticPool,
+    )
+    event.listen(engine, "before_cursor_execute", _rewrite_any, retval=True)
+    LatestQuote.__table__.create(bind=engine)
+    LatestQuoteState.__table__.create(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_etf (symbol TEXT, date DATE, open REAL, close REAL, high REAL, low REAL, "
+            "volume INTEGER, amount REAL, amplitude REAL, change_rate REAL, change_amount REAL, "
+            "turnover_rate REAL, PRIMARY KEY (symbol, date))"
+        )
+        conn.exec_driver_sql("CREATE TABLE etf_info (symbol TEXT PRIMARY KEY, name TEXT)")
+        for i, (symbol, name) in enumerate(ETF_SYMBOLS.items()):
+            conn.exec_driver_sql("INSERT INTO etf_info VALUES (?, ?)", (symbol, name))
+            for offset in range(DAYS):
+                insert_etf_day(conn, symbol, START_DATE + timedelta(days=offset), 1.0 + i + offset / 10)
+            insert_snapshot(conn, "etf", symbol, name, START_DATE + timedelta(days=DAYS - 1))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """绑定到测试数据库的同步会话。"""
+    session = Session(bind=engine)
+    yield session
+    session.close()
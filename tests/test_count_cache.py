@@ -0,0 +1,61 @@
+# tests/test_count_cache.py
+"""
+列表总数缓存的测试。SQLite不支持EXPLAIN (FORMAT JSON)，宽泛搜索在测试中回退为精确计数。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import pytest
+
+from backend.database import count_cache
+from backend.database.count_cache import get_cached_count, invalidate_counts, is_broad_search, normalize_search
+from tests.conftest import ETF_SYMBOLS, insert_snapshot, START_DATE
+
+FROM_CLAUSE = "FROM latest_quote WHERE asset_type = :asset_type"
+
+
+@pytest.fixture(autouse=True)
+def clear_counts():
+    invalidate_counts()
+    yield
+    invalidate_counts()
+
+
+def _count(db, search=None, allow_estimate=True):
+    filters = ["name LIKE :pattern"] if search else []
+    params = {"asset_type": "etf", "pattern": f"%{search}%"}
+    return get_cached_count(db, "etf", search, True, FROM_CLAUSE, filters, params, allow_estimate)
+
+
+def test_normalize_search():
+    assert normalize_search(None) is None
+    assert normalize_search("   ") is None
+    assert normalize_search(" 300 ") == "300"
+    assert is_broad_search("E") and not is_broad_search(None) and not is_broad_search("沪深300ETF")
+
+
+def test_counts_are_cached_until_invalidated(db):
+    assert _count(db) == (len(ETF_SYMBOLS), True)
+    assert _count(db, "沪深300") == (1, True)
+
+    with db.bind.begin() as conn:
+        insert_snapshot(conn, "etf", "510500", "中证500ETF", START_DATE)
+    assert _count(db) == (len(ETF_SYMBOLS), True)
+
+    invalidate_counts("stock")
+    assert _count(db) == (len(ETF_SYMBOLS), True)
+    invalidate_counts("etf")
+    assert _count(db) == (len(ETF_SYMBOLS) + 1, True)
+
+
+def test_broad_search_falls_back_to_exact_count(db):
+    # 估算失败时回滚并执行精确计数，结果同样被缓存
+    assert _count(db, "E") == (2, True)
+    assert ("etf", "E", True) in count_cache._counts
+
+
+def test_cache_size_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(count_cache.settings, "COUNT_CACHE_SIZE", 2)
+    for search in ("沪深", "创业", "300ETF"):
+        _count(db, search)
+    assert list(count_cache._counts) == [("etf", "创业", True), ("etf", "300ETF", True)]
@@ -0,0 +1,57 @@
+# tests/test_etf_service.py
+"""
+高成交额高振幅ETF列表的测试：搜索时总数与列表使用相同的过滤条件（搜索索引已加载及回退到LIKE时）。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from backend.database import search_index
+from backend.services import etf_service
+from backend.services.etf_service import ETFService
+from tests.conftest import DAYS, insert_etf_day, insert_snapshot, START_DATE
+
+# 成交额、振幅满足筛选条件的ETF
+HIGH_VOLUME_ETFS = {"510500": "中证500ETF", "512100": "中证1000ETF", "588000": "科创50ETF"}
+
+
+@pytest.fixture
+def service(engine, monkeypatch):
+    with engine.begin() as conn:
+        for symbol, name in HIGH_VOLUME_ETFS.items():
+            conn.exec_driver_sql("INSERT INTO etf_info VALUES (?, ?)", (symbol, name))
+            for offset in range(DAYS):
+                insert_etf_day(conn, symbol, START_DATE + timedelta(days=offset), 5.0)
+            insert_snapshot(conn, "etf", symbol, name, START_DATE + timedelta(days=DAYS - 1))
+        conn.exec_driver_sql("UPDATE daily_etf SET amount = 1e9 WHERE symbol IN ('510500', '512100', '588000')")
+    # 快照刷新使用PostgreSQL语句，这里只验证列表和总数
+    monkeypatch.setattr(etf_service, "sync_latest_quote", lambda db, asset_type: False)
+    saved = dict(search_index._indexes)
+    search_index._indexes.clear()
+    yield ETFService()
+    search_index._indexes.clear()
+    search_index._indexes.update(saved)
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_search_total_matches_items(db, service, indexed):
+    if indexed:
+        search_index.refresh_search_index(db, "etf")
+        assert search_index.search_symbols("etf", "中证") is not None
+
+    everything = service.get_high_volume_etf_list(db, page_size=10)
+    assert everything["total"] == len(HIGH_VOLUME_ETFS)
+
+    result = service.get_high_volume_etf_list(db, page_size=1, search="中证")
+    assert [item["symbol"] for item in result["items"]] in (["510500"], ["512100"])
+    assert result["total"] == 2
+    assert result["next_page"] == 2
+
+    last = service.get_high_volume_etf_list(db, page=2, page_size=1, search="中证")
+    assert last["total"] == 2 and last["next_page"] is None
+
+    # 搜索关键字匹配的ETF不满足成交额条件时不计入
+    assert service.get_high_volume_etf_list(db, search="沪深300")["total"] == 0
@@ -0,0 +1,147 @@
+# tests/test_indicator_cache.py
+"""
+指标递推状态与进程内指标缓存的测试：逐根追加新K线的结果与在完整历史上批量计算一致。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.database import indicator_cache
+from backend.database.indicator_cache import expire_indicators, get_indicators, invalidate_indicators
+from backend.utils.indicators import (
+    advance_indicator, compute_indicator, compute_indicator_state, indicator_inputs, parse_indicators,
+)
+
+SPECS = parse_indicators("ma:5:20,ema:12,macd,rsi:6:14,kdj,boll,atr")
+
+
+def _history(rows=260, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, rows))
+    frame = pd.DataFrame({
+        "date": pd.bdate_range("2023-01-02", periods=rows).date,
+        "close": close,
+        "high": close + rng.random(rows),
+        "low": close - rng.random(rows),
+    })
+    frame.loc[100, "close"] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize("spec", SPECS, ids=lambda spec: spec.name)
+def test_advance_matches_batch(spec):
+    history = _history()
+    expected = compute_indicator(history, spec)
+    for split in (1, 2, 30, 101, 259):
+        values, state = compute_indicator_state(indicator_inputs(history.iloc[:split]), spec)
+        # 状态是处理完倒数第二根K线后的状态，从倒数第一根K线开始推进
+        _, tail = advance_indicator(spec, state, indicator_inputs(history.iloc[max(split - 1, 0):]))
+        for name, batch in expected.items():
+            combined = np.concatenate([values[name][:max(split - 1, 0)], tail[name]])
+            np.testing.assert_allclose(combined, batch, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_advance_does_not_modify_state():
+    spec = parse_indicators("ma:5")[0]
+    _, state = compute_indicator_state(indicator_inputs(_history()), spec)
+    before = list(state["closes"])
+    advance_indicator(spec, state, indicator_inputs(_history().iloc[:3]))
+    assert state["closes"] == before
+
+
+class Source:
+    """可追加、可修正的K线来源，记录读取的范围。"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = []
+
+    def __call__(self, db, symbol, start_date=None):
+        self.calls.append(start_date)
+        if start_date is None:
+            return self.frame.copy()
+        return self.frame[self.frame["date"] >= start_date].reset_index(drop=True)
+
+
+@pytest.fixture
+def source():
+    invalidate_indicators()
+    indicator_cache._generations.clear()
+    full = _history()
+    source = Source(full.iloc[:200].reset_index(drop=True))
+    source.full = full
+    yield source
+    invalidate_indicators()
+    indicator_cache._generations.clear()
+
+
+def _request(source, specs=SPECS):
+    return get_indicators(None, "etf", "510300", "D", specs, source.frame["date"], source)
+
+
+def _expected(frame, specs=SPECS):
+    result = {}
+    for spec in specs:
+        result.update(compute_indicator(frame, spec))
+    return result
+
+
+def _assert_values(actual, expected):
+    assert list(actual) == list(expected)
+    for name in expected:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_cache_is_reused_and_aligned(source):
+    _assert_values(_request(source), _expected(source.frame))
+    assert source.calls == [None]
+
+    # 降采样后的日期按日期对齐，缓存中没有的日期为NaN
+    dates = list(source.frame["date"].iloc[::10]) + [date(2023, 9, 2)]
+    values = get_indicators(None, "etf", "510300", "D", SPECS[:1], dates, source)
+    np.testing.assert_allclose(values["ma5"][:-1], _expected(source.frame)["ma5"][::10], equal_nan=True)
+    assert np.isnan(values["ma5"][-1])
+    assert source.calls == [None]
+
+
+def test_new_bars_advance_from_state(source):
+    expire_indicators("etf", ("2023-10-06", 1, None))
+    _request(source)
+    for rows in (201, 205, 260):
+        source.frame = source.full.iloc[:rows].reset_index(drop=True)
+        expire_indicators("etf", (str(source.frame["date"].iloc[-1]), 1, None))
+        _assert_values(_request(source), _expected(source.frame))
+    # 只读取倒数第二根K线之后的数据
+    assert source.calls[0] is None and all(call is not None for call in source.calls[1:])
+    assert len(source.calls) == 4
+
+
+def test_same_day_batch_recomputes_last_bar(source):
+    _request(source)
+    source.frame.loc[len(source.frame) - 1, "close"] += 1
+    expire_indicators("etf", ("2023-10-06", 2, None))
+    _assert_values(_request(source), _expected(source.frame))
+    assert source.calls[-1] is not None
+
+
+def test_revised_history_is_recomputed(source):
+    _request(source)
+    source.frame = source.full.iloc[:201].reset_index(drop=True)
+    source.frame.loc[198, "close"] += 1
+    expire_indicators("etf", ("2023-10-09", 1, None))
+    _assert_values(_request(source), _expected(source.frame))
+    assert source.calls[-2] is not None and source.calls[-1] is None
+
+
+def test_invalidate_indicators(source):
+    _request(source, SPECS[:1])
+    invalidate_indicators("stock")
+    _request(source, SPECS[:1])
+    invalidate_indicators("etf", "510300")
+    _request(source, SPECS[:1])
+    assert source.calls == [None, None]
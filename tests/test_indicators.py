@@ -0,0 +1,114 @@
+# tests/test_indicators.py
+"""
+技术指标参数解析与计算口径的测试（与pandas的滚动、递推计算对照）。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.utils.indicators import (
+    compute_indicator, indicator_columns, indicators_to_json, IndicatorSpec, parse_indicators,
+)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(2)
+    rows = 300
+    close = 10 + np.cumsum(rng.normal(0, 0.2, rows))
+    return pd.DataFrame({
+        "date": pd.bdate_range("2023-01-02", periods=rows).date,
+        "close": close,
+        "high": close + rng.random(rows),
+        "low": close - rng.random(rows),
+    })
+
+
+def _sma(values, window):
+    """SMA(X, N, 1)，以首个有效值为初值。"""
+    return pd.Series(values).ewm(alpha=1 / window, adjust=False, ignore_na=True).mean().to_numpy()
+
+
+def test_parse_indicators():
+    assert parse_indicators(None) == ()
+    assert parse_indicators(" MA:5:10 , macd,ma:5:10,boll:20:2.5") == (
+        IndicatorSpec("ma", (5, 10)),
+        IndicatorSpec("macd", (12, 26, 9)),
+        IndicatorSpec("boll", (20, 2.5)),
+    )
+    assert parse_indicators("rsi") == (IndicatorSpec("rsi", (6, 12, 24)),)
+
+
+@pytest.mark.parametrize("text", ["foo", "macd:12:26", "ma:0", "ma:501", "ma:x", "kdj:9:3"])
+def test_parse_indicators_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_indicators(text)
+
+
+def test_indicator_columns():
+    assert indicator_columns(IndicatorSpec("ma", (5, 10))) == ["ma5", "ma10"]
+    assert indicator_columns(IndicatorSpec("kdj", (9, 3, 3))) == ["kdj_k", "kdj_d", "kdj_j"]
+
+
+def test_moving_averages(frame):
+    close = frame["close"]
+    values = compute_indicator(frame, IndicatorSpec("ma", (5, 20)))
+    np.testing.assert_allclose(values["ma5"], close.rolling(5).mean(), equal_nan=True)
+    np.testing.assert_allclose(values["ma20"], close.rolling(20).mean(), equal_nan=True)
+
+    values = compute_indicator(frame, IndicatorSpec("ema", (12,)))
+    np.testing.assert_allclose(values["ema12"], close.ewm(span=12, adjust=False).mean())
+
+    values = compute_indicator(frame, IndicatorSpec("boll", (20, 2)))
+    middle, deviation = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(values["boll_mid"], middle, equal_nan=True)
+    np.testing.assert_allclose(values["boll_upper"], middle + 2 * deviation, equal_nan=True)
+
+
+def test_macd(frame):
+    close = frame["close"]
+    dif = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    dea = dif.ewm(span=9, adjust=False).mean()
+    values = compute_indicator(frame, IndicatorSpec("macd", (12, 26, 9)))
+    np.testing.assert_allclose(values["macd_dif"], dif)
+    np.testing.assert_allclose(values["macd_dea"], dea)
+    np.testing.assert_allclose(values["macd_hist"], 2 * (dif - dea))
+
+
+def test_rsi_and_atr(frame):
+    change = frame["close"].diff()
+    expected = _sma(change.clip(lower=0), 6) / _sma(change.abs(), 6) * 100
+    values = compute_indicator(frame, IndicatorSpec("rsi", (6,)))
+    np.testing.assert_allclose(values["rsi6"], expected, equal_nan=True)
+
+    previous_close = frame["close"].shift(1)
+    true_range = pd.concat([frame["high"] - frame["low"], (frame["high"] - previous_close).abs(),
+                            (frame["low"] - previous_close).abs()], axis=1).max(axis=1)
+    values = compute_indicator(frame, IndicatorSpec("atr", (14,)))
+    np.testing.assert_allclose(values["atr14"], true_range.rolling(14).mean(), equal_nan=True)
+
+
+def test_kdj(frame):
+    lowest = frame["low"].rolling(9, min_periods=1).min()
+    highest = frame["high"].rolling(9, min_periods=1).max()
+    rsv = (frame["close"] - lowest) / (highest - lowest) * 100
+    k = pd.Series(np.r_[50.0, rsv]).ewm(alpha=1 / 3, adjust=False).mean().to_numpy()[1:]
+    d = pd.Series(np.r_[50.0, k]).ewm(alpha=1 / 3, adjust=False).mean().to_numpy()[1:]
+    values = compute_indicator(frame, IndicatorSpec("kdj", (9, 3, 3)))
+    np.testing.assert_allclose(values["kdj_k"], k)
+    np.testing.assert_allclose(values["kdj_d"], d)
+    np.testing.assert_allclose(values["kdj_j"], 3 * k - 2 * d)
+
+
+def test_missing_values(frame):
+    frame.loc[50, "close"] = np.nan
+    values = compute_indicator(frame, IndicatorSpec("ma", (5,)))
+    assert np.isnan(values["ma5"][50:55]).all() and not np.isnan(values["ma5"][55])
+    # 递推指标在缺失值处沿用上一个结果
+    values = compute_indicator(frame, IndicatorSpec("ema", (12,)))
+    assert values["ema12"][50] == values["ema12"][49]
+
+    assert indicators_to_json({"ma5": np.array([np.nan, 1.5])}) == {"ma5": [None, 1.5]}
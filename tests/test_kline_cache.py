@@ -0,0 +1,146 @@
+# tests/test_kline_cache.py
+"""
+日线历史缓存的测试：切片结果与直接按日期筛选的查询结果一致，按字节数淘汰。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.database.kline_cache import KlineCache, slice_history
+
+
+def _daily(symbol, rows=100):
+    close = np.linspace(1, 2, rows)
+    return pd.DataFrame({
+        "symbol": symbol,
+        "date": pd.bdate_range("2024-01-01", periods=rows).date,
+        "open": close,
+        "close": close,
+        "volume": np.arange(rows, dtype=float),
+    })
+
+
+class Loader:
+    """按代码返回日线数据并记录调用，9开头的代码没有数据。"""
+
+    def __init__(self, rows=100):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, db, asset_type, symbol):
+        self.calls.append((asset_type, symbol))
+        return _daily(symbol, 0 if symbol.startswith("9") else self.rows)
+
+
+def _nbytes(rows=100):
+    # 日序号int32，三个float64字段
+    return rows * (4 + 3 * 8)
+
+
+@pytest.mark.parametrize("start_date, end_date, open_ended", [
+    (None, None, False),
+    (date(2024, 2, 1), date(2024, 3, 15), False),
+    (date(2024, 2, 3), date(2024, 2, 4), False),
+    (date(2024, 2, 1), None, False),
+    (date(2024, 2, 1), None, True),
+    (None, date(2024, 2, 1), True),
+    (date(2030, 1, 1), None, True),
+])
+def test_slices_match_filtered_query(start_date, end_date, open_ended):
+    frame = _daily("510300")
+    cache = KlineCache(10 ** 6)
+    result = cache.get_frame(None, "etf", "510300", Loader(), start_date, end_date, open_ended)
+
+    if not (start_date and end_date) and not open_ended:
+        start_date = end_date = None
+    mask = pd.Series(True, index=frame.index)
+    if start_date:
+        mask &= frame["date"] >= start_date
+    if end_date:
+        mask &= frame["date"] <= end_date
+    expected = frame[mask].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert list(result.columns) == list(frame.columns)
+
+
+def test_frames_are_copies():
+    cache = KlineCache(10 ** 6)
+    loader = Loader()
+    frame = cache.get_frame(None, "etf", "510300", loader)
+    frame.loc[:, "close"] = 0.0
+    assert (cache.get_frame(None, "etf", "510300", loader)["close"] > 0).all()
+    assert loader.calls == [("etf", "510300")]
+
+    days = np.arange(3, dtype="int32")
+    columns = {"close": np.array([1.0, 2.0, 3.0])}
+    frame = slice_history("510300", days, columns)
+    assert not np.shares_memory(frame["close"].to_numpy(), columns["close"])
+    frame.loc[:, "close"] *= 2
+    assert list(frame["close"]) == [2.0, 4.0, 6.0]
+    assert list(columns["close"]) == [1.0, 2.0, 3.0]
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = KlineCache(_nbytes() * 2)
+    loader = Loader()
+    for symbol in ("510300", "159915", "510300", "510500"):
+        cache.get_frame(None, "etf", symbol, loader)
+    # 159915最久未使用，被淘汰
+    assert cache.get_frame(None, "etf", "510300", loader) is not None
+    cache.get_frame(None, "etf", "159915", loader)
+    assert loader.calls == [("etf", "510300"), ("etf", "159915"), ("etf", "510500"), ("etf", "159915")]
+    assert cache.metrics() == {"symbols": 2, "bytes": _nbytes() * 2, "max_bytes": _nbytes() * 2,
+                               "hits": 2, "misses": 4, "evictions": 2}
+
+
+def test_empty_and_oversize_histories_are_not_cached():
+    cache = KlineCache(_nbytes() - 1)
+    loader = Loader()
+    assert cache.get_frame(None, "etf", "999999", loader).empty
+    cache.get_frame(None, "etf", "510300", loader)
+    cache.get_frame(None, "etf", "510300", loader)
+    assert len(loader.calls) == 3
+    assert cache.metrics()["symbols"] == 0 and cache.metrics()["bytes"] == 0
+
+
+def test_invalidate_by_asset_type():
+    cache = KlineCache(10 ** 6)
+    loader = Loader()
+    cache.get_frame(None, "etf", "510300", loader)
+    cache.get_frame(None, "index", "000300", loader)
+    cache.invalidate("etf")
+    assert cache.metrics()["symbols"] == 1 and cache.metrics()["bytes"] == _nbytes()
+    cache.get_frame(None, "index", "000300", loader)
+    cache.get_frame(None, "etf", "510300", loader)
+    assert len(loader.calls) == 3
+    cache.invalidate()
+    assert cache.metrics()["bytes"] == 0
+
+
+def _invalidating(cache, loader, asset_type):
+    """读取完成前其他线程检查到水位变化并使缓存失效的loader。"""
+    def load(db, load_type, symbol):
+        frame = loader(db, load_type, symbol)
+        cache.invalidate(asset_type)
+        return frame
+    return load
+
+
+@pytest.mark.parametrize("invalidated", ["etf", None])
+def test_history_loaded_during_invalidation_is_not_cached(invalidated):
+    cache = KlineCache(10 ** 6)
+    loader = Loader()
+    assert len(cache.get_frame(None, "etf", "510300", _invalidating(cache, loader, invalidated))) == 100
+    assert cache.metrics()["symbols"] == 0
+    cache.get_frame(None, "etf", "510300", loader)
+    cache.get_frame(None, "etf", "510300", loader)
+    assert len(loader.calls) == 2 and cache.metrics()["symbols"] == 1
+
+    # 其他资产类型失效不影响本次读取
+    cache.get_frame(None, "index", "000300", _invalidating(cache, loader, "stock"))
+    assert cache.metrics()["symbols"] == 2
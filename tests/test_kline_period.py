@@ -0,0 +1,137 @@
+# tests/test_kline_period.py
+"""
+周线、月线、季线合并及周期K线缓存的测试。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.database import kline_period_cache
+from backend.database.kline_period_cache import get_period_frame, invalidate_period_frames
+from backend.utils.kline_sampling import period_starts, resample_kline
+
+
+def _daily(start="2023-11-20", rows=200, seed=1):
+    """跨年、跨季度的交易日数据（工作日，含节假日缺口）。"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, periods=rows + 20)
+    days = days.delete(rng.choice(len(days), 20, replace=False))
+    close = 3 + np.cumsum(rng.normal(0, 0.05, rows))
+    change_amount = np.r_[0.01, np.diff(close)]
+    return pd.DataFrame({
+        "symbol": "510300",
+        "date": days.date,
+        "open": close - 0.01,
+        "close": close,
+        "high": close + rng.random(rows) * 0.1,
+        "low": close - rng.random(rows) * 0.1,
+        "volume": rng.integers(1000, 5000, rows).astype(float),
+        "change_rate": change_amount / (close - change_amount) * 100,
+        "change_amount": change_amount,
+    })
+
+
+@pytest.mark.parametrize("period, freq", [("W", "W-SUN"), ("M", "M"), ("Q", "Q")])
+def test_period_starts_match_pandas_periods(period, freq):
+    dates = _daily()["date"]
+    labels = pd.to_datetime(dates).dt.to_period(freq).to_numpy()
+    expected = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    np.testing.assert_array_equal(period_starts(dates, period), expected)
+
+
+def test_period_starts_rejects_unknown_period():
+    assert len(period_starts([], "W")) == 0
+    with pytest.raises(ValueError):
+        period_starts(_daily()["date"], "Y")
+
+
+@pytest.mark.parametrize("period, freq", [("W", "W-SUN"), ("M", "M"), ("Q", "Q")])
+def test_resample_kline_matches_groupby(period, freq):
+    frame = _daily()
+    groups = frame.groupby(pd.to_datetime(frame["date"]).dt.to_period(freq).to_numpy(), sort=False)
+    expected = groups.agg(date=("date", "last"), open=("open", "first"), close=("close", "last"),
+                          high=("high", "max"), low=("low", "min"), volume=("volume", "sum"))
+    previous_close = groups["close"].last().shift(1)
+    previous_close.iloc[0] = frame["close"].iloc[0] - frame["change_amount"].iloc[0]
+
+    result = resample_kline(frame, period)
+    assert list(result["date"]) == list(expected["date"])
+    for column in ("open", "close", "high", "low", "volume"):
+        np.testing.assert_allclose(result[column], expected[column], err_msg=column)
+    np.testing.assert_allclose(result["change_rate"],
+                               (expected["close"] / previous_close.to_numpy() - 1) * 100)
+
+
+def test_resample_kline_daily_and_errors():
+    frame = _daily()
+    assert resample_kline(frame) is frame
+    assert resample_kline(frame.iloc[:0], "W").empty
+    with pytest.raises(ValueError):
+        resample_kline(frame, "Y")
+
+
+@pytest.fixture
+def loader():
+    """记录调用次数的日线loader。"""
+    frame = _daily()
+    calls = []
+
+    def load(db, symbol):
+        calls.append(symbol)
+        return frame if symbol == "510300" else frame.iloc[:0]
+
+    load.frame, load.calls = frame, calls
+    invalidate_period_frames()
+    yield load
+    invalidate_period_frames()
+
+
+def test_period_frame_is_cached_and_filtered(loader):
+    full = get_period_frame(None, "etf", "510300", "M", loader)
+    pd.testing.assert_frame_equal(full, resample_kline(loader.frame, "M"))
+
+    # 返回与日期范围有交集的完整周期
+    part = get_period_frame(None, "etf", "510300", "M", loader, date(2024, 1, 15), date(2024, 3, 5))
+    assert [d.month for d in part["date"]] == [1, 2, 3]
+    pd.testing.assert_frame_equal(part, full[full["date"].map(lambda d: (d.year, d.month) in
+                                                              [(2024, 1), (2024, 2), (2024, 3)])]
+                                  .reset_index(drop=True))
+    # 只提供开始日期时按open_ended决定是否筛选
+    assert len(get_period_frame(None, "etf", "510300", "M", loader, start_date=date(2024, 6, 1))) == len(full)
+    assert len(get_period_frame(None, "etf", "510300", "M", loader, start_date=date(2024, 6, 1),
+                                open_ended=True)) < len(full)
+    assert loader.calls == ["510300"]
+
+
+def test_period_frame_copies_and_invalidation(loader):
+    frame = get_period_frame(None, "etf", "510300", "W", loader)
+    frame["close"] = 0.0
+    assert (get_period_frame(None, "etf", "510300", "W", loader)["close"] != 0).all()
+
+    # 没有数据的代码不缓存
+    assert get_period_frame(None, "etf", "000000", "W", loader).empty
+    assert ("etf", "000000", "W") not in kline_period_cache._frames
+
+    invalidate_period_frames("stock")
+    get_period_frame(None, "etf", "510300", "W", loader)
+    invalidate_period_frames("index")
+    get_period_frame(None, "etf", "510300", "W", loader)
+    assert loader.calls == ["510300", "000000", "510300"]
+
+
+@pytest.mark.parametrize("invalidated, cached", [("etf", False), ("index", False), ("stock", True)])
+def test_period_frame_loaded_during_invalidation(loader, invalidated, cached):
+    def load(db, symbol):
+        # 读取完成前其他线程检查到水位变化并使缓存失效
+        frame = loader(db, symbol)
+        invalidate_period_frames(invalidated)
+        return frame
+
+    full = get_period_frame(None, "etf", "510300", "W", load)
+    pd.testing.assert_frame_equal(full, resample_kline(loader.frame, "W"))
+    assert (("etf", "510300", "W") in kline_period_cache._frames) is cached
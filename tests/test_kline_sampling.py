@@ -0,0 +1,134 @@
+# tests/test_kline_sampling.py
+"""
+K线降采样的测试：区间合并规则与LTTB选点。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.utils.kline_sampling import aggregate_buckets, bucket_starts, downsample_kline, lttb_indices
+
+
+def _daily(rows=120, seed=0):
+    """带参考指数涨跌幅的ETF日线数据，部分字段有缺失值。"""
+    rng = np.random.default_rng(seed)
+    close = 3 + np.cumsum(rng.normal(0, 0.05, rows))
+    change_amount = np.r_[0.01, np.diff(close)]
+    frame = pd.DataFrame({
+        "symbol": "510300",
+        "date": pd.bdate_range("2023-01-02", periods=rows).date,
+        "open": close - rng.normal(0, 0.02, rows),
+        "close": close,
+        "high": close + rng.random(rows) * 0.1,
+        "low": close - rng.random(rows) * 0.1,
+        "volume": rng.integers(1000, 5000, rows).astype(float),
+        "amount": rng.random(rows) * 1e6,
+        "amplitude": rng.random(rows),
+        "change_rate": change_amount / (close - change_amount) * 100,
+        "change_amount": change_amount,
+        "turnover_rate": rng.random(rows),
+        "ref_change_rate": rng.normal(0, 1, rows),
+    })
+    frame.loc[5, "volume"] = np.nan
+    frame.loc[7, "high"] = np.nan
+    return frame
+
+
+def _reference_aggregate(frame, starts):
+    """逐区间用pandas计算的合并结果。"""
+    ends = list(starts[1:]) + [len(frame)]
+    rows = []
+    for start, end in zip(starts, ends):
+        part = frame.iloc[start:end]
+        previous_close = part["close"].iloc[0] - part["change_amount"].iloc[0]
+        change_amount = part["close"].iloc[-1] - previous_close
+        rows.append({
+            "date": part["date"].iloc[-1],
+            "open": part["open"].iloc[0],
+            "close": part["close"].iloc[-1],
+            "high": part["high"].max(),
+            "low": part["low"].min(),
+            "volume": part["volume"].sum(min_count=1),
+            "amount": part["amount"].sum(),
+            "turnover_rate": part["turnover_rate"].sum(),
+            "change_amount": change_amount,
+            "change_rate": change_amount / previous_close * 100,
+            "amplitude": (part["high"].max() - part["low"].min()) / previous_close * 100,
+            "ref_change_rate": ((1 + part["ref_change_rate"] / 100).prod() - 1) * 100,
+        })
+    return pd.DataFrame(rows)
+
+
+def _reference_lttb(y, bucket_count):
+    """按定义逐区间计算的LTTB。"""
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+    n = len(y)
+    edges = [1 + (i * (n - 2)) // (bucket_count - 2) for i in range(bucket_count - 1)]
+    selected, previous = [0], 0
+    for bucket in range(bucket_count - 2):
+        if bucket + 1 < bucket_count - 2:
+            next_rows = np.arange(edges[bucket + 1], edges[bucket + 2])
+            mean_x, mean_y = next_rows.mean(), y[next_rows].mean()
+        else:
+            mean_x, mean_y = n - 1, y[-1]
+        rows = np.arange(edges[bucket], edges[bucket + 1])
+        areas = np.abs((previous - mean_x) * (y[rows] - y[previous]) - (previous - rows) * (mean_y - y[previous]))
+        previous = int(rows[np.argmax(areas)])
+        selected.append(previous)
+    return selected + [n - 1]
+
+
+def test_bucket_starts_are_even():
+    starts = bucket_starts(10, 4)
+    assert list(starts) == [0, 2, 5, 7]
+    assert list(bucket_starts(6, 6)) == list(range(6))
+
+
+@pytest.mark.parametrize("bucket_count", [1, 7, 30, 119])
+def test_aggregate_buckets_matches_reference(bucket_count):
+    frame = _daily()
+    starts = bucket_starts(len(frame), bucket_count)
+    result = aggregate_buckets(frame, starts)
+    expected = _reference_aggregate(frame, starts)
+
+    assert list(result.columns) == list(frame.columns)
+    assert list(result["date"]) == list(expected["date"])
+    assert (result["symbol"] == "510300").all()
+    for column in expected.columns.drop("date"):
+        np.testing.assert_allclose(result[column].to_numpy(float), expected[column].to_numpy(float),
+                                   rtol=1e-12, err_msg=column)
+
+
+def test_sum_of_missing_values_stays_missing():
+    frame = _daily(rows=10).iloc[:4].copy()
+    frame["volume"] = [np.nan, np.nan, 1.0, np.nan]
+    result = aggregate_buckets(frame, np.array([0, 2]))
+    assert np.isnan(result["volume"].iloc[0])
+    assert result["volume"].iloc[1] == 1.0
+
+
+@pytest.mark.parametrize("bucket_count", [3, 4, 17, 50, 119])
+def test_lttb_matches_reference(bucket_count):
+    y = _daily()["close"].to_numpy()
+    assert list(lttb_indices(y, bucket_count)) == _reference_lttb(y, bucket_count)
+
+
+def test_downsample_kline():
+    frame = _daily()
+    assert downsample_kline(frame, None) is frame
+    assert downsample_kline(frame, len(frame)) is frame
+
+    merged = downsample_kline(frame, 40)
+    assert len(merged) == 40
+    assert merged["volume"].sum() == pytest.approx(frame["volume"].sum())
+
+    sampled = downsample_kline(frame, 40, "lttb")
+    assert len(sampled) == 40
+    pd.testing.assert_frame_equal(sampled.iloc[[0, -1]].reset_index(drop=True),
+                                  frame.iloc[[0, -1]].reset_index(drop=True))
+
+    with pytest.raises(ValueError):
+        downsample_kline(frame, 40, "mean")
@@ -0,0 +1,133 @@
+# tests/test_kline_store.py
+"""
+日线导出文件的测试：写入与内存映射读取、版本切换与旧版本清理。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.config.settings import settings
+from backend.database.kline_store import KlineStore, write_kline_store
+
+COLUMNS = ["close", "volume"]
+THROUGH = date(2024, 3, 29)
+
+
+def _history(symbols=("510300", "159915", "512880"), days=60):
+    """按代码、日期排序的日线数据，每个代码的交易日数不同。"""
+    rng = np.random.default_rng(0)
+    frames = []
+    for i, symbol in enumerate(symbols):
+        dates = pd.bdate_range(end=THROUGH, periods=days - i * 7).date
+        frames.append(pd.DataFrame({
+            "symbol": symbol,
+            "date": dates,
+            "close": rng.random(len(dates)),
+            "volume": rng.integers(0, 1000, len(dates)).astype(float),
+        }))
+    frame = pd.concat(frames, ignore_index=True).sort_values(["symbol", "date"], ignore_index=True)
+    frame.loc[3, "close"] = np.nan
+    return frame
+
+
+def _write(root, frame, through=THROUGH, chunk_size=17):
+    chunks = (frame.iloc[i:i + chunk_size] for i in range(0, len(frame), chunk_size))
+    return write_kline_store(str(root), "etf", COLUMNS, len(frame), chunks, through)
+
+
+@pytest.fixture(autouse=True)
+def check_every_time(monkeypatch):
+    monkeypatch.setattr(settings, "KLINE_STORE_CHECK_INTERVAL", 0)
+
+
+def test_slices_match_exported_history(tmp_path):
+    frame = _history()
+    _write(tmp_path, frame)
+    store = KlineStore(str(tmp_path))
+
+    start, end = date(2024, 2, 1), date(2024, 3, 1)
+    for symbol, expected in frame.groupby("symbol"):
+        selected = expected[(expected["date"] >= start) & (expected["date"] <= end)]
+        result = store.get_frame("etf", symbol, start, end)
+        assert list(result.columns) == ["symbol", "date"] + COLUMNS
+        assert list(result["date"]) == list(selected["date"])
+        assert (result["symbol"] == symbol).all()
+        np.testing.assert_array_equal(result[COLUMNS].to_numpy(), selected[COLUMNS].to_numpy())
+
+
+def test_open_ended_rule(tmp_path):
+    frame = _history()
+    _write(tmp_path, frame)
+    store = KlineStore(str(tmp_path))
+    total = int((frame["symbol"] == "510300").sum())
+
+    # 只提供开始日期时，非open_ended的资产不按日期筛选
+    assert len(store.get_frame("etf", "510300", date(2024, 3, 1))) == total
+    assert store.get_frame("etf", "510300", date(2024, 3, 1), open_ended=True)["date"].min() == date(2024, 3, 1)
+
+
+def test_missing_symbol_and_stale_export(tmp_path):
+    _write(tmp_path, _history())
+    store = KlineStore(str(tmp_path))
+
+    assert store.get_frame("etf", "999999") is None
+    assert store.get_frame("etf", "510300", through=THROUGH) is not None
+    assert store.get_frame("etf", "510300", through=THROUGH + timedelta(days=1)) is None
+    history, through = store.get_history("etf", "510300")
+    assert through == THROUGH and len(history) == 60
+    assert store.metrics()["stale"] == 1
+
+
+def test_returned_frame_is_a_copy(tmp_path):
+    _write(tmp_path, _history())
+    store = KlineStore(str(tmp_path))
+    frame = store.get_frame("etf", "510300")
+    frame["close"] = 0.0
+    assert store.get_frame("etf", "510300")["close"].iloc[-1] != 0.0
+
+
+def test_row_count_mismatch_removes_partial_version(tmp_path):
+    frame = _history()
+    with pytest.raises(RuntimeError):
+        write_kline_store(str(tmp_path), "etf", COLUMNS, len(frame) + 1, iter([frame]), THROUGH)
+    assert os.listdir(tmp_path / "etf") == []
+
+
+def test_new_version_is_picked_up_and_previous_kept(tmp_path):
+    store = KlineStore(str(tmp_path))
+    first = os.path.basename(_write(tmp_path, _history()))
+    assert store.get_history("etf", "510300")[1] == THROUGH
+
+    second = os.path.basename(_write(tmp_path, _history(), through=THROUGH + timedelta(days=1)))
+    assert store.get_history("etf", "510300")[1] == THROUGH + timedelta(days=1)
+    assert sorted(os.listdir(tmp_path / "etf")) == sorted(["CURRENT", first, second])
+
+    third = os.path.basename(_write(tmp_path, _history(), through=THROUGH + timedelta(days=2)))
+    assert sorted(os.listdir(tmp_path / "etf")) == sorted(["CURRENT", second, third])
+
+
+def test_export_in_progress_is_not_removed(tmp_path):
+    _write(tmp_path, _history())
+    in_progress = tmp_path / "etf" / "20240101000000-running"
+    in_progress.mkdir()
+    (in_progress / "date.npy").write_bytes(b"")
+
+    _write(tmp_path, _history())
+    _write(tmp_path, _history())
+    assert in_progress.exists()
+
+
+def test_missing_current_keeps_mapped_version(tmp_path):
+    _write(tmp_path, _history())
+    store = KlineStore(str(tmp_path))
+    assert store.get_frame("etf", "510300") is not None
+
+    os.remove(tmp_path / "etf" / "CURRENT")
+    assert store.get_frame("etf", "510300") is not None
+    assert store.metrics()["versions"]["etf"]["rows"] == len(_history())
@@ -0,0 +1,177 @@
+# tests/test_latest_quote.py
+"""
+latest_quote水位检查的测试：快照由其他进程刷新时，本进程的缓存仍按观察到的日线表水位失效。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.database import indicator_cache, latest_quote, queries, search_index, symbol_registry
+from backend.database.count_cache import invalidate_counts
+from backend.database.kline_cache import kline_cache
+from backend.database.kline_period_cache import get_period_frame, invalidate_period_frames
+from backend.database.kline_store import kline_store
+from backend.database.search_index import search_symbols, suggest
+from backend.database.symbol_registry import resolve_symbol
+from backend.utils.indicators import parse_indicators
+from tests.conftest import (
+    DAYS, START_DATE, insert_etf_day, insert_snapshot, mark_rebuilt, set_snapshot_date,
+)
+
+
+@pytest.fixture(autouse=True)
+def process_state(monkeypatch, tmp_path):
+    """每个测试模拟一个新启动的进程，并记录快照刷新（PostgreSQL语句）的调用。"""
+    for state in (latest_quote._last_checked, latest_quote._observed, latest_quote._source_dates):
+        state.clear()
+    kline_cache.invalidate()
+    invalidate_period_frames()
+    indicator_cache.invalidate_indicators()
+    invalidate_counts()
+    monkeypatch.setattr(symbol_registry, "_registry", {})
+    monkeypatch.setattr(search_index, "_indexes", {})
+    monkeypatch.setattr(kline_store, "root", str(tmp_path / "kline_store"))
+    refreshes = []
+    monkeypatch.setattr(latest_quote, "refresh_latest_quote",
+                        lambda db, asset_type, since=None: refreshes.append((asset_type, since)))
+    yield refreshes
+    kline_cache.invalidate()
+
+
+def _next_check():
+    """跳过检查间隔，使下一次请求重新检查水位。"""
+    latest_quote._last_checked.clear()
+
+
+def test_snapshot_refreshed_by_other_process_invalidates_kline_cache(engine, db, process_state):
+    assert len(queries._get_cached_kline(db, "etf", "510300")) == DAYS
+
+    # 另一个进程导入了新交易日并刷新了共享的快照
+    new_day = START_DATE + timedelta(days=DAYS)
+    with engine.begin() as conn:
+        insert_etf_day(conn, "510300", new_day, 9.9)
+        set_snapshot_date(conn, "etf", new_day)
+    _next_check()
+
+    frame = queries._get_cached_kline(db, "etf", "510300")
+    assert process_state == []
+    assert len(frame) == DAYS + 1
+    assert frame["close"].iloc[-1] == pytest.approx(9.9)
+
+
+def test_same_day_batch_import_refreshes_snapshot_and_cache(engine, db, process_state):
+    last_day = START_DATE + timedelta(days=DAYS - 1)
+    queries._get_cached_kline(db, "etf", "510300")
+    assert queries._get_cached_kline(db, "etf", "512880").empty
+
+    # 同一交易日的第二批数据：最新日期不变，行数增加
+    with engine.begin() as conn:
+        insert_etf_day(conn, "512880", last_day, 7.7)
+    _next_check()
+
+    frame = queries._get_cached_kline(db, "etf", "512880")
+    assert [str(since) for _, since in process_state] == [str(last_day)]
+    assert len(frame) == 1
+    assert frame["close"].iloc[-1] == pytest.approx(7.7)
+    # 其他代码的缓存同样失效
+    assert kline_cache.metrics()["symbols"] == 1
+
+
+def test_unchanged_watermark_keeps_cache(db):
+    queries._get_cached_kline(db, "etf", "510300")
+    _next_check()
+    queries._get_cached_kline(db, "etf", "510300")
+    assert kline_cache.metrics()["symbols"] == 1
+
+
+def test_snapshot_refreshed_by_other_process_invalidates_period_frames(engine, db):
+    def weekly(symbol):
+        latest_quote.sync_latest_quote(db, "etf")
+        load = lambda db, symbol: queries._get_cached_kline(db, "etf", symbol)
+        return get_period_frame(db, "etf", symbol, "W", load)
+
+    assert weekly("510300")["close"].iloc[-1] == pytest.approx(1.4)
+
+    # 新交易日与最后一根周线在同一周
+    new_day = START_DATE + timedelta(days=DAYS)
+    with engine.begin() as conn:
+        insert_etf_day(conn, "510300", new_day, 9.9)
+        set_snapshot_date(conn, "etf", new_day)
+    _next_check()
+
+    assert weekly("510300")["close"].iloc[-1] == pytest.approx(9.9)
+
+
+def _sma(db, symbol):
+    latest_quote.sync_latest_quote(db, "etf")
+    frame = queries._get_cached_kline(db, "etf", symbol)
+    load = lambda db, symbol, start_date=None: queries._get_cached_kline(db, "etf", symbol, start_date, None)
+    values = indicator_cache.get_indicators(db, "etf", symbol, "D", parse_indicators("ma:2"), frame["date"], load)
+    return values["ma2"]
+
+
+def test_indicators_follow_new_day_observed_in_other_process(engine, db):
+    _sma(db, "510300")
+    new_day = START_DATE + timedelta(days=DAYS)
+    with engine.begin() as conn:
+        insert_etf_day(conn, "510300", new_day, 9.9)
+        set_snapshot_date(conn, "etf", new_day)
+    _next_check()
+
+    values = _sma(db, "510300")
+    assert len(values) == DAYS + 1
+    assert values[-1] == pytest.approx((1.4 + 9.9) / 2)
+
+
+def test_full_rebuild_in_other_process_recomputes_indicators(engine, db):
+    assert _sma(db, "510300")[1] == pytest.approx((1.0 + 1.1) / 2)
+
+    # 另一个进程修正了历史数据并全量重建快照，日线表的最新日期和行数都没有变化
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE daily_etf SET close = 5.0 WHERE symbol = '510300' AND date = ?", (START_DATE,))
+        mark_rebuilt(conn, "etf", datetime(2024, 1, 6, 18, 0))
+    _next_check()
+
+    assert _sma(db, "510300")[1] == pytest.approx((5.0 + 1.1) / 2)
+
+
+def _list_new_etf(engine, symbol, name):
+    """另一个进程导入了新上市ETF的首个交易日并刷新了快照。"""
+    new_day = START_DATE + timedelta(days=DAYS)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO etf_info VALUES (?, ?)", (symbol, name))
+        insert_etf_day(conn, symbol, new_day, 1.0)
+        insert_snapshot(conn, "etf", symbol, name, new_day, volume=5000)
+        set_snapshot_date(conn, "etf", new_day)
+    _next_check()
+
+
+def test_symbol_listed_in_other_process_resolves(engine, db):
+    latest_quote.sync_latest_quote(db, "etf")
+    with pytest.raises(ValueError):
+        resolve_symbol("512880", "etf")
+
+    _list_new_etf(engine, "512880", "证券ETF")
+    latest_quote.sync_latest_quote(db, "etf")
+    assert resolve_symbol("512880", "etf").daily_symbol == "512880"
+
+
+def test_list_total_follows_listing_in_other_process(engine, db):
+    assert queries.get_latest_quote_list(db, "etf")["total"] == 2
+
+    _list_new_etf(engine, "512880", "证券ETF")
+    assert queries.get_latest_quote_list(db, "etf")["total"] == 3
+
+
+def test_search_index_follows_listing_in_other_process(engine, db):
+    latest_quote.sync_latest_quote(db, "etf")
+    assert search_symbols("etf", "512") == []
+
+    _list_new_etf(engine, "512880", "证券ETF")
+    latest_quote.sync_latest_quote(db, "etf")
+    assert search_symbols("etf", "512") == ["512880"]
+    assert search_symbols("etf", "证券") == ["512880"]
+    assert [item[1] for item in suggest("zq", asset_type="etf")] == ["512880"]
@@ -0,0 +1,116 @@
+# tests/test_pagination.py
+"""
+键集分页的测试：游标编解码、双向翻页、页码分页与旧版游标兼容。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from backend.database.pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+# 成交量有重复值，检验tiebreaker保证顺序稳定
+ROWS = [(f"s{i:02d}", f"名称{i % 7}", float(i % 5) if i % 6 else None) for i in range(23)]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE quote (symbol TEXT PRIMARY KEY, name TEXT, volume REAL, kind TEXT)")
+        for symbol, name, volume in ROWS:
+            conn.exec_driver_sql("INSERT INTO quote VALUES (?, ?, ?, 'etf')", (symbol, name, volume))
+    session = Session(bind=engine)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def paginator():
+    return KeysetPaginator(
+        "q.symbol, q.name",
+        "FROM quote q WHERE q.kind = :kind",
+        {"symbol": "q.symbol", "volume": "COALESCE(q.volume, 0)"},
+        tiebreaker="symbol",
+    )
+
+
+def _expected(sort_by, sort_order):
+    key = (lambda row: row[0]) if sort_by == "symbol" else (lambda row: (row[2] or 0, row[0]))
+    return [row[0] for row in sorted(ROWS, key=key, reverse=sort_order == "desc")]
+
+
+def _walk(db, paginator, page_size, **kwargs):
+    """沿next_cursor翻完所有页，返回每页的代码列表和每页的结果。"""
+    pages, results, cursor = [], [], None
+    while True:
+        result = paginator.paginate(db, {"kind": "etf"}, page_size, cursor=cursor, **kwargs)
+        pages.append(list(result["rows"]["symbol"]))
+        results.append(result)
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return pages, results
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("volume", "desc", "next", [3.0, "s07"])
+    assert decode_cursor(cursor) == {"s": "volume", "o": "desc", "d": "next", "k": [3.0, "s07"]}
+    assert decode_cursor("sh600000") is None
+
+
+@pytest.mark.parametrize("sort_by", ["symbol", "volume"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_forward_pages_cover_all_rows_in_order(db, paginator, sort_by, sort_order):
+    pages, results = _walk(db, paginator, 5, sort_by=sort_by, sort_order=sort_order)
+    assert [symbol for page in pages for symbol in page] == _expected(sort_by, sort_order)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert results[0]["prev_cursor"] is None and not results[0]["has_prev"]
+    assert list(results[0]["rows"].columns) == ["symbol", "name"]
+
+
+@pytest.mark.parametrize("sort_by", ["symbol", "volume"])
+def test_prev_cursor_returns_previous_page(db, paginator, sort_by):
+    pages, results = _walk(db, paginator, 5, sort_by=sort_by, sort_order="desc")
+    for i in range(1, len(pages)):
+        previous = paginator.paginate(db, {"kind": "etf"}, 5, cursor=results[i]["prev_cursor"], sort_by=sort_by)
+        assert list(previous["rows"]["symbol"]) == pages[i - 1]
+        assert previous["has_next"]
+        assert previous["has_prev"] == (i > 1)
+
+
+def test_page_numbers_match_cursor_pages(db, paginator):
+    pages, _ = _walk(db, paginator, 6, sort_by="volume", sort_order="desc")
+    for number, expected in enumerate(pages, start=1):
+        result = paginator.paginate(db, {"kind": "etf"}, 6, sort_by="volume", sort_order="desc", page=number)
+        assert list(result["rows"]["symbol"]) == expected
+        assert result["has_prev"] == (number > 1)
+        assert result["has_next"] == (number < len(pages))
+
+
+def test_legacy_cursor_continues_after_symbol(db, paginator):
+    result = paginator.paginate(db, {"kind": "etf"}, 3, cursor="s10")
+    assert list(result["rows"]["symbol"]) == ["s11", "s12", "s13"]
+    assert result["has_prev"]
+
+
+def test_filters_apply(db, paginator):
+    result = paginator.paginate(db, {"kind": "etf", "prefix": "s1%"}, 50, filters=["q.symbol LIKE :prefix"])
+    assert list(result["rows"]["symbol"]) == [f"s{i}" for i in range(10, 20)]
+    assert result["next_cursor"] is None
+
+
+def test_invalid_requests(db, paginator):
+    cursor = paginator.paginate(db, {"kind": "etf"}, 5, sort_by="volume")["next_cursor"]
+    with pytest.raises(ValueError):
+        paginator.paginate(db, {"kind": "etf"}, 5, cursor=cursor, sort_by="symbol")
+    with pytest.raises(ValueError):
+        paginator.paginate(db, {"kind": "etf"}, 5, cursor=encode_cursor("volume", "asc", "next", ["s01"]))
+    with pytest.raises(ValueError):
+        paginator.paginate(db, {"kind": "etf"}, 5, sort_by="name")
+    with pytest.raises(ValueError):
+        paginator.paginate(db, {"kind": "etf"}, 5, sort_order="up")
+    with pytest.raises(ValueError):
+        KeysetPaginator("q.symbol", "FROM quote q WHERE TRUE", {"volume": "q.volume"}, tiebreaker="symbol")
@@ -0,0 +1,83 @@
+# tests/test_search_index.py
+"""
+列表搜索n-gram索引的测试：结果与逐个判断子串包含（LIKE '%关键字%'）一致；
+联想前缀树的测试：结果与按分值排序后逐个判断前缀一致。
+Authors: hovi.hyw & AI
+Date: 2026-10-17
+"""
+
+import random
+
+import pytest
+
+from backend.database.search_index import NGramIndex, pinyin_initials, PrefixTrie
+
+NAMES = {
+    "sh600519": "贵州茅台",
+    "sz000858": "五粮液",
+    "sh600000": "浦发银行",
+    "sh601398": "工商银行",
+    "sz000001": "平安银行",
+    "sh510300": "沪深300ETF",
+    "sz159915": "创业板ETF",
+    "sh000300": "沪深300",
+    "sz399006": "创业板指",
+    "sh600036": "招商银行",
+    "sz000002": "万科A",
+    "bj430047": "",
+}
+
+
+def _like(texts, term):
+    return frozenset(key for key, value in texts.items() if value and term in value)
+
+
+@pytest.mark.parametrize("term", ["银", "银行", "商银行", "沪深300", "沪深300ETF", "ETF", "etf", "A", "不存在的名称",
+                                  "行银"])
+def test_name_search_matches_like(term):
+    index = NGramIndex()
+    index.build(NAMES)
+    assert index.search(term) == _like(NAMES, term)
+
+
+def test_symbol_search_matches_like():
+    rng = random.Random(7)
+    symbols = {f"sh{rng.randrange(600000, 700000)}": None for _ in range(500)}
+    texts = {symbol: symbol for symbol in symbols}
+    index = NGramIndex()
+    index.build(texts)
+    for term in ["6", "60", "600", "6001", "sh6", "h60012", "99999", "sh"]:
+        assert index.search(term) == _like(texts, term)
+    assert len(index) == len(texts)
+
+
+def test_rebuild_replaces_entries():
+    index = NGramIndex()
+    index.build(NAMES)
+    index.build({"sz000001": "平安银行"})
+    assert index.search("银行") == {"sz000001"}
+    assert len(index) == 1
+
+
+def test_pinyin_initials():
+    assert pinyin_initials("贵州茅台") == "gzmt"
+    assert pinyin_initials("沪深300ETF") == "hs300etf"
+
+
+def test_prefix_trie_matches_sorted_scan():
+    rng = random.Random(11)
+    entries = []
+    for item in NAMES:
+        keys = (item, item[2:], NAMES[item].lower(), pinyin_initials(NAMES[item]))
+        # 部分分值相同，按条目排序
+        entries.append((keys, item, float(rng.randrange(3))))
+    trie = PrefixTrie(top_k=3)
+    trie.build(entries)
+
+    ranked = sorted(entries, key=lambda entry: (-entry[2], entry[1]))
+    for prefix in ["s", "sh6", "600", "3", "银", "工商", "hs", "hs300", "cyb", "gzmt", "x"]:
+        expected = tuple(item for keys, item, _ in ranked if any(key.startswith(prefix) for key in keys))
+        assert trie.search(prefix) == expected[:3]
+        assert trie.search(prefix, limit=1) == expected[:1]
+    # 空前缀不匹配任何条目（联想接口不查询空关键字）
+    assert trie.search("") == ()